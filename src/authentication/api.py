@@ -1,30 +1,33 @@
+import traceback
 from ninja import Router
 from django.contrib.auth.hashers import make_password, check_password
 from django.core.exceptions import ValidationError
-from django.contrib.auth import authenticate
-from ninja_jwt.tokens import RefreshToken
+from ninja_jwt.exceptions import TokenError
+from ninja_jwt.tokens import AccessToken, RefreshToken
 
+from .hashers import needs_rehash, run_hashing
 from .models import User
-from .schemas import RegisterSchema, UserDetailSchema, MessageSchema, LoginSchema, UserUpdateSchema, ChangePasswordSchema
+from .provisioning import BULK_USERS_MAX, provision_users
+from .schemas import RegisterSchema, UserDetailSchema, MessageSchema, LoginSchema, UserUpdateSchema, ChangePasswordSchema, LogoutSchema, BulkUserSchema, BulkUserResultSchema
 import helpers
 
 router = Router()
 
 
 @router.post("/register", response= {201: UserDetailSchema, 400: MessageSchema})
-def register(request, payload: RegisterSchema):
+async def register(request, payload: RegisterSchema):
     try:
-        if User.objects.filter(email=payload.email).exists():
+        if await User.objects.filter(email=payload.email).aexists():
             return 400, {"message": "Email is already registered."}
         
-        if User.objects.filter(username=payload.username).exists():
+        if await User.objects.filter(username=payload.username).aexists():
             return 400, {"message": "Username is already registered."}
 
         user_data = payload.dict()
 
-        user_data['password'] = make_password(user_data['password'])
+        user_data['password'] = await run_hashing(make_password, user_data['password'])
 
-        user = User.objects.create(**user_data)
+        user = await User.objects.acreate(**user_data)
 
         return 201, user
     except ValidationError as e:
@@ -34,13 +37,22 @@ def register(request, payload: RegisterSchema):
     
 
 @router.post("/login", response={200: dict, 401: MessageSchema})
-def login(request, payload: LoginSchema):
-    user = authenticate(request, email=payload.email, password=payload.password)
+async def login(request, payload: LoginSchema):
+    user = await User.objects.filter(email=payload.email).afirst()
 
     if user is None:
+        # Hash anyway, so response times do not reveal which emails are registered.
+        await run_hashing(make_password, payload.password)
         return 401, {"message": "Invalid email or password"}
+
+    if not user.is_active or not await run_hashing(check_password, payload.password, user.password):
+        return 401, {"message": "Invalid email or password"}
+
+    if needs_rehash(user.password):
+        user.password = await run_hashing(make_password, payload.password)
+        await user.asave(update_fields=["password"])
     
-    refresh = RefreshToken.for_user(user)
+    refresh = helpers.issue_tokens(user)
 
     return {
         "refresh": str(refresh),
@@ -50,6 +62,21 @@ def login(request, payload: LoginSchema):
     }
 
 
+@router.post("/logout", response={200: MessageSchema, 400: MessageSchema}, auth=helpers.auth_required)
+def logout(request, payload: LogoutSchema):
+    """Revokes the access token of the request and, if given, the refresh token issued with it."""
+
+    try:
+        helpers.revoke_token(AccessToken(request.headers["Authorization"].split(" ", 1)[1]))
+
+        if payload.refresh:
+            helpers.revoke_token(RefreshToken(payload.refresh))
+
+        return 200, {"message": "Logged out successfully."}
+    except TokenError:
+        return 400, {"message": "Invalid refresh token."}
+
+
 @router.get("/user", response={200: UserDetailSchema, 400: MessageSchema}, auth=helpers.auth_required)
 def get_user(request):
     try:
@@ -83,21 +110,46 @@ def update_user(request, payload: UserUpdateSchema):
         return 400, {"message": "An unexpected error occurred."}
     
 
-@router.post("/user/change-password", response={200: MessageSchema, 400: MessageSchema}, auth=helpers.auth_required)
-def change_password(request, payload: ChangePasswordSchema):
+@router.post("/user/change-password", response={200: MessageSchema, 400: MessageSchema}, auth=helpers.async_auth_required)
+async def change_password(request, payload: ChangePasswordSchema):
     try:
         user = request.user
-        if not check_password(payload.old_password, user.password):
+        # The cached user has no password hash, and an async view cannot load deferred fields on access.
+        await user.arefresh_from_db(fields=["password"])
+        if not await run_hashing(check_password, payload.old_password, user.password):
             return 400, {"message": "Old password incorrect."}
         
         if payload.new_password != payload.confirm_password:
             return 400, {"message": "New passwords do not match."}
         
-        user.password = make_password(payload.new_password)
-        user.save()
+        user.password = await run_hashing(make_password, payload.new_password)
+        # Signs out every other session: tokens issued before carry the old version.
+        user.token_version += 1
+        await user.asave(update_fields=["password", "token_version"])
 
         return 200, {"message": "Password changed successfully."}
     except ValidationError as e:
         return 400, {"message": str(e)}
     except Exception as e:
-        return 400, {"message": "An unexpected error occurred."}
\ No newline at end of file
+        return 400, {"message": "An unexpected error occurred."}
+
+
+@router.post("/users/bulk", response={200: BulkUserResultSchema, 400: MessageSchema, 403: MessageSchema, 500: MessageSchema}, auth=helpers.auth_required)
+def create_users_bulk(request, payload: BulkUserSchema):
+    """Creates a batch of accounts, e.g. a class of students. Teachers may only create users with the USER role."""
+
+    try:
+        if request.user.role not in ("TEACHER", "ADMIN"):
+            return 403, {"message": "Only teachers and admins can create users in bulk."}
+
+        if len(payload.users) > BULK_USERS_MAX:
+            return 400, {"message": f"A batch can contain at most {BULK_USERS_MAX} users."}
+
+        allowed_roles = None if request.user.role == "ADMIN" else ["USER"]
+        results = provision_users([row.dict() for row in payload.users], allowed_roles=allowed_roles)
+        created = sum(1 for result in results if result["status"] == "created")
+
+        return 200, {"created": created, "failed": len(results) - created, "results": results}
+    except Exception as e:
+        traceback.print_exc()
+        return 500, {"message": "An unexpected error occurred while creating users."}
@@ -0,0 +1,63 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """PBKDF2 with the iteration count taken from `PASSWORD_PBKDF2_ITERATIONS`."""
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERATIONS
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    """Argon2 with costs taken from `PASSWORD_ARGON2_*`. Requires the `argon2-cffi` package."""
+
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_ARGON2_PARALLELISM
+
+
+class BCryptSHA256PasswordHasher(hashers.BCryptSHA256PasswordHasher):
+    """bcrypt with the work factor taken from `PASSWORD_BCRYPT_ROUNDS`. Requires the `bcrypt` package."""
+
+    @property
+    def rounds(self):
+        return settings.PASSWORD_BCRYPT_ROUNDS
+
+
+executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASHING_WORKERS, thread_name_prefix="password-hashing")
+
+
+async def run_hashing(func, *args):
+    """Runs a hashing function in the bounded hashing pool, keeping the event loop free while it burns CPU.
+
+    The PBKDF2, argon2 and bcrypt implementations release the GIL, so the pool hashes on several cores at once.
+    """
+
+    return await asyncio.get_running_loop().run_in_executor(executor, partial(func, *args))
+
+
+def needs_rehash(encoded):
+    """Whether `encoded` was made by another hasher than the preferred one or with outdated parameters."""
+
+    preferred = hashers.get_hasher("default")
+
+    try:
+        hasher = hashers.identify_hasher(encoded)
+    except ValueError:
+        return False
+
+    return hasher.algorithm != preferred.algorithm or preferred.must_update(encoded)
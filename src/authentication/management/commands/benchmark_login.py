@@ -0,0 +1,41 @@
+import asyncio
+import os
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, get_hasher, make_password
+from django.core.management.base import BaseCommand
+
+from authentication.hashers import run_hashing
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures how many logins per second the password hashing pool sustains with the configured hasher, "
+        "overall and per core. Only the password check is timed, which is what bounds login throughput."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--logins", type=int, default=200, help="Number of concurrent logins to simulate.")
+
+    def handle(self, *args, logins=200, **options):
+        password = "Benchmark@123"
+        encoded = make_password(password)
+
+        async def run():
+            return await asyncio.gather(*(run_hashing(check_password, password, encoded) for _ in range(logins)))
+
+        start = time.perf_counter()
+        results = asyncio.run(run())
+        elapsed = time.perf_counter() - start
+
+        if not all(results):
+            self.stderr.write(self.style.ERROR("A password check failed, the benchmark result is not meaningful."))
+
+        cores = min(settings.PASSWORD_HASHING_WORKERS, os.cpu_count() or 1)
+        rate = logins / elapsed
+
+        self.stdout.write(f"Hasher: {get_hasher('default').algorithm}")
+        self.stdout.write(f"Workers: {settings.PASSWORD_HASHING_WORKERS} ({cores} cores used)")
+        self.stdout.write(f"Logins: {logins} in {elapsed:.2f}s")
+        self.stdout.write(self.style.SUCCESS(f"{rate:.1f} logins/sec, {rate / cores:.1f} logins/sec per core"))
@@ -0,0 +1,29 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from authentication.provisioning import provision_users
+
+
+class Command(BaseCommand):
+    help = "Creates users from a CSV file with a username, email, password and optional role column, e.g. to onboard a class."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV file with a header row.")
+
+    def handle(self, *args, path, **options):
+        try:
+            with open(path, newline="", encoding="utf-8") as file:
+                rows = [{key: value for key, value in row.items() if value} for row in csv.DictReader(file)]
+        except OSError as e:
+            raise CommandError(f"Cannot read {path}: {e}")
+
+        results = provision_users(rows)
+
+        for result in results:
+            if result["status"] != "created":
+                # Row 1 is the header.
+                self.stderr.write(self.style.ERROR(f"Line {result['row'] + 2}: {result['message']}"))
+
+        created = sum(1 for result in results if result["status"] == "created")
+        self.stdout.write(self.style.SUCCESS(f"Created {created} of {len(results)} users."))
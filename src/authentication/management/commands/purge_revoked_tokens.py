@@ -0,0 +1,14 @@
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand
+
+from authentication.models import RevokedToken
+
+
+class Command(BaseCommand):
+    help = "Deletes revoked tokens that have expired and can no longer be used anyway. Meant to run periodically (e.g. from cron)."
+
+    def handle(self, *args, **options):
+        deleted, _ = RevokedToken.objects.filter(expires_at__lte=datetime.now(timezone.utc)).delete()
+
+        self.stdout.write(self.style.SUCCESS(f"Purged {deleted} expired revoked tokens."))
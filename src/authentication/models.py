@@ -15,6 +15,7 @@ class User(AbstractUser):
     email = models.EmailField(unique=True)
     password = models.CharField(max_length=128)
     role = models.CharField(max_length=16, choices=ROLE_CHOICES, default="USER")
+    token_version = models.PositiveIntegerField(default=1)
 
     objects = CustomUserManager()
 
@@ -22,10 +23,25 @@ class User(AbstractUser):
     EMAIL_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
 
+    def save(self, *args, **kwargs):
+        from helpers import invalidate_cached_user
+
+        super().save(*args, **kwargs)
+        invalidate_cached_user(self)
+
     def to_dict(self):
         return {
             "id": self.id,
             "username": self.username,
             "email": self.email,
             "role": self.role
-        }
\ No newline at end of file
+        }
+
+
+class RevokedToken(models.Model):
+    jti = models.CharField(max_length=255, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
+    revoked_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.jti
@@ -0,0 +1,109 @@
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import Q
+from pydantic import ValidationError
+
+from .models import User
+from .schemas import RegisterSchema
+
+
+BULK_USERS_MAX = 5000
+BATCH_SIZE = 1000
+
+_pool = None
+
+
+def get_hashing_pool():
+    """Returns the process pool bulk provisioning hashes passwords in, starting it on first use.
+
+    Workers are spawned rather than forked, so they never inherit database connections or the threads of the
+    parent, and set Django up themselves.
+    """
+
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.PASSWORD_HASHING_PROCESSES,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=django.setup,
+        )
+    return _pool
+
+
+def hash_passwords(passwords):
+    """Hashes `passwords` with the preferred hasher, spread over `PASSWORD_HASHING_PROCESSES` processes."""
+
+    if len(passwords) < 2 or settings.PASSWORD_HASHING_PROCESSES < 2:
+        return [make_password(password) for password in passwords]
+
+    chunksize = math.ceil(len(passwords) / (settings.PASSWORD_HASHING_PROCESSES * 4))
+    return list(get_hashing_pool().map(make_password, passwords, chunksize=chunksize))
+
+
+def get_row_error(error):
+    detail = error.errors()[0]
+    field = ".".join(str(part) for part in detail["loc"])
+    return f"{field}: {detail['msg']}" if field else detail["msg"]
+
+
+def provision_users(rows, allowed_roles=None):
+    """Validates and creates users from `rows` of register payloads. Returns one result per row, in order.
+
+    Rows are validated like `/register`, then checked against existing users with a single query and against each
+    other. Passwords of the valid rows are hashed in the process pool and the users inserted with `bulk_create`.
+    A row whose role is not in `allowed_roles` is rejected; `None` allows every role.
+    """
+
+    results = [None] * len(rows)
+    valid = {}
+
+    for index, row in enumerate(rows):
+        try:
+            data = RegisterSchema.model_validate(row).dict()
+        except ValidationError as e:
+            results[index] = {"row": index, "status": "error", "message": get_row_error(e)}
+            continue
+
+        if allowed_roles is not None and data["role"] not in allowed_roles:
+            results[index] = {"row": index, "status": "error", "message": f"Not allowed to create users with role {data['role']}."}
+            continue
+
+        valid[index] = data
+
+    existing = list(
+        User.objects.filter(
+            Q(email__in=[data["email"] for data in valid.values()]) | Q(username__in=[data["username"] for data in valid.values()])
+        ).values_list("email", "username")
+    )
+    emails = {email for email, _ in existing}
+    usernames = {username for _, username in existing}
+
+    for index, data in list(valid.items()):
+        if data["email"] in emails:
+            message = "Email is already registered."
+        elif data["username"] in usernames:
+            message = "Username is already registered."
+        else:
+            emails.add(data["email"])
+            usernames.add(data["username"])
+            continue
+
+        results[index] = {"row": index, "status": "error", "message": message}
+        del valid[index]
+
+    passwords = hash_passwords([data["password"] for data in valid.values()])
+    users = [User(**{**data, "password": password}) for data, password in zip(valid.values(), passwords)]
+
+    with transaction.atomic():
+        User.objects.bulk_create(users, batch_size=BATCH_SIZE)
+
+    for index, user in zip(valid, users):
+        results[index] = {"row": index, "status": "created", "id": user.id}
+
+    return results
@@ -1,6 +1,6 @@
 from ninja import Schema
 from pydantic import EmailStr, Field, field_validator
-from typing import Optional
+from typing import List, Optional
 import re
 
 
@@ -55,6 +55,33 @@ class ChangePasswordSchema(Schema):
         return validate_password(value)
 
 
+class LogoutSchema(Schema):
+    refresh: Optional[str] = None
+
+
+class BulkUserRowSchema(Schema):
+    username: str
+    email: str
+    password: str
+    role: Optional[str] = "USER"
+
+
+class BulkUserSchema(Schema):
+    users: List[BulkUserRowSchema]
+
+
+class BulkUserRowResultSchema(Schema):
+    row: int
+    status: str
+    id: Optional[int] = None
+    message: Optional[str] = None
+
+
+class BulkUserResultSchema(Schema):
+    created: int
+    failed: int
+    results: List[BulkUserRowResultSchema]
+
 
 # Validators
 def validate_role(value):
@@ -1,7 +1,13 @@
+from django.core.cache import cache
 from django.test import TestCase
-from ninja_extra.testing import TestClient
-from ninja_jwt.tokens import RefreshToken
+from django.test import override_settings
+from ninja_extra.testing import TestAsyncClient, TestClient
+from ninja_jwt.tokens import AccessToken, RefreshToken
 import pytest
+
+import helpers
+from helpers.api_auth import cache_user, get_user_cache_key
+from helpers.revocation import is_token_revoked
 from .api import router
 from .models import User
 
@@ -9,6 +15,7 @@ from .models import User
 class NinjaAuthenticationTestCase(TestCase):
     def setUp(self):
         self.client = TestClient(router)
+        self.async_client = TestAsyncClient(router)
 
         self.user = User.objects.create_user(username='JohnDoe123', email='johndoe@gmail.com', password='JohnDoe@!3', role='USER')
         self.user2 = User.objects.create_user(username='BobJohnson123', email='bobjohnson@gmail.com', password='BobJohnson#23', role='TEACHER')
@@ -21,7 +28,7 @@ class NinjaAuthenticationTestCase(TestCase):
         return str(refresh.access_token)
 
     @pytest.mark.django_db
-    def test_login_success(self):
+    async def test_login_success(self):
         """Test login with correct user credentials"""
 
         # Arrange
@@ -31,7 +38,7 @@ class NinjaAuthenticationTestCase(TestCase):
         }
 
         # Act
-        response = self.client.post('/login', json=payload)
+        response = await self.async_client.post('/login', json=payload)
 
         # Assert
         assert response.status_code == 200
@@ -40,7 +47,7 @@ class NinjaAuthenticationTestCase(TestCase):
 
 
     @pytest.mark.django_db
-    def test_login_invalid_emial(self):
+    async def test_login_invalid_emial(self):
         """Test login with invalid email"""
 
         # Arrange
@@ -50,7 +57,7 @@ class NinjaAuthenticationTestCase(TestCase):
         }
 
         # Act
-        response = self.client.post('/login', json=payload)
+        response = await self.async_client.post('/login', json=payload)
 
         # Assert
         assert response.status_code == 401
@@ -58,7 +65,7 @@ class NinjaAuthenticationTestCase(TestCase):
 
 
     @pytest.mark.django_db
-    def test_login_invalid_password(self):
+    async def test_login_invalid_password(self):
         """Test login with invalid password"""
 
         # Arrange
@@ -68,7 +75,7 @@ class NinjaAuthenticationTestCase(TestCase):
         }
 
         # Act
-        response = self.client.post('/login', json=payload)
+        response = await self.async_client.post('/login', json=payload)
 
         # Assert
         assert response.status_code == 401
@@ -76,7 +83,7 @@ class NinjaAuthenticationTestCase(TestCase):
 
 
     @pytest.mark.django_db
-    def test_register_success(self):
+    async def test_register_success(self):
         """Test register with correct credentials"""
 
         # Arrange
@@ -88,7 +95,7 @@ class NinjaAuthenticationTestCase(TestCase):
         }
 
         # Act
-        response = self.client.post('/register', json=payload)
+        response = await self.async_client.post('/register', json=payload)
 
         # Assert
         assert response.status_code == 201
@@ -98,7 +105,7 @@ class NinjaAuthenticationTestCase(TestCase):
 
 
     @pytest.mark.django_db
-    def test_register_with_duplicate_email(self):
+    async def test_register_with_duplicate_email(self):
         """Test register with already used email"""
 
         # Arrange
@@ -110,7 +117,7 @@ class NinjaAuthenticationTestCase(TestCase):
         }
 
         # Act
-        response = self.client.post('/register', json=payload)
+        response = await self.async_client.post('/register', json=payload)
 
         # Assert
         assert response.status_code == 400
@@ -118,7 +125,7 @@ class NinjaAuthenticationTestCase(TestCase):
 
 
     @pytest.mark.django_db
-    def test_register_with_duplicate_username(self):
+    async def test_register_with_duplicate_username(self):
         """Test register with already used username"""
 
         # Arrange
@@ -130,7 +137,7 @@ class NinjaAuthenticationTestCase(TestCase):
         }
 
         # Act
-        response = self.client.post('/register', json=payload)
+        response = await self.async_client.post('/register', json=payload)
 
         # Assert
         assert response.status_code == 400
@@ -138,7 +145,7 @@ class NinjaAuthenticationTestCase(TestCase):
 
 
     @pytest.mark.django_db
-    def test_register_invalid_email_missing_at_sign(self):
+    async def test_register_invalid_email_missing_at_sign(self):
         """Test register with missing @-sign in the email address"""
 
         # Arrange
@@ -150,7 +157,7 @@ class NinjaAuthenticationTestCase(TestCase):
         }
 
         # Act
-        response = self.client.post('/register', json=payload)
+        response = await self.async_client.post('/register', json=payload)
 
         # Assert
         assert response.status_code == 422
@@ -158,7 +165,7 @@ class NinjaAuthenticationTestCase(TestCase):
 
 
     @pytest.mark.django_db
-    def test_register_invalid_email_missing_period_in_domain(self):
+    async def test_register_invalid_email_missing_period_in_domain(self):
         """Test register with missing period in the email domain"""
 
         # Arrange
@@ -170,7 +177,7 @@ class NinjaAuthenticationTestCase(TestCase):
         }
 
         # Act
-        response = self.client.post('/register', json=payload)
+        response = await self.async_client.post('/register', json=payload)
 
         # Assert
         assert response.status_code == 422
@@ -178,7 +185,7 @@ class NinjaAuthenticationTestCase(TestCase):
 
 
     @pytest.mark.django_db
-    def test_register_invalid_password_missing_uppercase_letter(self):
+    async def test_register_invalid_password_missing_uppercase_letter(self):
         """Test register with missing uppercase letter in password"""
 
         # Arrange
@@ -190,7 +197,7 @@ class NinjaAuthenticationTestCase(TestCase):
         }
 
         # Act
-        response = self.client.post('/register', json=payload)
+        response = await self.async_client.post('/register', json=payload)
 
         # Assert
         assert response.status_code == 422
@@ -198,7 +205,7 @@ class NinjaAuthenticationTestCase(TestCase):
 
 
     @pytest.mark.django_db
-    def test_register_invalid_password_missing_lowercase_letter(self):
+    async def test_register_invalid_password_missing_lowercase_letter(self):
         """Test register with missing lowercase letter in password"""
 
         # Arrange
@@ -210,7 +217,7 @@ class NinjaAuthenticationTestCase(TestCase):
         }
 
         # Act
-        response = self.client.post('/register', json=payload)
+        response = await self.async_client.post('/register', json=payload)
 
         # Assert
         assert response.status_code == 422
@@ -218,7 +225,7 @@ class NinjaAuthenticationTestCase(TestCase):
 
 
     @pytest.mark.django_db
-    def test_register_invalid_password_missing_digit(self):
+    async def test_register_invalid_password_missing_digit(self):
         """Test register with missing digit in password"""
 
         # Arrange
@@ -230,7 +237,7 @@ class NinjaAuthenticationTestCase(TestCase):
         }
 
         # Act
-        response = self.client.post('/register', json=payload)
+        response = await self.async_client.post('/register', json=payload)
 
         # Assert
         assert response.status_code == 422
@@ -238,7 +245,7 @@ class NinjaAuthenticationTestCase(TestCase):
 
 
     @pytest.mark.django_db
-    def test_register_invalid_password_missing_special_character(self):
+    async def test_register_invalid_password_missing_special_character(self):
         """Test register with missing special character in password"""
 
         # Arrange
@@ -250,7 +257,7 @@ class NinjaAuthenticationTestCase(TestCase):
         }
 
         # Act
-        response = self.client.post('/register', json=payload)
+        response = await self.async_client.post('/register', json=payload)
 
         # Assert
         assert response.status_code == 422
@@ -258,7 +265,7 @@ class NinjaAuthenticationTestCase(TestCase):
 
 
     @pytest.mark.django_db
-    def test_register_invalid_password_too_short(self):
+    async def test_register_invalid_password_too_short(self):
         """Test register with too short password"""
 
         # Arrange
@@ -270,7 +277,7 @@ class NinjaAuthenticationTestCase(TestCase):
         }
 
         # Act
-        response = self.client.post('/register', json=payload)
+        response = await self.async_client.post('/register', json=payload)
 
         # Assert
         assert response.status_code == 422
@@ -278,7 +285,7 @@ class NinjaAuthenticationTestCase(TestCase):
 
 
     @pytest.mark.django_db
-    def test_register_invalid_role(self):
+    async def test_register_invalid_role(self):
         """Test register with incorect role"""
 
         # Arrange
@@ -290,7 +297,7 @@ class NinjaAuthenticationTestCase(TestCase):
         }
 
         # Act
-        response = self.client.post('/register', json=payload)
+        response = await self.async_client.post('/register', json=payload)
 
         # Assert
         assert response.status_code == 422
@@ -403,7 +410,7 @@ class NinjaAuthenticationTestCase(TestCase):
 
 
     @pytest.mark.dajngo_db
-    def test_change_password_success(self):
+    async def test_change_password_success(self):
         """Test user change password with vaild data"""
 
         # Arrange
@@ -415,15 +422,16 @@ class NinjaAuthenticationTestCase(TestCase):
         }
 
         # Act
-        response = self.client.post('/user/change-password', json=payload, headers={'Authorization': f'Bearer {token}'})
+        response = await self.async_client.post('/user/change-password', json=payload, headers={'Authorization': f'Bearer {token}'})
 
         # Assert
         assert response.status_code == 200
         assert response.json()['message'] == 'Password changed successfully.'
+        assert (await User.objects.aget(id=self.user.id)).token_version == self.user.token_version + 1
 
 
     @pytest.mark.dajngo_db
-    def test_change_password_with_wrong_old_password(self):
+    async def test_change_password_with_wrong_old_password(self):
         """Test user change password with wrong old password"""
 
         # Arrange
@@ -435,7 +443,7 @@ class NinjaAuthenticationTestCase(TestCase):
         }
 
         # Act
-        response = self.client.post('/user/change-password', json=payload, headers={'Authorization': f'Bearer {token}'})
+        response = await self.async_client.post('/user/change-password', json=payload, headers={'Authorization': f'Bearer {token}'})
 
         # Assert
         assert response.status_code == 400
@@ -443,7 +451,7 @@ class NinjaAuthenticationTestCase(TestCase):
 
 
     @pytest.mark.dajngo_db
-    def test_change_password_with_mismatched_passwords(self):
+    async def test_change_password_with_mismatched_passwords(self):
         """Test user change password when the new passwords do not match"""
 
         # Arrange
@@ -455,8 +463,211 @@ class NinjaAuthenticationTestCase(TestCase):
         }
 
         # Act
-        response = self.client.post('/user/change-password', json=payload, headers={'Authorization': f'Bearer {token}'})
+        response = await self.async_client.post('/user/change-password', json=payload, headers={'Authorization': f'Bearer {token}'})
 
         # Assert
         assert response.status_code == 400
-        assert response.json()['message'] == 'New passwords do not match.'
\ No newline at end of file
+        assert response.json()['message'] == 'New passwords do not match.'
+
+    @pytest.mark.django_db
+    def test_authenticated_user_is_cached(self):
+        """Test that repeated requests with the same token do not load the user from the database"""
+
+        # Arrange
+        token = self.get_access_token()
+        self.client.get('/user', headers={'Authorization': f'Bearer {token}'})
+
+        # Act
+        with self.assertNumQueries(0):
+            response = self.client.get('/user', headers={'Authorization': f'Bearer {token}'})
+
+        # Assert
+        assert response.status_code == 200
+
+
+    @pytest.mark.django_db
+    def test_update_user_invalidates_cached_user(self):
+        """Test that a user update is visible on the next request despite the cache"""
+
+        # Arrange
+        token = self.get_access_token()
+        headers = {'Authorization': f'Bearer {token}'}
+        self.client.get('/user', headers=headers)
+
+        # Act
+        self.client.patch('/user', json={'username': 'JohnDoe99'}, headers=headers)
+        response = self.client.get('/user', headers=headers)
+
+        # Assert
+        assert response.json()['username'] == 'JohnDoe99'
+        assert User.objects.get(id=self.user.id).check_password('JohnDoe@!3')
+
+
+    @pytest.mark.django_db
+    def test_cached_user_has_no_password_hash(self):
+        """Test that the user cached for authentication is stored without its password hash"""
+
+        # Arrange
+        token = self.get_access_token()
+
+        # Act
+        response = self.client.get('/user', headers={'Authorization': f'Bearer {token}'})
+
+        # Assert
+        assert response.status_code == 200
+        assert cache.get(get_user_cache_key(self.user.id))['email'] == 'johndoe@gmail.com'
+        assert 'password' not in cache.get(get_user_cache_key(self.user.id))
+
+
+    @pytest.mark.django_db
+    async def test_change_password_with_cached_user(self):
+        """Test that the password can be changed by a user authenticated from the cache"""
+
+        # Arrange
+        token = self.get_access_token()
+        cache_user(self.user)
+        payload = {
+            "old_password": "JohnDoe@!3",
+            "new_password": "JohnDoe@$5",
+            "confirm_password": "JohnDoe@$5"
+        }
+
+        # Act
+        response = await self.async_client.post('/user/change-password', json=payload, headers={'Authorization': f'Bearer {token}'})
+
+        # Assert
+        assert response.status_code == 200
+        assert (await User.objects.aget(id=self.user.id)).check_password("JohnDoe@$5")
+
+
+    @pytest.mark.django_db
+    def test_token_with_old_version_is_rejected(self):
+        """Test that bumping the token version revokes tokens issued before, even while the user is cached"""
+
+        # Arrange
+        token = str(helpers.issue_tokens(self.user).access_token)
+        self.client.get('/user', headers={'Authorization': f'Bearer {token}'})
+        self.user.token_version += 1
+        self.user.save()
+
+        # Act
+        response = self.client.get('/user', headers={'Authorization': f'Bearer {token}'})
+
+        # Assert
+        assert response.status_code == 401
+
+
+    @pytest.mark.django_db
+    async def test_login_token_carries_claims(self):
+        """Test that login issues tokens with the claims trusted by read-only endpoints"""
+
+        # Arrange
+        payload = {'email': 'johndoe@gmail.com', 'password': 'JohnDoe@!3'}
+
+        # Act
+        response = await self.async_client.post('/login', json=payload)
+        token = AccessToken(response.json()['access'])
+
+        # Assert
+        assert token['username'] == 'JohnDoe123'
+        assert token['role'] == 'USER'
+        assert token['token_version'] == 1
+
+
+    @pytest.mark.django_db
+    @override_settings(
+        PASSWORD_HASHERS=["authentication.hashers.PBKDF2PasswordHasher", "django.contrib.auth.hashers.MD5PasswordHasher"],
+        PASSWORD_PBKDF2_ITERATIONS=1000,
+    )
+    async def test_login_rehashes_outdated_password(self):
+        """Test that login upgrades a password hashed by a hasher that is no longer preferred"""
+
+        # Arrange
+        payload = {'email': 'johndoe@gmail.com', 'password': 'JohnDoe@!3'}
+
+        # Act
+        response = await self.async_client.post('/login', json=payload)
+        await self.user.arefresh_from_db()
+
+        # Assert
+        assert response.status_code == 200
+        assert self.user.password.startswith('pbkdf2_sha256$1000$')
+        assert self.user.check_password('JohnDoe@!3')
+
+
+    @pytest.mark.django_db
+    def test_create_users_bulk(self):
+        """Test that a teacher creates a batch of users and gets a result per row"""
+
+        # Arrange
+        token = str(RefreshToken.for_user(self.user2).access_token)
+        payload = {'users': [
+            {'username': 'Student001', 'email': 'student001@school.com', 'password': 'Student@001'},
+            {'username': 'Student002', 'email': 'johndoe@gmail.com', 'password': 'Student@002'},
+            {'username': 'Student003', 'email': 'student003@school.com', 'password': 'short'},
+            {'username': 'Student001', 'email': 'student004@school.com', 'password': 'Student@004'},
+            {'username': 'Student005', 'email': 'student005@school.com', 'password': 'Student@005', 'role': 'ADMIN'},
+        ]}
+
+        # Act
+        response = self.client.post('/users/bulk', json=payload, headers={'Authorization': f'Bearer {token}'})
+
+        # Assert
+        assert response.status_code == 200
+        assert response.json()['created'] == 1
+        assert [result['status'] for result in response.json()['results']] == ['created', 'error', 'error', 'error', 'error']
+        assert response.json()['results'][1]['message'] == 'Email is already registered.'
+        assert response.json()['results'][3]['message'] == 'Username is already registered.'
+        assert User.objects.get(username='Student001').check_password('Student@001')
+
+
+    @pytest.mark.django_db
+    def test_create_users_bulk_as_student(self):
+        """Test that students cannot create users in bulk"""
+
+        # Arrange
+        token = self.get_access_token()
+        payload = {'users': [{'username': 'Student001', 'email': 'student001@school.com', 'password': 'Student@001'}]}
+
+        # Act
+        response = self.client.post('/users/bulk', json=payload, headers={'Authorization': f'Bearer {token}'})
+
+        # Assert
+        assert response.status_code == 403
+        assert not User.objects.filter(username='Student001').exists()
+
+
+    @pytest.mark.django_db
+    def test_logout_revokes_token(self):
+        """Test that an access token no longer authenticates after logout"""
+
+        # Arrange
+        token = self.get_access_token()
+        headers = {'Authorization': f'Bearer {token}'}
+
+        # Act
+        logout_response = self.client.post('/logout', json={}, headers=headers)
+        response = self.client.get('/user', headers=headers)
+
+        # Assert
+        assert logout_response.status_code == 200
+        assert response.status_code == 401
+
+
+    @pytest.mark.django_db
+    def test_revocation_check_skips_database_for_unrevoked_tokens(self):
+        """Test that only Bloom filter hits are confirmed against the database"""
+
+        # Arrange
+        revoked = AccessToken.for_user(self.user)
+        helpers.revoke_token(revoked)
+
+        # Act
+        with self.assertNumQueries(0):
+            unrevoked = is_token_revoked('unknown-jti')
+        with self.assertNumQueries(1):
+            is_revoked = is_token_revoked(revoked['jti'])
+
+        # Assert
+        assert not unrevoked
+        assert is_revoked
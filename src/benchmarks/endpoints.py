@@ -0,0 +1,80 @@
+from django.db.models import Count
+
+from course.models import Course
+from lesson.models import StudentProgress
+
+
+# Router import path and the prefix it is mounted at below `/api`, per router name.
+ROUTERS = {
+    "authentication": ("authentication.api.router", ""),
+    "course": ("course.api.router", "/courses"),
+    "module": ("module.api.router", "/courses"),
+    "lesson": ("lesson.api.router", ""),
+    "lesson_content": ("lesson_content.api.router", "/lessons"),
+}
+
+# Endpoints to benchmark. `path` is relative to the router and formatted with the ids returned by
+# `get_benchmark_context`; `user` is the role the request is authenticated as.
+ENDPOINTS = [
+    {"router": "authentication", "method": "GET", "path": "/user", "user": "student"},
+    {"router": "course", "method": "GET", "path": "", "user": "student"},
+    {"router": "course", "method": "GET", "path": "?sortBy=latest", "user": "student"},
+    {"router": "course", "method": "GET", "path": "?sortBy=highest-rated", "user": "student"},
+    {"router": "course", "method": "GET", "path": "?sortBy=most-popular", "user": "student"},
+    {"router": "course", "method": "GET", "path": "?sortBy=enrolled", "user": "student"},
+    {"router": "course", "method": "GET", "path": "?sortBy=my", "user": "teacher"},
+    {"router": "course", "method": "GET", "path": "/stats", "user": "student"},
+    {"router": "course", "method": "GET", "path": "/enrolled", "user": "student"},
+    {"router": "course", "method": "GET", "path": "/{course_id}", "user": "student"},
+    {"router": "course", "method": "GET", "path": "/{course_id}/is-enrolled", "user": "student"},
+    {"router": "course", "method": "GET", "path": "/{course_id}/rating/distribution", "user": "student"},
+    {"router": "course", "method": "GET", "path": "/{course_id}/leaderboard", "user": "student"},
+    {"router": "course", "method": "GET", "path": "/{course_id}/funnel", "user": "teacher"},
+    {"router": "course", "method": "GET", "path": "/{course_id}/progress", "user": "teacher"},
+    {"router": "course", "method": "GET", "path": "/{course_id}/progress/distribution", "user": "teacher"},
+    {"router": "course", "method": "GET", "path": "/progress/general", "user": "teacher"},
+    {"router": "course", "method": "GET", "path": "/progress/enrolled", "user": "student"},
+    {"router": "course", "method": "GET", "path": "/teacher/progress", "user": "teacher"},
+    {"router": "module", "method": "GET", "path": "/{course_id}/modules", "user": "student"},
+    {"router": "module", "method": "GET", "path": "/{course_id}/modules/{module_id}", "user": "student"},
+    {"router": "lesson", "method": "GET", "path": "/modules/{module_id}/lessons", "user": "student"},
+    {"router": "lesson", "method": "GET", "path": "/lessons/{lesson_id}", "user": "student"},
+    {"router": "lesson", "method": "GET", "path": "/student-progress/{course_id}", "user": "student"},
+    {
+        "router": "lesson",
+        "method": "POST",
+        "path": "/student-progress",
+        "user": "student",
+        "json": {"lesson_id": "{lesson_id}", "introduction_completed": True},
+    },
+    {"router": "lesson_content", "method": "GET", "path": "/{lesson_id}/introduction", "user": "student"},
+]
+
+
+def get_endpoint_name(endpoint):
+    """Returns the name results are stored under, e.g. `GET /api/courses/{course_id}`."""
+
+    return f"{endpoint['method']} /api{ROUTERS[endpoint['router']][1]}{endpoint['path']}"
+
+
+def get_benchmark_context():
+    """Picks the public course with the most students and one of its students with progress to benchmark with.
+
+    Returns the ids to format endpoint paths with and the users to authenticate as, or None without such a course.
+    """
+
+    course = (
+        Course.objects.filter(is_public=True, first_lesson__isnull=False)
+        .annotate(student_count=Count("enrollments"))
+        .select_related("author", "first_lesson")
+        .order_by("-student_count", "id")
+        .first()
+    )
+    progress = course and StudentProgress.objects.filter(course=course).select_related("user").order_by("id").first()
+    if progress is None:
+        return None
+
+    return {
+        "ids": {"course_id": course.id, "module_id": course.first_lesson.module_id, "lesson_id": course.first_lesson_id},
+        "users": {"student": progress.user, "teacher": course.author},
+    }
@@ -0,0 +1,68 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks import runner
+from benchmarks.endpoints import ENDPOINTS, get_benchmark_context, get_endpoint_name
+
+DEFAULT_BASELINE = Path(__file__).resolve().parents[2] / "baseline.json"
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks the API endpoints against seeded data (see seed_scale), recording p50/p95 latency, query count "
+        "and peak memory per endpoint, and fails if any of them regressed compared with the stored baseline. "
+        "Progress endpoints that write are called too, so run it against a development database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=50, help="Timed calls per endpoint.")
+        parser.add_argument("--warmup", type=int, default=5, help="Untimed calls per endpoint before timing.")
+        parser.add_argument("--endpoint", action="append", dest="filters", help="Only benchmark endpoints whose name contains this (repeatable).")
+        parser.add_argument("--live-server", help="Base URL of a running server to benchmark over HTTP instead of in process.")
+        parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="Baseline JSON file to compare with.")
+        parser.add_argument("--save-baseline", action="store_true", help="Store the results as the new baseline instead of comparing.")
+        parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative growth of latency and memory, e.g. 0.2 for 20%%.")
+
+    def handle(self, *args, iterations=50, warmup=5, filters=None, live_server=None, baseline=DEFAULT_BASELINE,
+               save_baseline=False, threshold=0.2, **options):
+        if iterations < 1:
+            raise CommandError("--iterations must be at least 1.")
+
+        context = get_benchmark_context()
+        if context is None:
+            raise CommandError("No public course with student progress found. Seed the database with seed_scale first.")
+
+        endpoints = [endpoint for endpoint in ENDPOINTS if not filters or any(text in get_endpoint_name(endpoint) for text in filters)]
+        if not endpoints:
+            raise CommandError("No endpoint matches the given filters.")
+
+        previous = None if save_baseline else runner.load_baseline(baseline)
+
+        def log(name, result):
+            line = (
+                f"{name:<55} {result['status']}  p50 {result['p50_ms']:>8.2f} ms  p95 {result['p95_ms']:>8.2f} ms  "
+                f"{result['queries'] if result['queries'] is not None else '-':>4} queries  "
+                f"{result['peak_memory_kb'] if result['peak_memory_kb'] is not None else '-':>8} KiB"
+            )
+            self.stdout.write(self.style.ERROR(line) if result["status"] >= 400 else line)
+
+        results = runner.run_benchmarks(endpoints, context, iterations, warmup, base_url=live_server, log=log)
+
+        if save_baseline:
+            runner.save_baseline(baseline, results, iterations, live_server)
+            self.stdout.write(self.style.SUCCESS(f"Baseline saved to {baseline}."))
+            return
+
+        if previous is None:
+            self.stdout.write(f"No baseline at {baseline}. Store one with --save-baseline.")
+            return
+
+        regressions = runner.compare_results(results, previous, threshold)
+        if regressions:
+            for regression in regressions:
+                self.stdout.write(self.style.ERROR(regression))
+            raise CommandError(f"{len(regressions)} regressions compared with {baseline}.")
+
+        self.stdout.write(self.style.SUCCESS(f"No regressions compared with {baseline}."))
+
@@ -0,0 +1,192 @@
+"""
+Measures the latency, query count and peak memory of API endpoints and compares them with a stored baseline.
+
+Endpoints are called in-process through `ninja_extra.testing.TestClient`, which runs the endpoint with its
+authentication but without the middleware stack, or over HTTP against a running server. Over HTTP the query count
+is read from the `X-DB-Queries` header, which the server only sends in debug mode or to staff users, and peak
+memory cannot be measured.
+"""
+import json
+import math
+import time
+import tracemalloc
+import urllib.error
+import urllib.request
+from datetime import datetime, timezone
+
+from django.db import connection
+from django.utils.module_loading import import_string
+from ninja_extra.testing import TestClient
+from ninja_jwt.tokens import RefreshToken
+
+from learn_how_to_code.query_counter import QueryCounter
+
+from .endpoints import ROUTERS, get_endpoint_name
+
+# Latency changes smaller than this are noise, however large they are relative to the baseline.
+MIN_LATENCY_DELTA_MS = 0.5
+
+
+def percentile(values, percent):
+    """Returns the nearest-rank `percent` percentile of `values`."""
+
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(len(ordered) * percent / 100) - 1)]
+
+
+def format_request(endpoint, ids):
+    """Returns the path and JSON body of `endpoint` with `{name}` placeholders replaced by `ids`."""
+
+    path = endpoint["path"].format(**ids)
+    body = endpoint.get("json")
+    if body is not None:
+        body = {key: ids[value[1:-1]] if isinstance(value, str) and value[1:-1] in ids else value for key, value in body.items()}
+    return path, body
+
+
+def get_access_token(user):
+    return str(RefreshToken.for_user(user).access_token)
+
+
+def get_client_caller(endpoint, context, clients):
+    """Returns a function calling `endpoint` through a `TestClient` of its router and returning the status code."""
+
+    router_path, _ = ROUTERS[endpoint["router"]]
+    if router_path not in clients:
+        clients[router_path] = TestClient(import_string(router_path))
+
+    client = clients[router_path]
+    path, body = format_request(endpoint, context["ids"])
+    headers = {"Authorization": f"Bearer {get_access_token(context['users'][endpoint['user']])}"}
+    method = getattr(client, endpoint["method"].lower())
+
+    def call():
+        kwargs = {"json": body} if body is not None else {}
+        return method(path, headers=headers, **kwargs).status_code, None
+
+    return call
+
+
+def get_live_caller(endpoint, context, base_url):
+    """Returns a function calling `endpoint` on the server at `base_url` and returning the status code and the
+    query count reported by the server, if any."""
+
+    path, body = format_request(endpoint, context["ids"])
+    url = f"{base_url.rstrip('/')}/api{ROUTERS[endpoint['router']][1]}{path}"
+    headers = {"Authorization": f"Bearer {get_access_token(context['users'][endpoint['user']])}"}
+    data = None
+    if body is not None:
+        data = json.dumps(body).encode()
+        headers["Content-Type"] = "application/json"
+
+    def call():
+        request = urllib.request.Request(url, data=data, headers=headers, method=endpoint["method"])
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+        except urllib.error.HTTPError as error:
+            response = error
+        queries = response.headers.get("X-DB-Queries")
+        return response.status, int(queries) if queries is not None else None
+
+    return call
+
+
+def measure(call, iterations, warmup, in_process):
+    """Calls `call` `warmup` times, then `iterations` timed times, then once more to count queries and, in
+    process, trace memory. Returns the result of one endpoint."""
+
+    for _ in range(warmup):
+        call()
+
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        call()
+        durations.append(time.perf_counter() - start)
+
+    peak_memory = None
+    counter = QueryCounter()
+    if in_process:
+        tracemalloc.start()
+        try:
+            with counter.capture():
+                status, queries = call()
+            peak_memory = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        finally:
+            tracemalloc.stop()
+        queries = counter.count
+    else:
+        status, queries = call()
+
+    return {
+        "status": status,
+        "p50_ms": round(percentile(durations, 50) * 1000, 3),
+        "p95_ms": round(percentile(durations, 95) * 1000, 3),
+        "queries": queries,
+        "peak_memory_kb": peak_memory,
+    }
+
+
+def run_benchmarks(endpoints, context, iterations=50, warmup=5, base_url=None, log=None):
+    """Benchmarks `endpoints` in process, or against the server at `base_url`. Returns the results by endpoint name."""
+
+    log = log or (lambda name, result: None)
+    clients = {}
+    results = {}
+
+    for endpoint in endpoints:
+        if base_url:
+            call = get_live_caller(endpoint, context, base_url)
+        else:
+            call = get_client_caller(endpoint, context, clients)
+
+        name = get_endpoint_name(endpoint)
+        results[name] = measure(call, iterations, warmup, in_process=not base_url)
+        log(name, results[name])
+
+    return results
+
+
+def compare_results(results, baseline, threshold):
+    """Returns messages for the endpoints whose latency or peak memory grew by more than `threshold` (a fraction)
+    or whose query count grew at all compared with `baseline`."""
+
+    regressions = []
+
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+
+        for key in ("p50_ms", "p95_ms"):
+            if result[key] > previous[key] * (1 + threshold) and result[key] - previous[key] >= MIN_LATENCY_DELTA_MS:
+                regressions.append(f"{name}: {key} {previous[key]} -> {result[key]}")
+
+        if result["queries"] is not None and previous.get("queries") is not None and result["queries"] > previous["queries"]:
+            regressions.append(f"{name}: queries {previous['queries']} -> {result['queries']}")
+
+        if result["peak_memory_kb"] is not None and previous.get("peak_memory_kb") is not None:
+            if result["peak_memory_kb"] > previous["peak_memory_kb"] * (1 + threshold):
+                regressions.append(f"{name}: peak_memory_kb {previous['peak_memory_kb']} -> {result['peak_memory_kb']}")
+
+    return regressions
+
+
+def load_baseline(path):
+    """Returns the endpoint results stored in the baseline at `path`, or None if there is none."""
+
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())["endpoints"]
+
+
+def save_baseline(path, results, iterations, base_url=None):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "database": connection.vendor,
+        "mode": base_url or "in-process",
+        "iterations": iterations,
+        "endpoints": results,
+    }, indent=2))
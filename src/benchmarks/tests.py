@@ -0,0 +1,61 @@
+import io
+import json
+import tempfile
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import TestCase
+import pytest
+
+from .endpoints import ENDPOINTS, get_endpoint_name
+from .runner import compare_results
+
+
+class BenchmarkTestCase(TestCase):
+
+    @pytest.mark.django_db
+    def test_benchmark_endpoints_saves_and_compares_baseline(self):
+        """Test that every endpoint is benchmarked successfully against seeded data and compared with the baseline"""
+
+        # Arrange
+        call_command(
+            "seed_scale", "--users", "10", "--courses", "1", "--modules-per-course", "1", "--lessons-per-module", "2",
+            "--progress-density", "1", stdout=io.StringIO(), stderr=io.StringIO(),
+        )
+        arguments = ["--iterations", "2", "--warmup", "0", "--threshold", "100"]
+
+        with tempfile.TemporaryDirectory() as directory:
+            baseline = Path(directory) / "baseline.json"
+
+            # Act
+            call_command("benchmark_endpoints", *arguments, "--baseline", str(baseline), "--save-baseline", stdout=io.StringIO())
+            output = io.StringIO()
+            call_command("benchmark_endpoints", *arguments, "--baseline", str(baseline), stdout=output)
+            results = json.loads(baseline.read_text())["endpoints"]
+
+        # Assert
+        assert list(results) == [get_endpoint_name(endpoint) for endpoint in ENDPOINTS]
+        assert all(result["status"] < 400 for result in results.values())
+        assert all(result["queries"] is not None and result["peak_memory_kb"] for result in results.values())
+        assert "No regressions" in output.getvalue()
+
+
+    def test_compare_results(self):
+        """Test that slower, more query-heavy or more memory-hungry endpoints are reported as regressions"""
+
+        # Arrange
+        baseline = {
+            "GET /api/courses": {"p50_ms": 10.0, "p95_ms": 20.0, "queries": 5, "peak_memory_kb": 100.0},
+            "GET /api/user": {"p50_ms": 1.0, "p95_ms": 2.0, "queries": 1, "peak_memory_kb": 10.0},
+        }
+        results = {
+            "GET /api/courses": {"p50_ms": 11.0, "p95_ms": 30.0, "queries": 6, "peak_memory_kb": 101.0},
+            "GET /api/user": {"p50_ms": 1.2, "p95_ms": 2.1, "queries": 1, "peak_memory_kb": 10.0},
+            "GET /api/courses/stats": {"p50_ms": 5.0, "p95_ms": 5.0, "queries": 3, "peak_memory_kb": 20.0},
+        }
+
+        # Act
+        regressions = compare_results(results, baseline, threshold=0.2)
+
+        # Assert
+        assert regressions == ["GET /api/courses: p95_ms 20.0 -> 30.0", "GET /api/courses: queries 5 -> 6"]
@@ -1,17 +1,28 @@
+import base64
+import csv
+import json
+import logging
 import traceback
 from typing import List
-from ninja import Query, Router
-from django.db import transaction
-from django.db.models import Count, Avg
+from ninja import File, Query, Router, UploadedFile
+from django.db import connections, router as db_router, transaction
+from django.db.models import Count, Avg, F, Q, Value
+from django.db.models.functions import Coalesce
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, StreamingHttpResponse
+import numpy as np
 
 from authentication.models import User
 from lesson.models import Lesson, StudentProgress
 from lesson_content.models import LessonAssignment, LessonIntroduction, LessonQuiz, QuizOption
 from module.schemas import ModuleCreateSchema, ModuleResponseSchema
 
-from .models import Course, Rating
+from .models import Course, Enrollment, LeaderboardEntry, Rating
+from .transfer import export_course_ndjson, import_course_records, read_ndjson
 from module.models import Module
-from .schemas import CourseCreateSchema, CourseProgressSchema, CourseUpdateSchema, CourseDetailSchema, GeneralProgressStatsSchema, LessonProgressStatsSchema, RatingSchema, CourseDeatilUpdateSchema, CoursePreviewSchema, StatsSchema, EnrolledCourseProgressSchema
+from .schemas import CourseCreateSchema, CourseProgressSchema, CourseUpdateSchema, CourseDetailSchema, GeneralProgressStatsSchema, LessonProgressStatsSchema, RatingSchema, CourseDeatilUpdateSchema, CoursePreviewSchema, StatsSchema, EnrolledCourseProgressSchema, CourseScoreDistributionSchema, LeaderboardSchema, CourseFunnelSchema, RatingDistributionSchema, BulkEnrollSchema, BulkEnrollResultSchema, CourseCloneSchema, CourseImportResultSchema
+from learn_how_to_code import metrics
 from learn_how_to_code.schemas import MessageSchema
 import helpers
 
@@ -20,6 +31,25 @@ from decouple import config
 
 router = Router()
 
+logger = logging.getLogger(__name__)
+
+EXPORT_CHUNK_SIZE = 2000
+PROGRESS_STAT_FIELDS = [
+    "username",
+    "completed_lessons",
+    "started_assignments",
+    "started_quizzes",
+    "assignment_score_percentage",
+    "quiz_score_percentage",
+    "lesson_count",
+]
+SCORE_MAX = 100
+LEADERBOARD_MAX_LIMIT = 100
+PROGRESS_PAGE_SIZE = 100
+PROGRESS_PAGE_MAX_LIMIT = 1000
+BULK_ENROLL_MAX_USERS = 10000
+CLONE_BATCH_SIZE = 1000
+
     
 @router.post("", response={201: CourseDetailSchema, 400: MessageSchema, 500: MessageSchema}, auth=helpers.auth_required)
 def create_course(request, payload: CourseCreateSchema, generate: bool = Query(False)):
@@ -131,6 +161,26 @@ def get_enrolled_courses(request):
         return 500, {"message": "An unexpected error occurred while retrieving enrolled courses."}
 
 
+@router.post('/import', response={201: CourseImportResultSchema, 400: MessageSchema, 500: MessageSchema}, auth=helpers.auth_required)
+def import_course(request, file: UploadedFile = File(...), skip_existing: bool = False):
+    """Imports courses from an uploaded newline-delimited JSON file produced by the export endpoint or `manage.py export_course`."""
+
+    try:
+        if request.user.role != "TEACHER":
+            return 400, {"message": "Only teachers can create courses."}
+
+        with transaction.atomic():
+            course_ids = import_course_records(read_ndjson(file), request.user, skip_existing=skip_existing)
+
+        return 201, {"course_ids": course_ids}
+
+    except ValueError as e:
+        return 400, {"message": str(e)}
+    except Exception as e:
+        traceback.print_exc()
+        return 500, {"message": f"An unexpected error occurred while importing courses: {str(e)}"}
+
+
 @router.get('/{course_id}', response={200: CourseDetailSchema, 404: MessageSchema, 403: MessageSchema, 500: MessageSchema}, auth=helpers.auth_required)
 def get_public_course(request, course_id: int):
     """Retrieves details of a specific public course by `course_id`, or private course if the user is the author."""
@@ -162,10 +212,12 @@ def update_my_course(request, payload: CourseDeatilUpdateSchema, course_id: int)
         if payload.name and Course.objects.filter(name=payload.name).exclude(id=course_id).exists():
             return 400, {"message": "This course name is already taken by another course."}
         
-        for attr, value in payload.dict(exclude_unset=True).items():
+        changes = payload.dict(exclude_unset=True)
+        for attr, value in changes.items():
             setattr(course, attr, value)
 
-        course.save()
+        # Only the edited columns, so rating aggregates updated concurrently with F() are not written back stale.
+        course.save(update_fields=[*changes, "last_updated"])
 
         return 200, course.to_dict()
     except Course.DoesNotExist:
@@ -200,22 +252,20 @@ def enroll_student(request, course_id: int):
             if not course.is_public and course.author != request.user:
                 return 403, {"message": "You are not authorized to access this course."}
 
-            if request.user in course.students.all():
+            _, created = Enrollment.objects.get_or_create(course=course, user=request.user)
+            if not created:
                 return 400, {"message": "Already enrolled in this course."}
 
-            course.students.add(request.user)
-
-            first_module = course.modules.order_by('order').first()
-            if not first_module:
-                return 400, {"message": "The course does not contain any modules."}
-
-            first_lesson = first_module.lessons.order_by('order').first()
-            if not first_lesson:
-                return 400, {"message": "The first module does not contain any lessons."}
+            Lesson.ensure_sequence(course)
+            if not course.first_lesson_id:
+                if not course.modules.exists():
+                    return 400, {"message": "The course does not contain any modules."}
+                return 400, {"message": "The course does not contain any lessons."}
 
             StudentProgress.objects.get_or_create(
                 user=request.user,
-                lesson=first_lesson,
+                lesson_id=course.first_lesson_id,
+                course=course,
                 defaults={
                     "introduction_completed": False,
                     "quiz_score": None,
@@ -223,6 +273,7 @@ def enroll_student(request, course_id: int):
                     "lesson_completed": False,
                 },
             )
+            LeaderboardEntry.apply_delta(course.id, request.user.id, 0)
 
             return 200, {"message": "Successfully enrolled in the course and progress initialized for the first lesson."}
     except Course.DoesNotExist:
@@ -232,7 +283,110 @@ def enroll_student(request, course_id: int):
         return 500, {"message": "An unexpected error occurred during enrollment in the course."}
     
     
-@router.get('/{course_id}/is-enrolled', response={200: dict, 404: MessageSchema, 500: MessageSchema}, auth=helpers.auth_required)
+@router.post('/{course_id}/enroll/bulk', response={200: BulkEnrollResultSchema, 400: MessageSchema, 404: MessageSchema, 500: MessageSchema}, auth=helpers.auth_required)
+def enroll_students_bulk(request, course_id: int, payload: BulkEnrollSchema):
+    """Enrolls a roster of users, given by ids and/or emails, in a course authored by the authenticated user."""
+
+    try:
+        if len(payload.user_ids) + len(payload.emails) > BULK_ENROLL_MAX_USERS:
+            return 400, {"message": f"A roster can contain at most {BULK_ENROLL_MAX_USERS} users."}
+
+        with transaction.atomic():
+            course = Course.objects.get(id=course_id, author=request.user)
+
+            users = dict(
+                User.objects.filter(Q(id__in=payload.user_ids) | Q(email__in=payload.emails)).values_list("id", "email")
+            )
+            emails = set(users.values())
+            not_found = [str(user_id) for user_id in payload.user_ids if user_id not in users]
+            not_found += [email for email in payload.emails if email not in emails]
+
+            already_enrolled = set(
+                Enrollment.objects.filter(course=course, user_id__in=list(users)).values_list("user_id", flat=True)
+            )
+            new_user_ids = sorted(set(users) - already_enrolled)
+
+            Enrollment.objects.bulk_create(
+                [Enrollment(course=course, user_id=user_id) for user_id in new_user_ids],
+                ignore_conflicts=True,
+            )
+
+            Lesson.ensure_sequence(course)
+            if course.first_lesson_id:
+                StudentProgress.objects.bulk_create(
+                    [StudentProgress(user_id=user_id, lesson_id=course.first_lesson_id, course=course) for user_id in new_user_ids],
+                    ignore_conflicts=True,
+                )
+            LeaderboardEntry.objects.bulk_create(
+                [LeaderboardEntry(course=course, user_id=user_id) for user_id in new_user_ids],
+                ignore_conflicts=True,
+            )
+
+            return 200, {
+                "enrolled": new_user_ids,
+                "already_enrolled": sorted(already_enrolled),
+                "not_found": not_found,
+            }
+
+    except Course.DoesNotExist:
+        return 404, {"message": f"No course found with id {course_id} for the authenticated user."}
+    except Exception as e:
+        traceback.print_exc()
+        return 500, {"message": "An unexpected error occurred during bulk enrollment."}
+
+
+@router.post('/{course_id}/clone', response={201: CourseDetailSchema, 400: MessageSchema, 403: MessageSchema, 404: MessageSchema, 500: MessageSchema}, auth=helpers.auth_required)
+def clone_course_endpoint(request, course_id: int, payload: CourseCloneSchema):
+    """Copies a course with its modules, lessons and lesson content as a new private course of the authenticated teacher."""
+
+    try:
+        if request.user.role != "TEACHER":
+            return 400, {"message": "Only teachers can create courses."}
+
+        course = Course.objects.get(id=course_id)
+
+        if not course.is_public and course.author != request.user:
+            return 403, {"message": "You are not authorized to access this course."}
+
+        name = payload.name or f"{course.name} (copy)"
+        if Course.objects.filter(name=name).exists():
+            return 400, {"message": "A course with this name already exists."}
+
+        with transaction.atomic():
+            clone = clone_course(course, request.user, name)
+
+        return 201, clone.to_dict()
+
+    except Course.DoesNotExist:
+        return 404, {"message": f"No course found with id {course_id}."}
+    except Exception as e:
+        traceback.print_exc()
+        return 500, {"message": f"An unexpected error occurred while cloning the course: {str(e)}"}
+
+
+@router.get('/{course_id}/export', response={403: MessageSchema, 404: MessageSchema, 500: MessageSchema}, auth=helpers.auth_required)
+def export_course(request, course_id: int):
+    """Streams a course authored by the authenticated user as newline-delimited JSON records, see `import_course`."""
+
+    try:
+        course = Course.objects.get(id=course_id)
+
+        if course.author != request.user:
+            return 403, {"message": "You are not authorized to access this course."}
+
+        response = StreamingHttpResponse(export_course_ndjson([course.id]), content_type="application/x-ndjson")
+        response["Content-Disposition"] = f'attachment; filename="course-{course.id}.ndjson"'
+
+        return response
+
+    except Course.DoesNotExist:
+        return 404, {"message": f"No course found with id {course_id}."}
+    except Exception as e:
+        traceback.print_exc()
+        return 500, {"message": f"An unexpected error occurred: {str(e)}"}
+
+
+@router.get('/{course_id}/is-enrolled', response={200: dict, 404: MessageSchema, 500: MessageSchema}, auth=helpers.auth_claims)
 def is_student_enrolled(request, course_id: int):
     """Checks if the authenticated student is enrolled in a specific course."""
 
@@ -244,7 +398,7 @@ def is_student_enrolled(request, course_id: int):
         except Course.DoesNotExist:
             return 404, {"message": f"No course found with id {course_id}."}
 
-        is_enrolled = course.students.filter(id=user.id).exists()
+        is_enrolled = Enrollment.is_enrolled(course.id, user.id)
 
         return 200, {"is_enrolled": is_enrolled}
     except Exception as e:
@@ -259,25 +413,256 @@ def rate_course(request, course_id: int, payload: RatingSchema):
     try:
         course = Course.objects.get(id=course_id)
 
-        if not course.students.filter(id=request.user.id).exists():
+        if not Enrollment.is_enrolled(course.id, request.user.id):
             return 400, {"message": "Only enrolled users can rate this course."}
         
-        rating = Rating.objects.update_or_create(
-            course=course,
-            user=request.user,
-            defaults={'score': payload.score}
-        )
+        if payload.score not in Rating.SCORES:
+            return 400, {"message": f"Score must be between {Rating.SCORES[0]} and {Rating.SCORES[-1]}."}
+
+        with transaction.atomic():
+            # Locking the course serializes ratings of it, including first ratings, for which there is no
+            # rating row to lock yet.
+            Course.objects.select_for_update().only('id').get(id=course.id)
+            previous_score = (
+                Rating.objects
+                .filter(course=course, user=request.user)
+                .values_list('score', flat=True)
+                .first()
+            )
+
+            Rating.objects.update_or_create(
+                course=course,
+                user=request.user,
+                defaults={'score': payload.score}
+            )
 
-        Course.update_course_rating(course_id)
+            Course.apply_rating_change(course_id, previous_score, payload.score)
 
         return 200, {"message": "Course rated successfully."}
     except Course.DoesNotExist:
         return 404, {"message": f"No public course found with id {course_id}."}
     except Exception as e:
-        traceback.print_exc
+        logger.exception("Rating course %s failed", course_id)
         return 500, {"message": "An unexpected error occurred during the course rating process."}
     
 
+@router.get('/{course_id}/rating/distribution', response={200: RatingDistributionSchema, 403: MessageSchema, 404: MessageSchema, 500: MessageSchema}, auth=helpers.auth_required)
+def get_course_rating_distribution(request, course_id: int):
+    """Retrieves the average rating of a course and the number of ratings per score."""
+
+    try:
+        course = Course.objects.get(id=course_id)
+
+        if not course.is_public and course.author != request.user:
+            return 403, {"message": "You are not authorized to access this course."}
+
+        return 200, {
+            "course_id": course.id,
+            "rating": course.rating,
+            "rating_count": course.rating_count,
+            "histogram": course.get_rating_histogram(),
+        }
+
+    except Course.DoesNotExist:
+        return 404, {"message": f"No course found with id {course_id}."}
+    except Exception as e:
+        traceback.print_exc()
+        return 500, {"message": f"An unexpected error occurred: {str(e)}"}
+
+
+@router.get('/{course_id}/leaderboard', response={200: LeaderboardSchema, 400: MessageSchema, 403: MessageSchema, 404: MessageSchema, 500: MessageSchema}, auth=helpers.auth_required)
+def get_course_leaderboard(request, course_id: int, limit: int = 10, around: str = None, radius: int = 2):
+    """Retrieves the top `limit` users of a course. With param `around=me` also returns the user's rank and `radius` neighbours on each side."""
+
+    try:
+        if not 1 <= limit <= LEADERBOARD_MAX_LIMIT or not 0 <= radius <= LEADERBOARD_MAX_LIMIT:
+            return 400, {"message": f"Params `limit` and `radius` must be at most {LEADERBOARD_MAX_LIMIT}."}
+
+        if around not in (None, "me"):
+            return 400, {"message": "Param is not valid. Choose from: 'me'."}
+
+        course = Course.objects.filter(id=course_id).first()
+        if course is None:
+            return 404, {"message": f"No course found with id {course_id}."}
+
+        if not course.is_public and course.author_id != request.user.id and not Enrollment.is_enrolled(course_id, request.user.id):
+            return 403, {"message": "You are not authorized to access this course."}
+
+        entries = LeaderboardEntry.objects.filter(course_id=course_id).select_related('user')
+        top = [
+            {"rank": rank, "username": entry.user.username, "score": entry.score}
+            for rank, entry in enumerate(entries.order_by('-score', 'user_id')[:limit], start=1)
+        ]
+
+        neighbourhood = []
+        if around == "me":
+            me = entries.filter(user=request.user).first()
+
+            if me is not None:
+                rank = me.ranked_before().count() + 1
+                before = list(me.ranked_before().select_related('user').order_by('score', '-user_id')[:radius])[::-1]
+                after = list(me.ranked_after().select_related('user').order_by('-score', 'user_id')[:radius])
+
+                neighbourhood = [
+                    {"rank": rank - len(before) + offset, "username": entry.user.username, "score": entry.score}
+                    for offset, entry in enumerate([*before, me, *after])
+                ]
+
+        return 200, {"course_id": course_id, "top": top, "around": neighbourhood}
+
+    except Exception as e:
+        traceback.print_exc()
+        return 500, {"message": f"An unexpected error occurred: {str(e)}"}
+
+
+@router.get('/{course_id}/funnel', response={200: CourseFunnelSchema, 403: MessageSchema, 404: MessageSchema, 500: MessageSchema}, auth=helpers.auth_required)
+def get_course_funnel(request, course_id: int):
+    """Retrieves how many learners reached, started and completed each lesson of a course, in course order."""
+
+    try:
+        course = Course.objects.get(id=course_id)
+
+        if course.author != request.user:
+            return 403, {"message": "You are not authorized to access this course."}
+
+        cache_key = f"course-funnel:{course.id}:{course.content_version}"
+        steps = cache.get(cache_key)
+
+        if steps is None:
+            steps = compute_course_funnel(course.id)
+            cache.set(cache_key, steps, settings.FUNNEL_CACHE_TIMEOUT)
+
+        return 200, {"course_id": course.id, "content_version": course.content_version, "steps": steps}
+
+    except Course.DoesNotExist:
+        return 404, {"message": f"No course found with id {course_id}."}
+    except Exception as e:
+        traceback.print_exc()
+        return 500, {"message": f"An unexpected error occurred: {str(e)}"}
+
+
+def clone_course(course, author, name):
+    """Copies `course` level by level with one `bulk_create` per model, remapping ids from each level to the next.
+
+    Progress, ratings, enrollments and assignment statistics are not copied. Must run inside a transaction.
+    """
+
+    clone = Course.objects.create(
+        name=name,
+        description=course.description,
+        author=author,
+        image=course.image,
+        creator_state=course.creator_state,
+    )
+
+    modules = list(course.modules.order_by("id"))
+    copies = Module.objects.bulk_create(
+        [Module(course=clone, name=module.name, order=module.order, is_visible=module.is_visible) for module in modules]
+    )
+    module_ids = {module.id: copy.id for module, copy in zip(modules, copies)}
+
+    lessons = list(Lesson.objects.filter(course=course).order_by("id").values("id", "module_id", "topic", "order"))
+    copies = Lesson.objects.bulk_create(
+        [Lesson(course=clone, module_id=module_ids[lesson["module_id"]], topic=lesson["topic"], order=lesson["order"]) for lesson in lessons],
+        batch_size=CLONE_BATCH_SIZE,
+    )
+    lesson_ids = {lesson["id"]: copy.id for lesson, copy in zip(lessons, copies)}
+
+    LessonIntroduction.objects.bulk_create(
+        [
+            LessonIntroduction(lesson_id=lesson_ids[introduction["lesson_id"]], description=introduction["description"])
+            for introduction in LessonIntroduction.objects.filter(lesson__course=course).values("lesson_id", "description")
+        ],
+        batch_size=CLONE_BATCH_SIZE,
+    )
+
+    LessonAssignment.objects.bulk_create(
+        [
+            LessonAssignment(lesson_id=lesson_ids[assignment["lesson_id"]], instructions=assignment["instructions"])
+            for assignment in LessonAssignment.objects.filter(lesson__course=course).values("lesson_id", "instructions")
+        ],
+        batch_size=CLONE_BATCH_SIZE,
+    )
+
+    quizzes = list(LessonQuiz.objects.filter(lesson__course=course).order_by("id").values("id", "lesson_id", "question"))
+    copies = LessonQuiz.objects.bulk_create(
+        [LessonQuiz(lesson_id=lesson_ids[quiz["lesson_id"]], question=quiz["question"]) for quiz in quizzes],
+        batch_size=CLONE_BATCH_SIZE,
+    )
+    quiz_ids = {quiz["id"]: copy.id for quiz, copy in zip(quizzes, copies)}
+
+    QuizOption.objects.bulk_create(
+        [
+            QuizOption(question_id=quiz_ids[option["question_id"]], answer=option["answer"], is_correct=option["is_correct"])
+            for option in QuizOption.objects.filter(question__lesson__course=course).values("question_id", "answer", "is_correct")
+        ],
+        batch_size=CLONE_BATCH_SIZE,
+    )
+
+    return clone
+
+
+def get_analytics_connection():
+    """Returns the connection progress analytics read from, so raw SQL follows the `ReplicaRouter` like the ORM."""
+
+    return connections[db_router.db_for_read(StudentProgress)]
+
+
+def compute_course_funnel(course_id: int) -> list:
+    """Computes the lesson funnel in a single statement.
+
+    A learner has reached every lesson up to the furthest one they have progress in, so `reached`
+    is a running sum (from the last lesson backwards) of learners whose furthest lesson is that one.
+    """
+
+    connection = get_analytics_connection()
+    quote = connection.ops.quote_name
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            WITH ordered_lessons AS (
+                SELECT l.id AS lesson_id, l.topic AS lesson_topic,
+                    ROW_NUMBER() OVER (ORDER BY m.{quote("order")}, l.{quote("order")}, l.id) AS position
+                FROM {Lesson._meta.db_table} l
+                JOIN {Module._meta.db_table} m ON m.id = l.module_id
+                WHERE l.course_id = %s
+            ),
+            progress AS (
+                SELECT p.user_id, o.position,
+                    CASE WHEN p.introduction_completed OR p.quiz_score IS NOT NULL OR p.assignment_score IS NOT NULL THEN 1 ELSE 0 END AS started,
+                    CASE WHEN p.lesson_completed THEN 1 ELSE 0 END AS completed,
+                    MAX(o.position) OVER (PARTITION BY p.user_id) AS furthest
+                FROM {StudentProgress._meta.db_table} p
+                JOIN ordered_lessons o ON o.lesson_id = p.lesson_id
+                WHERE p.course_id = %s
+            ),
+            per_lesson AS (
+                SELECT position, SUM(started) AS started, SUM(completed) AS completed
+                FROM progress
+                GROUP BY position
+            ),
+            furthest AS (
+                SELECT furthest AS position, COUNT(DISTINCT user_id) AS learners
+                FROM progress
+                GROUP BY furthest
+            )
+            SELECT o.lesson_id, o.lesson_topic, o.position,
+                COALESCE(SUM(f.learners) OVER (ORDER BY o.position DESC), 0) AS reached,
+                COALESCE(pl.started, 0) AS started,
+                COALESCE(pl.completed, 0) AS completed
+            FROM ordered_lessons o
+            LEFT JOIN per_lesson pl ON pl.position = o.position
+            LEFT JOIN furthest f ON f.position = o.position
+            ORDER BY o.position
+            """,
+            [course_id, course_id],
+        )
+        columns = [column[0] for column in cursor.description]
+
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
 @router.put("/{course_id}", response={200: CourseDetailSchema, 404: MessageSchema, 400: MessageSchema, 500: MessageSchema}, auth=helpers.auth_required)
 def update_course(request, course_id: int, payload: CourseUpdateSchema):
     """Updates an entire course."""
@@ -289,7 +674,7 @@ def update_course(request, course_id: int, payload: CourseUpdateSchema):
         course.image = payload.image
         course.is_public = payload.is_public
         course.creator_state = payload.creator_state
-        course.save()
+        course.save(update_fields=["name", "description", "image", "is_public", "creator_state", "last_updated"])
 
         course.modules.all().delete()
 
@@ -348,39 +733,22 @@ def update_course(request, course_id: int, payload: CourseUpdateSchema):
         return 500, {"message": f"An error occurred: {str(e)}"}
 
 
-@router.get("/progress/general", response={200: list[GeneralProgressStatsSchema], 500: MessageSchema}, auth=helpers.auth_required)
-def get_general_progress_stats(request):
-    """Retrieves progress statistics for all students across all courses."""
+@router.get("/progress/general", response={200: list[GeneralProgressStatsSchema], 400: MessageSchema, 500: MessageSchema}, auth=helpers.auth_required)
+def get_general_progress_stats(request, response: HttpResponse, limit: int = PROGRESS_PAGE_SIZE, cursor: str = None, sort: str = "username", username: str = None):
+    """Retrieves a page of progress statistics for all students across all courses.
+
+    Sort by any stat with `sort` (prefix with `-` for descending), filter with a `username` prefix and fetch
+    the next page by passing back the `X-Next-Cursor` response header as `cursor`.
+    """
 
     try:
-        users = User.objects.all()
-
-        stats = []
-        for user in users:
-            progress = StudentProgress.objects.filter(user=user)
-            lessons = Lesson.objects.filter(studentprogress__user=user).distinct()
-
-            completed_lessons = progress.filter(lesson_completed=True).count()
-            started_assignments = progress.exclude(assignment_score__isnull=True).count()
-            started_quizzes = progress.exclude(quiz_score__isnull=True).count()
-
-            assignment_scores = progress.filter(assignment_score__isnull=False).aggregate(avg_score=Avg('assignment_score'))['avg_score'] or 0
-            quiz_scores = progress.filter(quiz_score__isnull=False).aggregate(avg_score=Avg('quiz_score'))['avg_score'] or 0
-
-            stats.append(
-                GeneralProgressStatsSchema(
-                    username=user.username,
-                    completed_lessons=completed_lessons,
-                    started_assignments=started_assignments,
-                    started_quizzes=started_quizzes,
-                    assignment_score_percentage=assignment_scores,
-                    quiz_score_percentage=quiz_scores,
-                    lesson_count=progress.count(),
-                )
-            )
+        users = get_progress_stats_queryset().annotate(lesson_count=F("progress_count"))
+        stats = paginate_progress_stats(users, response, limit, cursor, sort, username)
 
         return 200, stats
 
+    except ValueError as e:
+        return 400, {"message": str(e)}
     except Exception as e:
         traceback.print_exc()
         return 500, {"message": f"An unexpected error occurred: {str(e)}"}
@@ -401,32 +769,12 @@ def get_progress_in_enrolled_courses(request):
         response_data = []
 
         for course in enrolled_courses:
-            lessons = Lesson.objects.filter(module__course=course)
-
-            users = User.objects.filter(studentprogress__lesson__in=lessons).distinct()
-
-            users_progress = []
-            for enrolled_user in users:
-                progress = StudentProgress.objects.filter(user=enrolled_user, lesson__in=lessons)
-
-                completed_lessons = progress.filter(lesson_completed=True).count()
-                started_assignments = progress.exclude(assignment_score__isnull=True).count()
-                started_quizzes = progress.exclude(quiz_score__isnull=True).count()
-
-                assignment_scores = progress.filter(assignment_score__isnull=False).aggregate(avg_score=Avg('assignment_score'))['avg_score'] or 0
-                quiz_scores = progress.filter(quiz_score__isnull=False).aggregate(avg_score=Avg('quiz_score'))['avg_score'] or 0
-
-                users_progress.append(
-                    GeneralProgressStatsSchema(
-                        username=enrolled_user.username,
-                        completed_lessons=completed_lessons,
-                        started_assignments=started_assignments,
-                        started_quizzes=started_quizzes,
-                        assignment_score_percentage=assignment_scores,
-                        quiz_score_percentage=quiz_scores,
-                        lesson_count=progress.count(),
-                    )
-                )
+            users_progress = list(
+                get_progress_stats_queryset(course.id)
+                .annotate(lesson_count=F("progress_count"))
+                .order_by("username")
+                .values(*PROGRESS_STAT_FIELDS)
+            )
 
             response_data.append(
                 EnrolledCourseProgressSchema(
@@ -459,7 +807,7 @@ def get_teacher_course_progress(request):
         response_data = []
 
         for course in courses:
-            lessons = Lesson.objects.filter(module__course=course)
+            lessons = Lesson.objects.filter(course=course)
 
             lesson_progress = []
             for lesson in lessons:
@@ -499,50 +847,280 @@ def get_teacher_course_progress(request):
         return 500, {"message": f"An unexpected error occurred: {str(e)}"}
 
 
-@router.get("/{course_id}/progress", response={200: list[GeneralProgressStatsSchema], 404: MessageSchema, 500: MessageSchema}, auth=helpers.auth_required)
-def get_course_progress_stats(request, course_id: int):
-    """Retrieves progress statistics for all students in a specific course."""
+@router.get("/{course_id}/progress", response={200: list[GeneralProgressStatsSchema], 400: MessageSchema, 404: MessageSchema, 500: MessageSchema}, auth=helpers.auth_required)
+def get_course_progress_stats(request, course_id: int, response: HttpResponse, limit: int = PROGRESS_PAGE_SIZE, cursor: str = None, sort: str = "username", username: str = None):
+    """Retrieves a page of progress statistics for all students in a specific course.
+
+    Accepts the same `limit`, `cursor`, `sort` and `username` params as `/progress/general`.
+    """
 
     try:
-        modules = Module.objects.filter(course_id=course_id)
-        lessons = Lesson.objects.filter(module__in=modules)
+        lesson_count = Lesson.objects.filter(course_id=course_id).count()
 
-        if not lessons.exists():
+        if not lesson_count:
             return 404, {"message": f"No lessons found for course {course_id}."}
 
-        users = User.objects.filter(studentprogress__lesson__in=lessons).distinct()
+        users = get_progress_stats_queryset(course_id).annotate(lesson_count=Value(lesson_count))
+        stats = paginate_progress_stats(users, response, limit, cursor, sort, username)
 
-        stats = []
-        for user in users:
-            progress = StudentProgress.objects.filter(user=user, lesson__in=lessons)
+        return 200, stats
 
-            completed_lessons = progress.filter(lesson_completed=True).count()
-            started_assignments = progress.exclude(assignment_score__isnull=True).count()
-            started_quizzes = progress.exclude(quiz_score__isnull=True).count()
+    except ValueError as e:
+        return 400, {"message": str(e)}
+    except Exception as e:
+        traceback.print_exc()
+        return 500, {"message": f"An unexpected error occurred: {str(e)}"}
 
-            assignment_scores = progress.filter(assignment_score__isnull=False).aggregate(avg_score=Avg('assignment_score'))['avg_score'] or 0
-            quiz_scores = progress.filter(quiz_score__isnull=False).aggregate(avg_score=Avg('quiz_score'))['avg_score'] or 0
 
-            stats.append(
-                GeneralProgressStatsSchema(
-                    username=user.username,
-                    completed_lessons=completed_lessons,
-                    started_assignments=started_assignments,
-                    started_quizzes=started_quizzes,
-                    assignment_score_percentage=assignment_scores,
-                    quiz_score_percentage=quiz_scores,
-                    lesson_count=lessons.count(),
+@router.get("/{course_id}/progress/export", response={400: MessageSchema, 404: MessageSchema, 500: MessageSchema}, auth=helpers.auth_required)
+def export_course_progress_stats(request, course_id: int, format: str = "csv"):
+    """Streams progress statistics for all students in a specific course as `format=csv` or `format=ndjson`."""
 
-                )
-            )
+    try:
+        if format not in ("csv", "ndjson"):
+            return 400, {"message": "Param is not valid. Choose from: 'csv', 'ndjson'."}
 
-        return 200, stats
+        if not Course.objects.filter(id=course_id).exists():
+            return 404, {"message": f"No course found with id {course_id}."}
+
+        lesson_count = Lesson.objects.filter(course_id=course_id).count()
+
+        rows = (
+            get_progress_stats_queryset(course_id)
+            .annotate(lesson_count=Value(lesson_count))
+            .order_by("username")
+            .values_list(*PROGRESS_STAT_FIELDS)
+            .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        )
+
+        if format == "csv":
+            content, content_type = stream_csv(rows), "text/csv"
+        else:
+            content, content_type = stream_ndjson(rows), "application/x-ndjson"
+
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="course-{course_id}-progress.{format}"'
+
+        return response
+
+    except Exception as e:
+        traceback.print_exc()
+        return 500, {"message": f"An unexpected error occurred: {str(e)}"}
+
+
+@router.get("/{course_id}/progress/distribution", response={200: CourseScoreDistributionSchema, 400: MessageSchema, 404: MessageSchema, 500: MessageSchema}, auth=helpers.auth_required)
+def get_course_score_distribution(request, course_id: int, buckets: int = 10):
+    """Retrieves quiz and assignment score histograms and p50/p90 for every lesson in a specific course."""
+
+    try:
+        if not 1 <= buckets <= SCORE_MAX:
+            return 400, {"message": f"Param is not valid. Number of buckets must be between 1 and {SCORE_MAX}."}
+
+        if not Course.objects.filter(id=course_id).exists():
+            return 404, {"message": f"No course found with id {course_id}."}
+
+        lessons = list(
+            Lesson.objects.filter(course_id=course_id)
+            .order_by("module__order", "order")
+            .values_list("id", "topic")
+        )
+
+        if get_analytics_connection().vendor == "postgresql":
+            histograms, percentiles = compute_score_distribution_sql(course_id, buckets)
+        else:
+            histograms, percentiles = compute_score_distribution_numpy(course_id, [lesson_id for lesson_id, _ in lessons], buckets)
+
+        def distribution(lesson_id, field):
+            p50, p90 = percentiles.get((lesson_id, field), (None, None))
+            return {
+                "histogram": histograms.get((lesson_id, field), [0] * buckets),
+                "p50": p50,
+                "p90": p90,
+            }
+
+        return 200, {
+            "course_id": course_id,
+            "bucket_edges": np.linspace(0, SCORE_MAX, buckets + 1).tolist(),
+            "lessons": [
+                {
+                    "lesson_id": lesson_id,
+                    "lesson_topic": topic,
+                    "quiz": distribution(lesson_id, "quiz_score"),
+                    "assignment": distribution(lesson_id, "assignment_score"),
+                }
+                for lesson_id, topic in lessons
+            ],
+        }
 
     except Exception as e:
         traceback.print_exc()
         return 500, {"message": f"An unexpected error occurred: {str(e)}"}
 
 
+def compute_score_distribution_sql(course_id: int, buckets: int):
+    """Computes per-lesson histograms with `width_bucket` and percentiles with `percentile_cont` in Postgres."""
+
+    course_filter = f"""
+        FROM {StudentProgress._meta.db_table} p
+        WHERE p.course_id = %s
+    """
+
+    histograms = {}
+    percentiles = {}
+
+    with get_analytics_connection().cursor() as cursor:
+        for field in ("quiz_score", "assignment_score"):
+            cursor.execute(
+                f"""
+                SELECT p.lesson_id, LEAST(GREATEST(width_bucket(p.{field}, 0, %s, %s), 1), %s) AS bucket, COUNT(*)
+                {course_filter} AND p.{field} IS NOT NULL
+                GROUP BY p.lesson_id, bucket
+                """,
+                [SCORE_MAX, buckets, buckets, course_id],
+            )
+            for lesson_id, bucket, count in cursor.fetchall():
+                histograms.setdefault((lesson_id, field), [0] * buckets)[bucket - 1] = count
+
+        cursor.execute(
+            f"""
+            SELECT p.lesson_id,
+                percentile_cont(0.5) WITHIN GROUP (ORDER BY p.quiz_score),
+                percentile_cont(0.9) WITHIN GROUP (ORDER BY p.quiz_score),
+                percentile_cont(0.5) WITHIN GROUP (ORDER BY p.assignment_score),
+                percentile_cont(0.9) WITHIN GROUP (ORDER BY p.assignment_score)
+            {course_filter}
+            GROUP BY p.lesson_id
+            """,
+            [course_id],
+        )
+        for lesson_id, quiz_p50, quiz_p90, assignment_p50, assignment_p90 in cursor.fetchall():
+            percentiles[(lesson_id, "quiz_score")] = (quiz_p50, quiz_p90)
+            percentiles[(lesson_id, "assignment_score")] = (assignment_p50, assignment_p90)
+
+    return histograms, percentiles
+
+
+def compute_score_distribution_numpy(course_id: int, lesson_ids: List[int], buckets: int):
+    """Computes the same distribution as `compute_score_distribution_sql` with NumPy, for databases without `width_bucket`."""
+
+    histograms = {}
+    percentiles = {}
+
+    rows = list(
+        StudentProgress.objects.filter(course_id=course_id)
+        .order_by("lesson_id")
+        .values_list("lesson_id", "quiz_score", "assignment_score")
+    )
+
+    if not rows or not lesson_ids:
+        return histograms, percentiles
+
+    data = np.array(rows, dtype=float)
+    sorted_lesson_ids = np.sort(lesson_ids)
+    lesson_index = np.searchsorted(sorted_lesson_ids, data[:, 0])
+    group_starts = np.flatnonzero(np.diff(data[:, 0])) + 1
+
+    for column, field in ((1, "quiz_score"), (2, "assignment_score")):
+        scores = data[:, column]
+        present = ~np.isnan(scores)
+        bucket = np.clip((scores[present] * buckets // SCORE_MAX).astype(np.int64), 0, buckets - 1)
+        counts = np.bincount(lesson_index[present] * buckets + bucket, minlength=len(lesson_ids) * buckets)
+
+        for lesson_id, histogram in zip(sorted_lesson_ids, counts.reshape(len(lesson_ids), buckets)):
+            if histogram.any():
+                histograms[(int(lesson_id), field)] = histogram.tolist()
+
+        for lesson_id, group_scores in zip(data[np.r_[0, group_starts], 0], np.split(scores, group_starts)):
+            group_scores = group_scores[~np.isnan(group_scores)]
+            if group_scores.size:
+                p50, p90 = np.percentile(group_scores, [50, 90])
+                percentiles[(int(lesson_id), field)] = (float(p50), float(p90))
+
+    return histograms, percentiles
+
+
+class EchoBuffer:
+    """File-like object that hands back whatever is written to it, so `csv.writer` can feed a generator."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    """Yields CSV lines for the exported progress rows."""
+
+    writer = csv.writer(EchoBuffer())
+    yield writer.writerow(PROGRESS_STAT_FIELDS)
+
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_ndjson(rows):
+    """Yields one JSON object per line for the exported progress rows."""
+
+    for row in rows:
+        yield json.dumps(dict(zip(PROGRESS_STAT_FIELDS, row))) + "\n"
+
+
+def paginate_progress_stats(users, response: HttpResponse, limit: int, cursor: str, sort: str, username: str) -> list:
+    """Applies the username prefix filter, sorting and keyset pagination to annotated users.
+
+    The cursor holds the sort value and id of the last row, so every page is a bounded index/HAVING
+    range instead of an OFFSET. The cursor of the following page is set in the `X-Next-Cursor` header.
+    """
+
+    field = sort.lstrip("-")
+    descending = sort.startswith("-")
+
+    if field not in PROGRESS_STAT_FIELDS:
+        raise ValueError(f"Param is not valid. Choose `sort` from: {', '.join(PROGRESS_STAT_FIELDS)}.")
+
+    if not 1 <= limit <= PROGRESS_PAGE_MAX_LIMIT:
+        raise ValueError(f"Param is not valid. `limit` must be between 1 and {PROGRESS_PAGE_MAX_LIMIT}.")
+
+    if username:
+        users = users.filter(username__startswith=username)
+
+    if cursor:
+        try:
+            last_value, last_id = json.loads(base64.urlsafe_b64decode(cursor))
+        except (ValueError, TypeError):
+            raise ValueError("Param is not valid. Unknown `cursor`.")
+
+        lookup = "lt" if descending else "gt"
+        users = users.filter(Q(**{f"{field}__{lookup}": last_value}) | Q(**{field: last_value, f"id__{lookup}": last_id}))
+
+    users = users.order_by(*((f"-{field}", "-id") if descending else (field, "id")))
+    page = list(users.values("id", *PROGRESS_STAT_FIELDS)[:limit + 1])
+
+    if len(page) > limit:
+        page = page[:limit]
+        next_cursor = json.dumps([page[-1][field], page[-1]["id"]]).encode()
+        response["X-Next-Cursor"] = base64.urlsafe_b64encode(next_cursor).decode()
+
+    return page
+
+
+def get_progress_stats_queryset(course_id: int = None):
+    """Annotates users with their progress statistics, optionally limited to lessons of `course_id`."""
+
+    users = User.objects.all()
+
+    if course_id is not None:
+        users = users.filter(studentprogress__course_id=course_id)
+
+    return users.annotate(
+        completed_lessons=Count("studentprogress", filter=Q(studentprogress__lesson_completed=True)),
+        started_assignments=Count("studentprogress__assignment_score"),
+        started_quizzes=Count("studentprogress__quiz_score"),
+        assignment_score_percentage=Coalesce(Avg("studentprogress__assignment_score"), Value(0.0)),
+        quiz_score_percentage=Coalesce(Avg("studentprogress__quiz_score"), Value(0.0)),
+        progress_count=Count("studentprogress"),
+    )
+
+
+@metrics.observe_llm_call
 def generate_modules(course_name: str, course_description: str, language: str = "polish") -> List[ModuleCreateSchema]:
     """Generates module for course."""
 
@@ -569,6 +1147,7 @@ def generate_modules(course_name: str, course_description: str, language: str =
             response_format=ModuleResponseSchema,
         )
 
+        metrics.record_llm_usage("generate_modules", completion)
         parsed_response = completion.choices[0].message.parsed
 
         return parsed_response.modules
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from course.query_plans import SEQUENTIAL_SCAN_PATTERNS, find_sequential_scans, get_hot_queries, get_sample_ids
+
+
+class Command(BaseCommand):
+    help = "Runs EXPLAIN on the hot course, lesson and progress queries against seeded data and fails if any of them does a sequential scan."
+
+    def handle(self, *args, **options):
+        if connection.vendor not in SEQUENTIAL_SCAN_PATTERNS:
+            raise CommandError(f"Query plans cannot be checked on {connection.vendor}. Use PostgreSQL or SQLite.")
+
+        sample_ids = get_sample_ids()
+        if sample_ids is None:
+            raise CommandError("No student progress found. Seed the database before checking query plans.")
+
+        failures = []
+        for name, queryset, postgres_only in get_hot_queries(**sample_ids):
+            if postgres_only and connection.vendor != "postgresql":
+                self.stdout.write(f"{name}: skipped on {connection.vendor}")
+                continue
+
+            tables = find_sequential_scans(queryset)
+            if tables:
+                failures.append(f"{name} ({', '.join(tables)})")
+                self.stdout.write(self.style.ERROR(f"{name}: sequential scan on {', '.join(tables)}"))
+            else:
+                self.stdout.write(f"{name}: ok")
+
+        if failures:
+            raise CommandError(f"Sequential scans found in: {'; '.join(failures)}")
+
+        self.stdout.write(self.style.SUCCESS("No sequential scans found."))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from course.models import Course, LeaderboardEntry
+
+
+class Command(BaseCommand):
+    help = "Recomputes leaderboard scores from student progress and repairs entries that drifted. Meant to run periodically (e.g. from cron)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--course", type=int, action="append", dest="course_ids", help="Only compact the given course id (repeatable).")
+
+    def handle(self, *args, course_ids=None, **options):
+        course_ids = course_ids or Course.objects.order_by("id").values_list("id", flat=True)
+
+        repaired = 0
+        for course_id in course_ids:
+            repaired += LeaderboardEntry.compact(course_id)
+
+        self.stdout.write(self.style.SUCCESS(f"Leaderboard compacted, {repaired} entries repaired."))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from course.models import Course
+from course.transfer import export_course_ndjson
+
+
+class Command(BaseCommand):
+    help = "Exports courses with their modules, lessons and lesson content as newline-delimited JSON records."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--course", type=int, action="append", dest="course_ids", help="Only export the given course id (repeatable).")
+        parser.add_argument("--output", help="File to write to. Defaults to stdout.")
+
+    def handle(self, *args, course_ids=None, output=None, **options):
+        course_ids = course_ids or list(Course.objects.order_by("id").values_list("id", flat=True))
+
+        if output:
+            with open(output, "w", encoding="utf-8") as file:
+                file.writelines(export_course_ndjson(course_ids))
+            self.stderr.write(self.style.SUCCESS(f"Courses exported to {output}."))
+        else:
+            self.stdout.ending = ""
+            for line in export_course_ndjson(course_ids):
+                self.stdout.write(line)
@@ -0,0 +1,35 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from authentication.models import User
+from course.transfer import import_course_records, read_ndjson
+
+
+class Command(BaseCommand):
+    help = "Imports courses from newline-delimited JSON records produced by export_course, in a single transaction."
+
+    def add_arguments(self, parser):
+        parser.add_argument("input", nargs="?", help="File to read from. Defaults to stdin.")
+        parser.add_argument("--author", required=True, help="Username of the user who becomes the author of the imported courses.")
+        parser.add_argument("--skip-existing", action="store_true", help="Skip courses whose name is already taken instead of failing.")
+
+    def handle(self, *args, input=None, author=None, skip_existing=False, **options):
+        try:
+            author = User.objects.get(username=author)
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {author!r}.")
+
+        file = open(input, encoding="utf-8") if input else sys.stdin
+
+        try:
+            with transaction.atomic():
+                course_ids = import_course_records(read_ndjson(file), author, skip_existing=skip_existing)
+        except ValueError as e:
+            raise CommandError(str(e))
+        finally:
+            if input:
+                file.close()
+
+        self.stdout.write(self.style.SUCCESS(f"Imported {len(course_ids)} courses."))
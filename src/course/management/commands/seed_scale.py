@@ -0,0 +1,58 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from course.seeding import BATCH_SIZE, delete_seeded_data, seed_scale
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates a large, deterministic dataset of users, courses, modules, lessons, lesson content, enrollments, "
+        "progress, leaderboard entries and ratings for load and query-plan testing."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000, help="Number of users, about 5%% of them teachers.")
+        parser.add_argument("--courses", type=int, default=100, help="Number of courses.")
+        parser.add_argument("--modules-per-course", type=int, default=5)
+        parser.add_argument("--lessons-per-module", type=int, default=5)
+        parser.add_argument("--enrollments-per-user", type=int, default=3, help="Courses each student is enrolled in.")
+        parser.add_argument(
+            "--progress-density", type=float, default=0.5,
+            help="Average share of an enrolled course's lessons a student has progress on, between 0 and 1.",
+        )
+        parser.add_argument("--seed", type=int, default=0, help="Random seed. The same seed always generates the same data.")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+        parser.add_argument("--no-content", action="store_false", dest="with_content", help="Skip introductions, quizzes and assignments.")
+        parser.add_argument("--flush", action="store_true", help="Delete previously seeded data first.")
+
+    def handle(self, *args, **options):
+        if options["users"] < 1 or options["courses"] < 1:
+            raise CommandError("At least one user and one course are needed.")
+        if not 0 <= options["progress_density"] <= 1:
+            raise CommandError("--progress-density must be between 0 and 1.")
+
+        start = time.perf_counter()
+
+        with transaction.atomic():
+            if options["flush"]:
+                self.stderr.write("Deleting previously seeded data")
+                delete_seeded_data()
+
+            counts = seed_scale(
+                users=options["users"],
+                courses=options["courses"],
+                modules_per_course=options["modules_per_course"],
+                lessons_per_module=options["lessons_per_module"],
+                progress_density=options["progress_density"],
+                enrollments_per_user=options["enrollments_per_user"],
+                with_content=options["with_content"],
+                seed=options["seed"],
+                batch_size=options["batch_size"],
+                log=self.stderr.write,
+            )
+
+        for model, count in counts.items():
+            self.stdout.write(f"{model}: {count}")
+        self.stderr.write(self.style.SUCCESS(f"Seeded in {time.perf_counter() - start:.1f} s."))
@@ -0,0 +1,86 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:18
+
+from itertools import islice
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_leaderboard(apps, schema_editor):
+    StudentProgress = apps.get_model("lesson", "StudentProgress")
+    LeaderboardEntry = apps.get_model("course", "LeaderboardEntry")
+
+    totals = (
+        StudentProgress.objects.values(
+            course_id=F("lesson__module__course_id"), user_ref=F("user_id")
+        )
+        .annotate(
+            points=Sum(
+                Coalesce("quiz_score", Value(0.0))
+                + Coalesce("assignment_score", Value(0.0))
+            )
+        )
+        .order_by()
+    )
+
+    rows = totals.iterator(chunk_size=2000)
+    while batch := list(islice(rows, 2000)):
+        LeaderboardEntry.objects.bulk_create(
+            LeaderboardEntry(
+                course_id=row["course_id"], user_id=row["user_ref"], score=row["points"]
+            )
+            for row in batch
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("course", "0007_course_image"),
+        ("lesson", "0003_studentprogress"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LeaderboardEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("score", models.FloatField(default=0.0)),
+                (
+                    "course",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="leaderboard",
+                        to="course.course",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["course", "-score", "user"], name="leaderboard_rank_idx"
+                    )
+                ],
+                "unique_together": {("course", "user")},
+            },
+        ),
+        migrations.RunPython(populate_leaderboard, migrations.RunPython.noop),
+    ]
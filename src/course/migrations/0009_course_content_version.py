@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("course", "0008_leaderboardentry"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="course",
+            name="content_version",
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
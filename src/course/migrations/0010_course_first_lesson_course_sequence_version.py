@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("course", "0009_course_content_version"),
+        ("lesson", "0005_lesson_next_lesson_lesson_position"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="course",
+            name="first_lesson",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="lesson.lesson",
+            ),
+        ),
+        migrations.AddField(
+            model_name="course",
+            name="sequence_version",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
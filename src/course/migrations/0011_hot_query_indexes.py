@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:29
+
+from django.conf import settings
+from django.db import migrations, models
+
+from learn_how_to_code.migration_operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("course", "0010_course_first_lesson_course_sequence_version"),
+        ("lesson", "0006_course_denormalization"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="course",
+            index=models.Index(
+                fields=["is_public", "-last_updated"], name="course_public_updated_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="course",
+            index=models.Index(
+                fields=["is_public", "-rating"], name="course_public_rating_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="course",
+            index=models.Index(
+                fields=["author", "-last_updated"], name="course_author_updated_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:31
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def populate_rating_aggregates(apps, schema_editor):
+    Course = apps.get_model("course", "Course")
+    Rating = apps.get_model("course", "Rating")
+
+    totals = (
+        Rating.objects.values("course_id")
+        .annotate(
+            rating_sum=Sum("score"),
+            rating_count=Count("id"),
+            **{
+                f"rating_count_{score}": Count("id", filter=Q(score=score))
+                for score in range(1, 6)
+            },
+        )
+        .order_by()
+    )
+
+    for row in totals.iterator():
+        course_id = row.pop("course_id")
+        row["rating"] = row["rating_sum"] / row["rating_count"]
+        Course.objects.filter(id=course_id).update(**row)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("course", "0011_hot_query_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="course",
+            name="rating_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="course",
+            name="rating_count_1",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="course",
+            name="rating_count_2",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="course",
+            name="rating_count_3",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="course",
+            name="rating_count_4",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="course",
+            name="rating_count_5",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="course",
+            name="rating_sum",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_rating_aggregates, migrations.RunPython.noop),
+    ]
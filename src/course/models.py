@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, F, FloatField, Q, Sum, Value
+from django.db.models.functions import Cast, Coalesce
 
 from authentication.models import User
 
@@ -10,26 +12,75 @@ class Course(models.Model):
     last_updated = models.DateTimeField(auto_now=True)
     is_public = models.BooleanField(default=False)
     rating = models.FloatField(default=0.0)
-    students = models.ManyToManyField(User, related_name='enrolled_courses', blank=True)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_count_1 = models.PositiveIntegerField(default=0)
+    rating_count_2 = models.PositiveIntegerField(default=0)
+    rating_count_3 = models.PositiveIntegerField(default=0)
+    rating_count_4 = models.PositiveIntegerField(default=0)
+    rating_count_5 = models.PositiveIntegerField(default=0)
+    students = models.ManyToManyField(User, through='Enrollment', related_name='enrolled_courses', blank=True)
     creator_state = models.CharField(max_length=60, default='update')
     image = models.CharField(max_length=255, default='')
+    content_version = models.PositiveIntegerField(default=1)
+    sequence_version = models.PositiveIntegerField(default=0)
+    first_lesson = models.ForeignKey('lesson.Lesson', null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['is_public', '-last_updated'], name='course_public_updated_idx'),
+            models.Index(fields=['is_public', '-rating'], name='course_public_rating_idx'),
+            models.Index(fields=['author', '-last_updated'], name='course_author_updated_idx'),
+        ]
 
     def __str__(self):
         return self.name
+
+    @staticmethod
+    def bump_content_version(course_id):
+        """Marks the course structure (modules, lessons) as changed, invalidating caches keyed by its version."""
+        Course.objects.filter(id=course_id).update(content_version=F('content_version') + 1)
     
     def get_student_count(self):
         return self.students.count()
     
     @staticmethod
-    def update_course_rating(course_id):
-        """Update course statistics."""
+    def apply_rating_change(course_id, previous_score, score):
+        """Moves the rating aggregates from `previous_score` (`None` for a new rating) to `score` in one UPDATE.
 
-        course = Course.objects.get(id=course_id)
-        ratings = Rating.objects.filter(course=course)
-        
-        course.rating = sum(rating.score for rating in ratings) / ratings.count()
-        
-        course.save()
+        Uses `update()`, so `last_updated` is left alone.
+        """
+
+        sum_delta = score - (previous_score or 0)
+        count_delta = 0 if previous_score is not None else 1
+
+        changes = {
+            'rating_sum': F('rating_sum') + sum_delta,
+            'rating_count': F('rating_count') + count_delta,
+            'rating': Cast(F('rating_sum') + sum_delta, FloatField()) / (F('rating_count') + count_delta),
+        }
+        if previous_score != score:
+            changes[f'rating_count_{score}'] = F(f'rating_count_{score}') + 1
+            if previous_score is not None:
+                changes[f'rating_count_{previous_score}'] = F(f'rating_count_{previous_score}') - 1
+
+        Course.objects.filter(id=course_id).update(**changes)
+
+    @staticmethod
+    def recompute_rating(course_id):
+        """Rebuilds the rating aggregates of the course from its `Rating` rows."""
+
+        totals = Rating.objects.filter(course_id=course_id).aggregate(
+            rating_sum=Coalesce(Sum('score'), 0),
+            rating_count=Count('id'),
+            **{f'rating_count_{score}': Count('id', filter=Q(score=score)) for score in Rating.SCORES},
+        )
+        totals['rating'] = totals['rating_sum'] / totals['rating_count'] if totals['rating_count'] else 0.0
+
+        Course.objects.filter(id=course_id).update(**totals)
+
+    def get_rating_histogram(self):
+        return {score: getattr(self, f'rating_count_{score}') for score in Rating.SCORES}
 
     def get_lesson_count(self):
         try:
@@ -58,7 +109,28 @@ class Course(models.Model):
         }
 
 
+class Enrollment(models.Model):
+    """Membership of a user in a course, stored in the table previously created for `Course.students`."""
+
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='enrollments')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='enrollments')
+    enrolled_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'course_course_students'
+        unique_together = ('course', 'user')
+
+    def __str__(self):
+        return f'{self.user} enrolled in {self.course.name}'
+
+    @staticmethod
+    def is_enrolled(course_id, user_id):
+        return Enrollment.objects.filter(course_id=course_id, user_id=user_id).exists()
+
+
 class Rating(models.Model):
+    SCORES = range(1, 6)
+
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name="ratings")
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     score = models.IntegerField()
@@ -67,4 +139,107 @@ class Rating(models.Model):
         unique_together = ('course', 'user')
 
     def __str__(self):
-        return f'{self.user} rated {self.course.name}: {self.score}'
\ No newline at end of file
+        return f'{self.user} rated {self.course.name}: {self.score}'
+
+
+class LeaderboardEntry(models.Model):
+    """Running score of a user in a course, kept up to date with deltas from progress changes."""
+
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name="leaderboard")
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    score = models.FloatField(default=0.0)
+
+    class Meta:
+        unique_together = ('course', 'user')
+        indexes = [
+            models.Index(fields=['course', '-score', 'user'], name='leaderboard_rank_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user} in {self.course.name}: {self.score}'
+
+    @staticmethod
+    def get_progress_points(quiz_score, assignment_score):
+        """Points a single lesson contributes to the leaderboard score."""
+        return (quiz_score or 0) + (assignment_score or 0)
+
+    @staticmethod
+    def apply_delta(course_id, user_id, delta):
+        """Adds `delta` to the user's score in the course, creating the entry if needed."""
+
+        entries = LeaderboardEntry.objects.filter(course_id=course_id, user_id=user_id)
+
+        if delta and entries.update(score=F('score') + delta):
+            return
+
+        entry, created = LeaderboardEntry.objects.get_or_create(
+            course_id=course_id,
+            user_id=user_id,
+            defaults={'score': delta},
+        )
+
+        if not created and delta:
+            entries.update(score=F('score') + delta)
+
+    def ranked_before(self):
+        """Entries ranked above this one in the course, ordered `(score DESC, user_id)`.
+
+        Counting them gives the rank. The count walks `leaderboard_rank_idx` up to this entry, so it costs O(rank)
+        index entries read, not O(log n); at course sizes the index range scan stays cheap.
+        """
+        return LeaderboardEntry.objects.filter(
+            Q(score__gt=self.score) | Q(score=self.score, user_id__lt=self.user_id),
+            course_id=self.course_id,
+        )
+
+    def ranked_after(self):
+        """Entries ranked below this one in the course."""
+        return LeaderboardEntry.objects.filter(
+            Q(score__lt=self.score) | Q(score=self.score, user_id__gt=self.user_id),
+            course_id=self.course_id,
+        )
+
+    @staticmethod
+    def compact(course_id):
+        """Recomputes every score in the course from `StudentProgress` and repairs entries that drifted.
+
+        Enrolled students without progress keep their entry at a score of 0. Only entries of users who are no
+        longer enrolled are deleted. The course's entries are locked before the totals are read, so a concurrent
+        `apply_delta` either committed before and is part of the totals, or waits and applies its delta on top of
+        the repaired score.
+        """
+
+        from lesson.models import StudentProgress
+
+        with transaction.atomic():
+            entries = {
+                entry.user_id: entry
+                for entry in LeaderboardEntry.objects.select_for_update().filter(course_id=course_id).order_by('user_id')
+            }
+
+            enrolled = set(Enrollment.objects.filter(course_id=course_id).values_list('user_id', flat=True))
+            totals = dict(
+                StudentProgress.objects.filter(course_id=course_id)
+                .values('user_id')
+                .annotate(points=Sum(Coalesce('quiz_score', Value(0.0)) + Coalesce('assignment_score', Value(0.0))))
+                .values_list('user_id', 'points')
+            )
+
+            drifted = []
+            for user_id, entry in entries.items():
+                if user_id in enrolled and entry.score != totals.get(user_id, 0.0):
+                    entry.score = totals.get(user_id, 0.0)
+                    drifted.append(entry)
+
+            missing = [
+                LeaderboardEntry(course_id=course_id, user_id=user_id, score=points)
+                for user_id, points in totals.items()
+                if user_id in enrolled and user_id not in entries
+            ]
+            stale = [user_id for user_id in entries if user_id not in enrolled]
+
+            LeaderboardEntry.objects.bulk_update(drifted, ['score'], batch_size=1000)
+            LeaderboardEntry.objects.bulk_create(missing, batch_size=1000, ignore_conflicts=True)
+            LeaderboardEntry.objects.filter(course_id=course_id, user_id__in=stale).delete()
+
+        return len(drifted) + len(missing) + len(stale)
\ No newline at end of file
@@ -0,0 +1,76 @@
+import re
+
+from django.db import connection, transaction
+
+from lesson.models import Lesson, StudentProgress
+from module.models import Module
+
+from .models import Course, LeaderboardEntry
+
+
+SEQUENTIAL_SCAN_PATTERNS = {
+    "postgresql": re.compile(r"Seq Scan on (\w+)"),
+    "sqlite": re.compile(r"^\d+ \d+ \d+ SCAN (\w+)", re.MULTILINE),
+}
+
+
+def get_hot_queries(course_id, module_id, lesson_id, user_id):
+    """Returns `(name, queryset, postgres_only)` for the queries behind the course, lesson and progress endpoints.
+
+    Filters on boolean columns are `postgres_only`: Django renders `is_public=True` as a bare `WHERE is_public`,
+    which PostgreSQL matches against an index but SQLite always answers with a table scan.
+    """
+
+    from .api import get_progress_stats_queryset
+
+    return [
+        ("public_courses_by_last_updated", Course.objects.filter(is_public=True).order_by("-last_updated"), True),
+        ("public_courses_by_rating", Course.objects.filter(is_public=True).order_by("-rating"), True),
+        ("authored_courses", Course.objects.filter(author_id=user_id).order_by("-last_updated"), False),
+        ("enrolled_courses", Course.objects.filter(students=user_id).order_by("-last_updated"), False),
+        ("course_modules", Module.objects.filter(course_id=course_id).order_by("order"), False),
+        ("module_lessons", Lesson.objects.filter(module_id=module_id).order_by("order"), False),
+        ("course_lessons", Lesson.objects.filter(course_id=course_id).order_by("module__order", "order"), False),
+        ("lesson_progress", StudentProgress.objects.filter(user_id=user_id, lesson_id=lesson_id), False),
+        ("student_course_progress", StudentProgress.objects.filter(course_id=course_id, user_id=user_id), False),
+        ("lesson_completions", StudentProgress.objects.filter(lesson_id=lesson_id, lesson_completed=True), False),
+        ("course_progress_stats", get_progress_stats_queryset(course_id).order_by("username"), False),
+        ("course_leaderboard", LeaderboardEntry.objects.filter(course_id=course_id).order_by("-score", "user_id"), False),
+    ]
+
+
+def find_sequential_scans(queryset):
+    """Runs EXPLAIN on `queryset` and returns the tables it reads with a sequential scan.
+
+    On PostgreSQL sequential scans are disabled for the duration of the EXPLAIN, so one only shows up when no
+    index can serve the query, however small the tables are. Raises `ValueError` on database backends other than
+    those in `SEQUENTIAL_SCAN_PATTERNS`.
+    """
+
+    pattern = SEQUENTIAL_SCAN_PATTERNS.get(connection.vendor)
+    if pattern is None:
+        raise ValueError(f"Query plans cannot be checked on {connection.vendor}.")
+
+    with transaction.atomic():
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+
+        plan = queryset.explain()
+
+    return pattern.findall(plan)
+
+
+def get_sample_ids():
+    """Picks a course with a module, lesson and enrolled student to run the hot queries with."""
+
+    progress = StudentProgress.objects.select_related("lesson").order_by("id").first()
+    if progress is None:
+        return None
+
+    return {
+        "course_id": progress.course_id,
+        "module_id": progress.lesson.module_id,
+        "lesson_id": progress.lesson_id,
+        "user_id": progress.user_id,
+    }
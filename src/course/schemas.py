@@ -1,6 +1,6 @@
 from ninja import Schema
 from pydantic import EmailStr, Field, field_validator
-from typing import Optional, List
+from typing import Dict, Optional, List
 import re
 
 from module.schemas import ModuleDetailSchema, ModuleUpdateSchema
@@ -44,6 +44,14 @@ class CourseCreateSchema(Schema):
     creator_state: str
 
 
+class CourseCloneSchema(Schema):
+    name: Optional[str] = None
+
+
+class CourseImportResultSchema(Schema):
+    course_ids: List[int]
+
+
 class CourseDeatilUpdateSchema(Schema):
     name: Optional[str] = None
     description: Optional[str] = None
@@ -52,10 +60,28 @@ class CourseDeatilUpdateSchema(Schema):
     image: Optional[str] = None
 
 
+class BulkEnrollSchema(Schema):
+    user_ids: List[int] = []
+    emails: List[str] = []
+
+
+class BulkEnrollResultSchema(Schema):
+    enrolled: List[int]
+    already_enrolled: List[int]
+    not_found: List[str]
+
+
 class RatingSchema(Schema):
     score: int
 
 
+class RatingDistributionSchema(Schema):
+    course_id: int
+    rating: float
+    rating_count: int
+    histogram: Dict[int, int]
+
+
 class CourseUpdateSchema(CourseCreateSchema):
     id: int
     modules: List[ModuleUpdateSchema] = []
@@ -95,4 +121,50 @@ class LessonProgressStatsSchema(Schema):
 class CourseProgressSchema(Schema):
     course_id: int
     course_name: str
-    lesson_progress: List[LessonProgressStatsSchema]
\ No newline at end of file
+    lesson_progress: List[LessonProgressStatsSchema]
+
+
+class ScoreDistributionSchema(Schema):
+    histogram: List[int]
+    p50: Optional[float] = None
+    p90: Optional[float] = None
+
+
+class LessonScoreDistributionSchema(Schema):
+    lesson_id: int
+    lesson_topic: str
+    quiz: ScoreDistributionSchema
+    assignment: ScoreDistributionSchema
+
+
+class CourseScoreDistributionSchema(Schema):
+    course_id: int
+    bucket_edges: List[float]
+    lessons: List[LessonScoreDistributionSchema]
+
+
+class LeaderboardEntrySchema(Schema):
+    rank: int
+    username: str
+    score: float
+
+
+class LeaderboardSchema(Schema):
+    course_id: int
+    top: List[LeaderboardEntrySchema]
+    around: List[LeaderboardEntrySchema] = []
+
+
+class FunnelStepSchema(Schema):
+    lesson_id: int
+    lesson_topic: str
+    position: int
+    reached: int
+    started: int
+    completed: int
+
+
+class CourseFunnelSchema(Schema):
+    course_id: int
+    content_version: int
+    steps: List[FunnelStepSchema]
\ No newline at end of file
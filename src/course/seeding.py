@@ -0,0 +1,239 @@
+import random
+from collections import defaultdict
+from datetime import datetime, timezone
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+
+from authentication.models import User
+from lesson.models import Lesson, StudentProgress
+from lesson_content.models import LessonAssignment, LessonIntroduction, LessonQuiz, QuizOption
+from module.models import Module
+
+from .models import Course, Enrollment, LeaderboardEntry, Rating
+
+
+SEED_PREFIX = "seed"
+SEED_PASSWORD = "Seed@1234"
+BATCH_SIZE = 5000
+
+TEACHER_SHARE = 0.05
+PUBLIC_SHARE = 0.8
+RATING_SHARE = 0.3
+OPTIONS_PER_QUIZ = 4
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def create_objects(objects, batch_size=BATCH_SIZE):
+    """Inserts model instances with `bulk_create` in batches and returns them with their ids set."""
+
+    created = []
+    for batch in batched(objects, batch_size):
+        created += type(batch[0]).objects.bulk_create(batch)
+    return created
+
+
+def insert_rows(model, fields, rows, batch_size=BATCH_SIZE):
+    """Inserts `rows` of `fields` values without reading ids back. Uses COPY on PostgreSQL, `bulk_create` elsewhere.
+
+    Returns the number of inserted rows.
+    """
+
+    count = 0
+
+    if connection.vendor == "postgresql":
+        columns = ", ".join(connection.ops.quote_name(model._meta.get_field(field).column) for field in fields)
+        with connection.cursor() as cursor:
+            with cursor.copy(f"COPY {connection.ops.quote_name(model._meta.db_table)} ({columns}) FROM STDIN") as copy:
+                for row in rows:
+                    copy.write_row(row)
+                    count += 1
+        return count
+
+    for batch in batched(rows, batch_size):
+        model.objects.bulk_create([model(**dict(zip(fields, row))) for row in batch])
+        count += len(batch)
+    return count
+
+
+def delete_seeded_data():
+    """Deletes the users created by `seed_scale`, along with their courses and everything that belongs to them."""
+
+    Course.objects.filter(author__username__startswith=f"{SEED_PREFIX}_").delete()
+    User.objects.filter(username__startswith=f"{SEED_PREFIX}_").delete()
+
+
+def seed_scale(users, courses, modules_per_course, lessons_per_module, progress_density, enrollments_per_user=3,
+               with_content=True, seed=0, batch_size=BATCH_SIZE, log=None):
+    """Generates a deterministic dataset of `users` and `courses` with modules, lessons, content, enrollments,
+    progress, leaderboard entries and ratings. Returns the number of rows created per model.
+
+    The same arguments and seed always produce the same data. `progress_density` is the average share of an
+    enrolled course's lessons a student has worked through, in lesson order. Must run inside a transaction.
+    """
+
+    rng = random.Random(seed)
+    log = log or (lambda message: None)
+    counts = {}
+    now = datetime.now(timezone.utc)
+
+    # Hashing once keeps seeding fast; a fixed salt keeps the data identical between runs.
+    password = make_password(SEED_PASSWORD, salt=f"{SEED_PREFIX}salt{seed}")
+    teacher_count = max(1, round(users * TEACHER_SHARE))
+
+    log(f"Creating {users} users")
+    created_users = create_objects(
+        (
+            User(
+                username=f"{SEED_PREFIX}_{i:07d}",
+                email=f"{SEED_PREFIX}_{i:07d}@example.com",
+                password=password,
+                role="TEACHER" if i < teacher_count else "USER",
+            )
+            for i in range(users)
+        ),
+        batch_size,
+    )
+    teacher_ids = [user.id for user in created_users[:teacher_count]]
+    student_ids = [user.id for user in created_users[teacher_count:]]
+    counts["users"] = len(created_users)
+
+    log(f"Creating {courses} courses")
+    created_courses = create_objects(
+        (
+            Course(
+                name=f"{SEED_PREFIX.title()} course {i:06d} {seed}",
+                description=f"Generated course {i} for scale testing.",
+                author_id=rng.choice(teacher_ids),
+                is_public=rng.random() < PUBLIC_SHARE,
+            )
+            for i in range(courses)
+        ),
+        batch_size,
+    )
+    counts["courses"] = len(created_courses)
+
+    log("Creating modules")
+    created_modules = create_objects(
+        (
+            Module(course=course, name=f"Module {order}", order=order)
+            for course in created_courses
+            for order in range(1, modules_per_course + 1)
+        ),
+        batch_size,
+    )
+    counts["modules"] = len(created_modules)
+
+    log("Creating lessons")
+    positions = defaultdict(int)
+
+    def build_lessons():
+        for module in created_modules:
+            for order in range(1, lessons_per_module + 1):
+                positions[module.course_id] += 1
+                yield Lesson(
+                    module=module,
+                    course_id=module.course_id,
+                    topic=f"Lesson {module.order}.{order}",
+                    order=order,
+                    position=positions[module.course_id],
+                )
+
+    created_lessons = create_objects(build_lessons(), batch_size)
+    counts["lessons"] = len(created_lessons)
+
+    # Lessons were created in sequence order, so each lesson's successor is the next one of the same course.
+    course_lessons = defaultdict(list)
+    for lesson in created_lessons:
+        course_lessons[lesson.course_id].append(lesson.id)
+
+    next_lessons = []
+    for lesson_ids in course_lessons.values():
+        next_lessons += [Lesson(id=lesson_id, next_lesson_id=next_id) for lesson_id, next_id in zip(lesson_ids, lesson_ids[1:])]
+    Lesson.objects.bulk_update(next_lessons, ["next_lesson"], batch_size=batch_size)
+
+    for course in created_courses:
+        lesson_ids = course_lessons.get(course.id)
+        course.first_lesson_id = lesson_ids[0] if lesson_ids else None
+        course.sequence_version = course.content_version
+
+    if with_content:
+        log("Creating lesson content")
+        counts["introductions"] = insert_rows(
+            LessonIntroduction, ["lesson_id", "description"],
+            ((lesson.id, f"<h1>{lesson.topic}</h1><p>Introduction.</p>") for lesson in created_lessons), batch_size,
+        )
+        counts["assignments"] = insert_rows(
+            LessonAssignment, ["lesson_id", "instructions", "started_count", "completed_count", "average_score"],
+            ((lesson.id, f"<p>Assignment for {lesson.topic}.</p>", 0, 0, 0.0) for lesson in created_lessons), batch_size,
+        )
+        quizzes = create_objects((LessonQuiz(lesson=lesson, question=f"Question on {lesson.topic}?") for lesson in created_lessons), batch_size)
+        counts["quizzes"] = len(quizzes)
+
+        def build_options():
+            for quiz in quizzes:
+                correct = rng.randrange(OPTIONS_PER_QUIZ)
+                for option in range(OPTIONS_PER_QUIZ):
+                    yield quiz.id, f"Answer {option + 1}", option == correct
+
+        counts["options"] = insert_rows(QuizOption, ["question_id", "answer", "is_correct"], build_options(), batch_size)
+
+    log("Creating enrollments, progress, leaderboard entries and ratings")
+    course_ids = [course.id for course in created_courses]
+    enrollments, scores, ratings = [], [], []
+
+    def build_progress():
+        for user_id in student_ids:
+            for course_id in rng.sample(course_ids, min(enrollments_per_user, len(course_ids))):
+                lesson_ids = course_lessons.get(course_id, [])
+                enrollments.append((course_id, user_id, now))
+
+                reached = min(len(lesson_ids), max(1, round(len(lesson_ids) * progress_density * rng.uniform(0.5, 1.5))))
+                points = 0.0
+                for index, lesson_id in enumerate(lesson_ids[:reached]):
+                    if index < reached - 1:
+                        quiz_score = float(rng.randint(StudentProgress.PASSING_SCORE, 100))
+                        assignment_score = float(rng.randint(StudentProgress.PASSING_SCORE, 100))
+                        yield user_id, lesson_id, course_id, True, quiz_score, assignment_score, True
+                    else:
+                        quiz_score = float(rng.randint(0, 100)) if rng.random() < 0.5 else None
+                        assignment_score = None
+                        yield user_id, lesson_id, course_id, rng.random() < 0.5, quiz_score, assignment_score, False
+                    points += LeaderboardEntry.get_progress_points(quiz_score, assignment_score)
+
+                scores.append((course_id, user_id, points))
+                if rng.random() < RATING_SHARE:
+                    ratings.append((course_id, user_id, rng.choice(Rating.SCORES)))
+
+    counts["progress"] = insert_rows(
+        StudentProgress,
+        ["user_id", "lesson_id", "course_id", "introduction_completed", "quiz_score", "assignment_score", "lesson_completed"],
+        build_progress(),
+        batch_size,
+    )
+    counts["enrollments"] = insert_rows(Enrollment, ["course_id", "user_id", "enrolled_at"], enrollments, batch_size)
+    counts["leaderboard_entries"] = insert_rows(LeaderboardEntry, ["course_id", "user_id", "score"], scores, batch_size)
+    counts["ratings"] = insert_rows(Rating, ["course_id", "user_id", "score"], ratings, batch_size)
+
+    course_by_id = {course.id: course for course in created_courses}
+    for course_id, _, score in ratings:
+        course = course_by_id[course_id]
+        course.rating_sum += score
+        course.rating_count += 1
+        setattr(course, f"rating_count_{score}", getattr(course, f"rating_count_{score}") + 1)
+    for course in created_courses:
+        course.rating = course.rating_sum / course.rating_count if course.rating_count else 0.0
+
+    Course.objects.bulk_update(
+        created_courses,
+        ["first_lesson", "sequence_version", "rating", "rating_sum", "rating_count", *(f"rating_count_{score}" for score in Rating.SCORES)],
+        batch_size=batch_size,
+    )
+
+    return counts
@@ -0,0 +1,35 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from lesson.models import Lesson, StudentProgress
+from module.models import Module
+
+from .models import Course, Rating
+
+
+@receiver([post_save, post_delete], sender=Module)
+def module_changed(sender, instance, **kwargs):
+    Course.bump_content_version(instance.course_id)
+
+
+@receiver(post_save, sender=Module)
+def module_saved(sender, instance, created, **kwargs):
+    """Keeps the denormalized `course` of lessons and progress in line when a module is moved to another course."""
+
+    if created:
+        return
+
+    Lesson.objects.filter(module=instance).exclude(course_id=instance.course_id).update(course_id=instance.course_id)
+    StudentProgress.objects.filter(lesson__module=instance).exclude(course_id=instance.course_id).update(course_id=instance.course_id)
+
+
+@receiver([post_save, post_delete], sender=Lesson)
+def lesson_changed(sender, instance, **kwargs):
+    Course.bump_content_version(instance.course_id)
+
+
+@receiver(post_delete, sender=Rating)
+def rating_deleted(sender, instance, **kwargs):
+    """Rebuilds the course's rating aggregates, which `rate_course` only maintains for ratings it writes itself."""
+
+    Course.recompute_rating(instance.course_id)
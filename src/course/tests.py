@@ -1,13 +1,22 @@
 import datetime
+import io
+import json
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils.datastructures import MultiValueDict
 from ninja_extra.testing import TestClient
 from ninja_jwt.tokens import RefreshToken
 import pytest
 
+import helpers
 from lesson.models import Lesson, StudentProgress
+from lesson_content.models import LessonAssignment, LessonIntroduction, LessonQuiz, QuizOption
 from module.models import Module
 from .api import generate_modules, router
-from .models import Course, User
+from .models import Course, Enrollment, LeaderboardEntry, User
 
 
 class NinjaCourseTestCase(TestCase):
@@ -305,6 +314,25 @@ class NinjaCourseTestCase(TestCase):
         assert response.status_code == 200
         assert response.json()["name"] == payload["name"]
 
+
+    @pytest.mark.django_db
+    def test_update_course_keeps_rating_aggregates(self):
+        """Test that updating a course does not write back rating aggregates changed in the meantime"""
+
+        # Arrange
+        course = Course.objects.create(name="Original Name", author=self.teacher, is_public=True)
+        access_token = self.get_access_token(self.teacher)
+        headers = {"Authorization": f"Bearer {access_token}"}
+
+        # Act
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(f"/{course.id}", json={"description": "New"}, headers=headers)
+        updates = [query["sql"] for query in queries if query["sql"].startswith("UPDATE")]
+
+        # Assert
+        assert response.status_code == 200
+        assert updates and not any("rating" in sql for sql in updates)
+
     @pytest.mark.django_db
     def test_update_course_name_taken(self):
         """Test updating a course with a duplicate name"""
@@ -425,6 +453,202 @@ class NinjaCourseTestCase(TestCase):
         assert response.json()["message"] == "Already enrolled in this course."
 
 
+    @pytest.mark.django_db
+    def test_enroll_students_bulk(self):
+        """Test enrolling a roster of users by ids and emails"""
+
+        # Arrange
+        course = Course.objects.create(name="Course", author=self.teacher, is_public=True)
+        module = Module.objects.create(name="Module 1", course=course, order=1, is_visible=True)
+        lesson = Lesson.objects.create(topic="Lesson 1", module=module, order=1)
+        other = User.objects.create_user(username='Student2', email='student2@gmail.com', password='Student@123', role='USER')
+        Enrollment.objects.create(course=course, user=self.student)
+        access_token = self.get_access_token(self.teacher)
+        headers = {"Authorization": f"Bearer {access_token}"}
+        payload = {"user_ids": [self.student.id, 999], "emails": ["student2@gmail.com", "missing@gmail.com"]}
+
+        # Act
+        response = self.client.post(f"/{course.id}/enroll/bulk", json=payload, headers=headers)
+
+        # Assert
+        assert response.status_code == 200
+        assert response.json() == {
+            "enrolled": [other.id],
+            "already_enrolled": [self.student.id],
+            "not_found": ["999", "missing@gmail.com"],
+        }
+        assert Enrollment.is_enrolled(course.id, other.id)
+        assert StudentProgress.objects.filter(user=other, lesson=lesson).exists()
+
+
+    @pytest.mark.django_db
+    def test_enroll_students_bulk_not_author(self):
+        """Test that only the author of a course can enroll a roster"""
+
+        # Arrange
+        course = Course.objects.create(name="Course", author=self.teacher, is_public=True)
+        access_token = self.get_access_token(self.student)
+        headers = {"Authorization": f"Bearer {access_token}"}
+
+        # Act
+        response = self.client.post(f"/{course.id}/enroll/bulk", json={"user_ids": [self.student.id]}, headers=headers)
+
+        # Assert
+        assert response.status_code == 404
+        assert not Enrollment.is_enrolled(course.id, self.student.id)
+
+
+    @pytest.mark.django_db
+    def test_clone_course(self):
+        """Test cloning a course with its modules, lessons and content"""
+
+        # Arrange
+        course = Course.objects.create(name="Course", author=self.teacher, is_public=True)
+        module = Module.objects.create(name="Module 1", course=course, order=1, is_visible=True)
+        lesson = Lesson.objects.create(topic="Lesson 1", module=module, order=1)
+        LessonIntroduction.objects.create(lesson=lesson, description="Intro")
+        LessonAssignment.objects.create(lesson=lesson, instructions="Do it", started_count=5)
+        quiz = LessonQuiz.objects.create(lesson=lesson, question="Question?")
+        QuizOption.objects.create(question=quiz, answer="Yes", is_correct=True)
+        QuizOption.objects.create(question=quiz, answer="No", is_correct=False)
+        StudentProgress.objects.create(user=self.student, lesson=lesson)
+        access_token = self.get_access_token(self.teacher)
+        headers = {"Authorization": f"Bearer {access_token}"}
+
+        # Act
+        response = self.client.post(f"/{course.id}/clone", json={}, headers=headers)
+        clone = Course.objects.get(id=response.json()["id"])
+        cloned_lesson = Lesson.objects.get(course=clone)
+
+        # Assert
+        assert response.status_code == 201
+        assert clone.name == "Course (copy)"
+        assert clone.is_public is False
+        assert cloned_lesson.module.course_id == clone.id
+        assert cloned_lesson.lesson_introduction.description == "Intro"
+        assert cloned_lesson.lesson_assignment.started_count == 0
+        assert sorted(QuizOption.objects.filter(question__lesson=cloned_lesson).values_list("answer", flat=True)) == ["No", "Yes"]
+        assert not StudentProgress.objects.filter(course=clone).exists()
+        assert Lesson.objects.filter(course=course).count() == 1
+
+
+    @pytest.mark.django_db
+    def test_clone_course_name_taken(self):
+        """Test cloning a course under the name of an existing course"""
+
+        # Arrange
+        course = Course.objects.create(name="Course", author=self.teacher, is_public=True)
+        access_token = self.get_access_token(self.teacher)
+        headers = {"Authorization": f"Bearer {access_token}"}
+
+        # Act
+        response = self.client.post(f"/{course.id}/clone", json={"name": "Course"}, headers=headers)
+
+        # Assert
+        assert response.status_code == 400
+
+
+    @pytest.mark.django_db
+    def test_export_and_import_course(self):
+        """Test that an exported course can be imported back as a new course"""
+
+        # Arrange
+        course = Course.objects.create(name="Course", author=self.teacher, is_public=True)
+        module = Module.objects.create(name="Module 1", course=course, order=1, is_visible=True)
+        lesson = Lesson.objects.create(topic="Lesson 1", module=module, order=1)
+        LessonIntroduction.objects.create(lesson=lesson, description="Intro")
+        quiz = LessonQuiz.objects.create(lesson=lesson, question="Question?")
+        QuizOption.objects.create(question=quiz, answer="Yes", is_correct=True)
+        access_token = self.get_access_token(self.teacher)
+        headers = {"Authorization": f"Bearer {access_token}"}
+
+        # Act
+        exported = self.client.get(f"/{course.id}/export", headers=headers)
+        Course.objects.filter(id=course.id).update(name="Renamed")
+        response = self.client.post("/import", FILES=MultiValueDict({"file": [SimpleUploadedFile("course.ndjson", exported.content)]}), headers=headers)
+        imported = Course.objects.get(id=response.json()["course_ids"][0])
+        imported_lesson = Lesson.objects.get(course=imported)
+
+        # Assert
+        assert exported.status_code == 200
+        assert [json.loads(line)["type"] for line in exported.content.splitlines()] == ["course", "module", "lesson", "introduction", "quiz", "option"]
+        assert response.status_code == 201
+        assert imported.name == "Course"
+        assert imported.author == self.teacher
+        assert imported_lesson.module.course_id == imported.id
+        assert imported_lesson.lesson_introduction.description == "Intro"
+        assert QuizOption.objects.get(question__lesson=imported_lesson).answer == "Yes"
+
+
+    @pytest.mark.django_db
+    def test_import_course_invalid_records(self):
+        """Test that an import referencing unknown records is rejected and rolled back"""
+
+        # Arrange
+        content = b'{"type": "course", "id": 1, "name": "Imported"}\n{"type": "lesson", "id": 1, "module_id": 7, "topic": "Lesson", "order": 1}\n'
+        access_token = self.get_access_token(self.teacher)
+        headers = {"Authorization": f"Bearer {access_token}"}
+
+        # Act
+        response = self.client.post("/import", FILES=MultiValueDict({"file": [SimpleUploadedFile("course.ndjson", content)]}), headers=headers)
+
+        # Assert
+        assert response.status_code == 400
+        assert not Course.objects.filter(name="Imported").exists()
+
+
+    @pytest.mark.django_db
+    def test_import_course_malformed_records(self):
+        """Test that records without an id or that are not objects are rejected as invalid"""
+
+        # Arrange
+        course = b'{"type": "course", "id": 1, "name": "Imported"}\n'
+        contents = [course + b'{"type": "module", "name": "Module", "order": 1}\n', course + b'[1, 2]\n']
+        access_token = self.get_access_token(self.teacher)
+        headers = {"Authorization": f"Bearer {access_token}"}
+
+        # Act
+        responses = [
+            self.client.post("/import", FILES=MultiValueDict({"file": [SimpleUploadedFile("course.ndjson", content)]}), headers=headers)
+            for content in contents
+        ]
+
+        # Assert
+        assert [response.status_code for response in responses] == [400, 400]
+        assert [response.json()["message"] for response in responses] == ["A module record has no id.", "Every record must be a JSON object."]
+        assert not Course.objects.filter(name="Imported").exists()
+
+
+    @pytest.mark.django_db
+    def test_seed_scale(self):
+        """Test that seed_scale generates consistent data and the same data for the same seed"""
+
+        # Arrange
+        arguments = ["--users", "20", "--courses", "3", "--modules-per-course", "2", "--lessons-per-module", "3", "--progress-density", "0.5", "--seed", "7"]
+
+        def snapshot():
+            return (
+                list(Enrollment.objects.filter(user__username__startswith="seed_").order_by("user__username", "course__name").values_list("user__username", "course__name")),
+                list(StudentProgress.objects.filter(user__username__startswith="seed_").order_by("user__username", "lesson__course__name", "lesson__position").values_list("quiz_score", "lesson_completed")),
+            )
+
+        # Act
+        call_command("seed_scale", *arguments, stdout=io.StringIO(), stderr=io.StringIO())
+        first = snapshot()
+        call_command("seed_scale", *arguments, "--flush", stdout=io.StringIO(), stderr=io.StringIO())
+        course = Course.objects.filter(name__startswith="Seed course").order_by("id").first()
+        lessons = list(Lesson.objects.filter(course=course).order_by("position"))
+
+        # Assert
+        assert snapshot() == first
+        assert Course.objects.filter(name__startswith="Seed course").count() == 3
+        assert Enrollment.objects.filter(user__username__startswith="seed_").count() == 19 * 3
+        assert course.first_lesson_id == lessons[0].id
+        assert [lesson.next_lesson_id for lesson in lessons] == [lesson.id for lesson in lessons[1:]] + [None]
+        assert course.rating_count == course.ratings.count()
+        assert QuizOption.objects.filter(question__lesson__course=course, is_correct=True).count() == 6
+
+
     @pytest.mark.django_db
     def test_enroll_in_non_existing_course(self):
         """Test enrolling in a course which dosn't exist"""
@@ -459,6 +683,24 @@ class NinjaCourseTestCase(TestCase):
         assert response.json()["is_enrolled"] is True
 
 
+    @pytest.mark.django_db
+    def test_is_student_enrolled_rejects_token_with_old_version(self):
+        """Test that the claims-only check still rejects tokens issued before a token version bump"""
+
+        # Arrange
+        course = Course.objects.create(name="Course", author=self.teacher, is_public=True)
+        headers = {"Authorization": f"Bearer {helpers.issue_tokens(self.student).access_token}"}
+        self.client.get(f"/{course.id}/is-enrolled", headers=headers)
+        self.student.token_version += 1
+        self.student.save()
+
+        # Act
+        response = self.client.get(f"/{course.id}/is-enrolled", headers=headers)
+
+        # Assert
+        assert response.status_code == 401
+
+
     @pytest.mark.django_db
     def test_is_student_not_enrolled(self):
         """Test checking if a student is not enrolled in a course"""
@@ -495,6 +737,69 @@ class NinjaCourseTestCase(TestCase):
         assert response.json()["message"] == "Course rated successfully."
 
 
+    @pytest.mark.django_db
+    def test_rate_course_updates_aggregates(self):
+        """Test that rating and re-rating keep the course average and histogram in sync without touching last_updated"""
+
+        # Arrange
+        course = Course.objects.create(name="Course", author=self.teacher, is_public=True)
+        course.students.add(self.student, self.teacher)
+        last_updated = course.last_updated
+        student_headers = {"Authorization": f"Bearer {self.get_access_token(self.student)}"}
+        teacher_headers = {"Authorization": f"Bearer {self.get_access_token(self.teacher)}"}
+
+        # Act
+        self.client.post(f"/{course.id}/rate", json={"score": 2}, headers=student_headers)
+        self.client.post(f"/{course.id}/rate", json={"score": 5}, headers=teacher_headers)
+        self.client.post(f"/{course.id}/rate", json={"score": 4}, headers=student_headers)
+        response = self.client.get(f"/{course.id}/rating/distribution", headers=student_headers)
+        course.refresh_from_db()
+
+        # Assert
+        assert response.status_code == 200
+        assert response.json()["rating"] == 4.5
+        assert response.json()["rating_count"] == 2
+        assert response.json()["histogram"] == {"1": 0, "2": 0, "3": 0, "4": 1, "5": 1}
+        assert course.last_updated == last_updated
+
+
+    @pytest.mark.django_db
+    def test_deleted_rating_updates_aggregates(self):
+        """Test that ratings removed along with their user are taken out of the course average and histogram"""
+
+        # Arrange
+        course = Course.objects.create(name="Course", author=self.teacher, is_public=True)
+        learner = User.objects.create(username="Learner", email="learner@gmail.com")
+        course.students.add(self.student, learner)
+        self.client.post(f"/{course.id}/rate", json={"score": 2}, headers={"Authorization": f"Bearer {self.get_access_token(self.student)}"})
+        self.client.post(f"/{course.id}/rate", json={"score": 5}, headers={"Authorization": f"Bearer {self.get_access_token(learner)}"})
+
+        # Act
+        learner.delete()
+        course.refresh_from_db()
+
+        # Assert
+        assert course.rating == 2.0
+        assert course.rating_count == 1
+        assert course.get_rating_histogram() == {1: 0, 2: 1, 3: 0, 4: 0, 5: 0}
+
+
+    @pytest.mark.django_db
+    def test_rate_course_invalid_score(self):
+        """Test rating a course with a score outside of 1-5"""
+
+        # Arrange
+        course = Course.objects.create(name="Course", author=self.teacher, is_public=True)
+        course.students.add(self.student)
+        headers = {"Authorization": f"Bearer {self.get_access_token(self.student)}"}
+
+        # Act
+        response = self.client.post(f"/{course.id}/rate", json={"score": 6}, headers=headers)
+
+        # Assert
+        assert response.status_code == 400
+
+
     @pytest.mark.django_db
     def test_rate_course_not_enrolled(self):
         """Test rating a course by a non-enrolled user"""
@@ -695,6 +1000,63 @@ class NinjaCourseTestCase(TestCase):
         assert response.json()[0]["username"] == self.student.username
 
 
+    @pytest.mark.django_db
+    def test_get_course_progress_stats_paginated(self):
+        """Test paging through course progress stats sorted by a stat column"""
+
+        # Arrange
+        course = Course.objects.create(name="Course", author=self.teacher, is_public=True)
+        module = Module.objects.create(name="Module 1", course=course, order=1, is_visible=True)
+        lesson = Lesson.objects.create(topic="Lesson 1", module=module, order=1)
+        for index, score in enumerate([70, 90, 80]):
+            user = User.objects.create(username=f"Learner{index}", email=f"learner{index}@gmail.com")
+            StudentProgress.objects.create(user=user, lesson=lesson, quiz_score=score)
+        access_token = self.get_access_token(self.teacher)
+        headers = {"Authorization": f"Bearer {access_token}"}
+
+        # Act
+        first_page = self.client.get(f"/{course.id}/progress?limit=2&sort=-quiz_score_percentage", headers=headers)
+        cursor = first_page["X-Next-Cursor"]
+        second_page = self.client.get(f"/{course.id}/progress?limit=2&sort=-quiz_score_percentage&cursor={cursor}", headers=headers)
+
+        # Assert
+        assert first_page.status_code == 200
+        assert [row["username"] for row in first_page.json()] == ["Learner1", "Learner2"]
+        assert [row["username"] for row in second_page.json()] == ["Learner0"]
+        assert not second_page.has_header("X-Next-Cursor")
+
+
+    @pytest.mark.django_db
+    def test_get_general_progress_stats_username_prefix(self):
+        """Test filtering general progress stats by username prefix"""
+
+        # Arrange
+        access_token = self.get_access_token(self.teacher)
+        headers = {"Authorization": f"Bearer {access_token}"}
+
+        # Act
+        response = self.client.get("/progress/general?username=Stud", headers=headers)
+
+        # Assert
+        assert response.status_code == 200
+        assert [row["username"] for row in response.json()] == [self.student.username]
+
+
+    @pytest.mark.django_db
+    def test_get_general_progress_stats_invalid_sort(self):
+        """Test sorting general progress stats by an unknown column"""
+
+        # Arrange
+        access_token = self.get_access_token(self.teacher)
+        headers = {"Authorization": f"Bearer {access_token}"}
+
+        # Act
+        response = self.client.get("/progress/general?sort=password", headers=headers)
+
+        # Assert
+        assert response.status_code == 400
+
+
     @pytest.mark.django_db
     def test_get_course_progress_stats_no_lessons(self):
         """Test retrieving progress stats when no lessons exist for the course"""
@@ -712,6 +1074,284 @@ class NinjaCourseTestCase(TestCase):
         assert response.json()["message"] == f"No lessons found for course {course.id}."
 
 
+    @pytest.mark.django_db
+    def test_export_course_progress_stats_csv(self):
+        """Test streaming progress stats for a course as CSV"""
+
+        # Arrange
+        course = Course.objects.create(name="Course", author=self.teacher, is_public=True)
+        module = Module.objects.create(name="Module 1", course=course, order=1, is_visible=True)
+        lesson = Lesson.objects.create(topic="Lesson 1", module=module, order=1)
+        Lesson.objects.create(topic="Lesson 2", module=module, order=2)
+        StudentProgress.objects.create(user=self.student, lesson=lesson, quiz_score=80, lesson_completed=True)
+        access_token = self.get_access_token(self.teacher)
+        headers = {"Authorization": f"Bearer {access_token}"}
+
+        # Act
+        response = self.client.get(f"/{course.id}/progress/export", headers=headers)
+        lines = response.content.decode().splitlines()
+
+        # Assert
+        assert response.status_code == 200
+        assert response.streaming
+        assert response["Content-Type"] == "text/csv"
+        assert lines[0] == "username,completed_lessons,started_assignments,started_quizzes,assignment_score_percentage,quiz_score_percentage,lesson_count"
+        assert lines[1] == f"{self.student.username},1,0,1,0.0,80.0,2"
+
+
+    @pytest.mark.django_db
+    def test_export_course_progress_stats_ndjson(self):
+        """Test streaming progress stats for a course as NDJSON"""
+
+        # Arrange
+        course = Course.objects.create(name="Course", author=self.teacher, is_public=True)
+        module = Module.objects.create(name="Module 1", course=course, order=1, is_visible=True)
+        lesson = Lesson.objects.create(topic="Lesson 1", module=module, order=1)
+        StudentProgress.objects.create(user=self.student, lesson=lesson, assignment_score=90)
+        access_token = self.get_access_token(self.teacher)
+        headers = {"Authorization": f"Bearer {access_token}"}
+
+        # Act
+        response = self.client.get(f"/{course.id}/progress/export?format=ndjson", headers=headers)
+        rows = [json.loads(line) for line in response.content.decode().splitlines()]
+
+        # Assert
+        assert response.status_code == 200
+        assert len(rows) == 1
+        assert rows[0]["username"] == self.student.username
+        assert rows[0]["started_assignments"] == 1
+        assert rows[0]["assignment_score_percentage"] == 90
+
+
+    @pytest.mark.django_db
+    def test_export_course_progress_stats_invalid_format(self):
+        """Test exporting progress stats with an unsupported format"""
+
+        # Arrange
+        course = Course.objects.create(name="Course", author=self.teacher, is_public=True)
+        access_token = self.get_access_token(self.teacher)
+        headers = {"Authorization": f"Bearer {access_token}"}
+
+        # Act
+        response = self.client.get(f"/{course.id}/progress/export?format=xml", headers=headers)
+
+        # Assert
+        assert response.status_code == 400
+
+
+    @pytest.mark.django_db
+    def test_get_course_score_distribution(self):
+        """Test retrieving score histograms and percentiles per lesson"""
+
+        # Arrange
+        course = Course.objects.create(name="Course", author=self.teacher, is_public=True)
+        module = Module.objects.create(name="Module 1", course=course, order=1, is_visible=True)
+        lesson = Lesson.objects.create(topic="Lesson 1", module=module, order=1)
+        empty_lesson = Lesson.objects.create(topic="Lesson 2", module=module, order=2)
+        StudentProgress.objects.create(user=self.student, lesson=lesson, quiz_score=100, assignment_score=40)
+        StudentProgress.objects.create(user=self.teacher, lesson=lesson, quiz_score=50)
+        access_token = self.get_access_token(self.teacher)
+        headers = {"Authorization": f"Bearer {access_token}"}
+
+        # Act
+        response = self.client.get(f"/{course.id}/progress/distribution?buckets=4", headers=headers)
+        lessons = response.json()["lessons"]
+
+        # Assert
+        assert response.status_code == 200
+        assert response.json()["bucket_edges"] == [0, 25, 50, 75, 100]
+        assert lessons[0]["lesson_id"] == lesson.id
+        assert lessons[0]["quiz"] == {"histogram": [0, 0, 1, 1], "p50": 75, "p90": 95}
+        assert lessons[0]["assignment"] == {"histogram": [0, 1, 0, 0], "p50": 40, "p90": 40}
+        assert lessons[1]["lesson_id"] == empty_lesson.id
+        assert lessons[1]["quiz"] == {"histogram": [0, 0, 0, 0], "p50": None, "p90": None}
+
+
+    @pytest.mark.django_db
+    def test_get_course_score_distribution_course_not_found(self):
+        """Test retrieving score distribution for a non-existing course"""
+
+        # Arrange
+        access_token = self.get_access_token(self.teacher)
+        headers = {"Authorization": f"Bearer {access_token}"}
+
+        # Act
+        response = self.client.get("/999/progress/distribution", headers=headers)
+
+        # Assert
+        assert response.status_code == 404
+
+
+    @pytest.mark.django_db
+    def test_get_course_leaderboard_around_me(self):
+        """Test retrieving the top of the leaderboard and the user's neighbourhood"""
+
+        # Arrange
+        course = Course.objects.create(name="Course", author=self.teacher, is_public=True)
+        for index in range(6):
+            user = User.objects.create(username=f"Learner{index}", email=f"learner{index}@gmail.com")
+            LeaderboardEntry.objects.create(course=course, user=user, score=100 * index)
+        LeaderboardEntry.objects.create(course=course, user=self.student, score=250)
+        access_token = self.get_access_token(self.student)
+        headers = {"Authorization": f"Bearer {access_token}"}
+
+        # Act
+        response = self.client.get(f"/{course.id}/leaderboard?limit=2&around=me&radius=1", headers=headers)
+
+        # Assert
+        assert response.status_code == 200
+        assert [entry["username"] for entry in response.json()["top"]] == ["Learner5", "Learner4"]
+        assert response.json()["around"] == [
+            {"rank": 3, "username": "Learner3", "score": 300},
+            {"rank": 4, "username": self.student.username, "score": 250},
+            {"rank": 5, "username": "Learner2", "score": 200},
+        ]
+
+
+    @pytest.mark.django_db
+    def test_get_course_leaderboard_private_course_not_enrolled(self):
+        """Test that the leaderboard of a private course is hidden from users who are not enrolled"""
+
+        # Arrange
+        course = Course.objects.create(name="Course", author=self.teacher, is_public=False)
+        LeaderboardEntry.objects.create(course=course, user=self.teacher, score=100)
+        headers = {"Authorization": f"Bearer {self.get_access_token(self.student)}"}
+
+        # Act
+        response = self.client.get(f"/{course.id}/leaderboard", headers=headers)
+        course.students.add(self.student)
+        enrolled_response = self.client.get(f"/{course.id}/leaderboard", headers=headers)
+
+        # Assert
+        assert response.status_code == 403
+        assert enrolled_response.status_code == 200
+
+
+    @pytest.mark.django_db
+    def test_compact_leaderboard_repairs_drift(self):
+        """Test that compaction recomputes scores from student progress"""
+
+        # Arrange
+        course = Course.objects.create(name="Course", author=self.teacher, is_public=True)
+        module = Module.objects.create(name="Module 1", course=course, order=1, is_visible=True)
+        lesson = Lesson.objects.create(topic="Lesson 1", module=module, order=1)
+        course.students.add(self.student)
+        StudentProgress.objects.create(user=self.student, lesson=lesson, quiz_score=80, assignment_score=70)
+        LeaderboardEntry.objects.create(course=course, user=self.student, score=10)
+        LeaderboardEntry.objects.create(course=course, user=self.teacher, score=50)
+
+        # Act
+        repaired = LeaderboardEntry.compact(course.id)
+
+        # Assert
+        assert repaired == 2
+        assert LeaderboardEntry.objects.get(course=course, user=self.student).score == 150
+        assert not LeaderboardEntry.objects.filter(course=course, user=self.teacher).exists()
+
+
+    @pytest.mark.django_db
+    def test_compact_leaderboard_keeps_enrolled_student_without_progress(self):
+        """Test that compaction keeps the zero-score entry of an enrolled student who has no progress yet"""
+
+        # Arrange
+        course = Course.objects.create(name="Course", author=self.teacher, is_public=True)
+        course.students.add(self.student)
+        LeaderboardEntry.apply_delta(course.id, self.student.id, 0)
+
+        # Act
+        repaired = LeaderboardEntry.compact(course.id)
+
+        # Assert
+        assert repaired == 0
+        assert LeaderboardEntry.objects.get(course=course, user=self.student).score == 0
+
+
+    @pytest.mark.django_db
+    def test_hot_queries_use_indexes(self):
+        """Test that the hot course, lesson and progress queries do not fall back to sequential scans"""
+
+        # Arrange
+        course = Course.objects.create(name="Course", author=self.teacher, is_public=True)
+        module = Module.objects.create(name="Module 1", course=course, order=1, is_visible=True)
+        lesson = Lesson.objects.create(topic="Lesson 1", module=module, order=1)
+        course.students.add(self.student)
+        StudentProgress.objects.create(user=self.student, lesson=lesson, lesson_completed=True)
+        LeaderboardEntry.apply_delta(course.id, self.student.id, 0)
+        out = io.StringIO()
+
+        # Act
+        call_command("check_query_plans", stdout=out)
+
+        # Assert
+        assert "No sequential scans found." in out.getvalue()
+
+
+    @pytest.mark.django_db
+    def test_get_course_funnel(self):
+        """Test retrieving the lesson drop-off funnel for a course"""
+
+        # Arrange
+        course = Course.objects.create(name="Course", author=self.teacher, is_public=True)
+        module1 = Module.objects.create(name="Module 1", course=course, order=1, is_visible=True)
+        module2 = Module.objects.create(name="Module 2", course=course, order=2, is_visible=True)
+        lesson1 = Lesson.objects.create(topic="Lesson 1", module=module1, order=1)
+        lesson2 = Lesson.objects.create(topic="Lesson 2", module=module1, order=2)
+        lesson3 = Lesson.objects.create(topic="Lesson 3", module=module2, order=1)
+        learner = User.objects.create(username="Learner", email="learner@gmail.com")
+        StudentProgress.objects.create(user=self.student, lesson=lesson1, quiz_score=90, lesson_completed=True)
+        StudentProgress.objects.create(user=self.student, lesson=lesson2, introduction_completed=True)
+        StudentProgress.objects.create(user=learner, lesson=lesson1)
+        access_token = self.get_access_token(self.teacher)
+        headers = {"Authorization": f"Bearer {access_token}"}
+
+        # Act
+        response = self.client.get(f"/{course.id}/funnel", headers=headers)
+        steps = response.json()["steps"]
+
+        # Assert
+        assert response.status_code == 200
+        assert [step["lesson_id"] for step in steps] == [lesson1.id, lesson2.id, lesson3.id]
+        assert [(step["reached"], step["started"], step["completed"]) for step in steps] == [(2, 1, 1), (1, 1, 0), (0, 0, 0)]
+
+
+    @pytest.mark.django_db
+    def test_get_course_funnel_invalidated_by_content_change(self):
+        """Test that the cached funnel is recomputed when the course structure changes"""
+
+        # Arrange
+        course = Course.objects.create(name="Course", author=self.teacher, is_public=True)
+        module = Module.objects.create(name="Module 1", course=course, order=1, is_visible=True)
+        Lesson.objects.create(topic="Lesson 1", module=module, order=1)
+        access_token = self.get_access_token(self.teacher)
+        headers = {"Authorization": f"Bearer {access_token}"}
+        first_response = self.client.get(f"/{course.id}/funnel", headers=headers)
+
+        # Act
+        Lesson.objects.create(topic="Lesson 2", module=module, order=2)
+        response = self.client.get(f"/{course.id}/funnel", headers=headers)
+
+        # Assert
+        assert response.status_code == 200
+        assert response.json()["content_version"] > first_response.json()["content_version"]
+        assert len(response.json()["steps"]) == 2
+
+
+    @pytest.mark.django_db
+    def test_get_course_funnel_unauthorized(self):
+        """Test retrieving the funnel of a course the user is not the author of"""
+
+        # Arrange
+        course = Course.objects.create(name="Course", author=self.teacher, is_public=True)
+        access_token = self.get_access_token(self.student)
+        headers = {"Authorization": f"Bearer {access_token}"}
+
+        # Act
+        response = self.client.get(f"/{course.id}/funnel", headers=headers)
+
+        # Assert
+        assert response.status_code == 403
+
+
     @pytest.mark.django_db
     def test_generate_modules_success(self):
         """Test module generation for a course"""
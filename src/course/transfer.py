@@ -0,0 +1,174 @@
+import json
+
+from lesson.models import Lesson
+from lesson_content.models import LessonAssignment, LessonIntroduction, LessonQuiz, QuizOption
+from module.models import Module
+
+from .models import Course
+
+
+CHUNK_SIZE = 2000
+BATCH_SIZE = 1000
+
+# Record types in stream order, parents always come before their children.
+RECORD_TYPES = ["course", "module", "lesson", "introduction", "assignment", "quiz", "option"]
+# Record types other records refer to by their exported `id`.
+REFERENCED_TYPES = ["module", "lesson", "quiz"]
+
+
+def export_course_records(course_ids):
+    """Yields the courses with `course_ids` as flat records, one course after another.
+
+    Every level is read with an iterator, so memory use does not grow with the size or number of courses.
+    """
+
+    for course_id in course_ids:
+        levels = [
+            ("course", Course.objects.filter(id=course_id).values("id", "name", "description", "image", "is_public", "creator_state")),
+            ("module", Module.objects.filter(course_id=course_id).order_by("id").values("id", "name", "order", "is_visible")),
+            ("lesson", Lesson.objects.filter(course_id=course_id).order_by("id").values("id", "module_id", "topic", "order")),
+            ("introduction", LessonIntroduction.objects.filter(lesson__course_id=course_id).order_by("id").values("lesson_id", "description")),
+            ("assignment", LessonAssignment.objects.filter(lesson__course_id=course_id).order_by("id").values("lesson_id", "instructions")),
+            ("quiz", LessonQuiz.objects.filter(lesson__course_id=course_id).order_by("id").values("id", "lesson_id", "question")),
+            ("option", QuizOption.objects.filter(question__lesson__course_id=course_id).order_by("id").values("question_id", "answer", "is_correct")),
+        ]
+
+        for record_type, rows in levels:
+            for row in rows.iterator(chunk_size=CHUNK_SIZE):
+                yield {"type": record_type, **row}
+
+
+def export_course_ndjson(course_ids):
+    """Yields `export_course_records` as newline-delimited JSON."""
+
+    for record in export_course_records(course_ids):
+        yield json.dumps(record) + "\n"
+
+
+def read_ndjson(lines):
+    """Parses newline-delimited JSON records, skipping blank lines."""
+
+    for number, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        if not line.strip():
+            continue
+
+        try:
+            yield json.loads(line)
+        except ValueError:
+            raise ValueError(f"Line {number} is not valid JSON.")
+
+
+class CourseImporter:
+    """Imports a stream of course records in `bulk_create` batches, remapping exported ids to new ones.
+
+    Records are buffered per type and a buffer is flushed once it is full or before a record of a later type
+    arrives, so parents always get their ids before children reference them. Id maps are kept only for the
+    course being imported, which keeps memory bounded when importing thousands of courses. Must run inside a
+    transaction.
+    """
+
+    def __init__(self, author, skip_existing=False):
+        self.author = author
+        self.skip_existing = skip_existing
+        self.course_ids = []
+        self.course = None
+        self.skipping = False
+        self.buffers = {record_type: [] for record_type in RECORD_TYPES}
+        self.ids = {}
+
+    def add(self, record):
+        if not isinstance(record, dict):
+            raise ValueError("Every record must be a JSON object.")
+
+        record_type = record.get("type")
+        if record_type not in self.buffers:
+            raise ValueError(f"Unknown record type {record_type!r}.")
+        if record_type in REFERENCED_TYPES and "id" not in record:
+            raise ValueError(f"A {record_type} record has no id.")
+
+        if record_type == "course":
+            self.flush()
+            self.start_course(record)
+            return
+
+        if self.course is None and not self.skipping:
+            raise ValueError(f"A {record_type} record appeared before any course record.")
+        if self.skipping:
+            return
+
+        level = RECORD_TYPES.index(record_type)
+        for parent_type in RECORD_TYPES[1:level]:
+            self.flush_type(parent_type)
+
+        self.buffers[record_type].append(record)
+        if len(self.buffers[record_type]) >= BATCH_SIZE:
+            self.flush_type(record_type)
+
+    def start_course(self, record):
+        self.ids = {record_type: {} for record_type in REFERENCED_TYPES}
+
+        if not record.get("name"):
+            raise ValueError("A course record has no name.")
+
+        self.skipping = Course.objects.filter(name=record["name"]).exists()
+        if self.skipping:
+            if not self.skip_existing:
+                raise ValueError(f"A course named {record['name']!r} already exists.")
+            self.course = None
+            return
+
+        self.course = Course.objects.create(
+            name=record["name"],
+            description=record.get("description", ""),
+            author=self.author,
+            image=record.get("image", ""),
+            is_public=record.get("is_public", False),
+            creator_state=record.get("creator_state", "update"),
+        )
+        self.course_ids.append(self.course.id)
+
+    def flush(self):
+        for record_type in RECORD_TYPES[1:]:
+            self.flush_type(record_type)
+
+    def flush_type(self, record_type):
+        records = self.buffers[record_type]
+        if not records:
+            return
+        self.buffers[record_type] = []
+
+        try:
+            if record_type == "module":
+                objects = [Module(course=self.course, name=r["name"], order=r["order"], is_visible=r.get("is_visible", True)) for r in records]
+            elif record_type == "lesson":
+                objects = [Lesson(course=self.course, module_id=self.ids["module"][r["module_id"]], topic=r["topic"], order=r["order"]) for r in records]
+            elif record_type == "introduction":
+                objects = [LessonIntroduction(lesson_id=self.ids["lesson"][r["lesson_id"]], description=r["description"]) for r in records]
+            elif record_type == "assignment":
+                objects = [LessonAssignment(lesson_id=self.ids["lesson"][r["lesson_id"]], instructions=r["instructions"]) for r in records]
+            elif record_type == "quiz":
+                objects = [LessonQuiz(lesson_id=self.ids["lesson"][r["lesson_id"]], question=r["question"]) for r in records]
+            else:
+                objects = [QuizOption(question_id=self.ids["quiz"][r["question_id"]], answer=r["answer"], is_correct=r["is_correct"]) for r in records]
+        except KeyError as e:
+            raise ValueError(f"A {record_type} record has a missing field or an unknown reference: {e}.")
+        except TypeError:
+            raise ValueError(f"A {record_type} record has a field of the wrong type.")
+
+        created = type(objects[0]).objects.bulk_create(objects)
+
+        if record_type in self.ids:
+            self.ids[record_type].update((record["id"], obj.id) for record, obj in zip(records, created))
+
+
+def import_course_records(records, author, skip_existing=False):
+    """Imports records produced by `export_course_records` as courses of `author`. Returns the new course ids."""
+
+    importer = CourseImporter(author, skip_existing=skip_existing)
+    for record in records:
+        importer.add(record)
+    importer.flush()
+
+    return importer.course_ids
@@ -0,0 +1,7 @@
+from prometheus_client import multiprocess
+
+
+def child_exit(server, worker):
+    """Drops the live gauges of an exited worker from the metrics aggregated across workers."""
+
+    multiprocess.mark_process_dead(worker.pid)
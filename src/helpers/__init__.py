@@ -1,5 +1,11 @@
-from .api_auth import auth_required
+from .api_auth import async_auth_required, auth_claims, auth_required, invalidate_cached_user, issue_tokens
+from .revocation import revoke_token
 
 __all__ = [
-    auth_required
+    auth_required,
+    auth_claims,
+    async_auth_required,
+    invalidate_cached_user,
+    issue_tokens,
+    revoke_token,
 ]
\ No newline at end of file
@@ -1,3 +1,125 @@
-from ninja_jwt.authentication import JWTAuth
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from ninja_extra.security import AsyncHttpBearer
+from ninja_jwt.authentication import AsyncJWTBaseAuthentication, JWTAuth
+from ninja_jwt.exceptions import AuthenticationFailed, InvalidToken
+from ninja_jwt.models import TokenUser
+from ninja_jwt.settings import api_settings
+from ninja_jwt.tokens import RefreshToken
 
-auth_required = [JWTAuth()]
\ No newline at end of file
+from .revocation import is_token_revoked
+
+
+# Never stored in the shared cache. A user rebuilt from the cache loads these from the database when accessed.
+CACHE_EXCLUDED_FIELDS = {"password"}
+
+
+def get_user_cache_key(user_id):
+    return f"auth-user:{user_id}"
+
+
+def cache_user(user):
+    """Caches the fields of `user` other than `CACHE_EXCLUDED_FIELDS` and returns them."""
+
+    fields = {
+        field.attname: field.value_from_object(user)
+        for field in user._meta.concrete_fields
+        if field.attname not in CACHE_EXCLUDED_FIELDS
+    }
+    cache.set(get_user_cache_key(getattr(user, api_settings.USER_ID_FIELD)), fields, settings.AUTH_USER_CACHE_TIMEOUT)
+
+    return fields
+
+
+def build_cached_user(fields):
+    """Rebuilds a user from the fields stored by `cache_user`, with the excluded fields deferred."""
+
+    return get_user_model().from_db(DEFAULT_DB_ALIAS, list(fields), list(fields.values()))
+
+
+def issue_tokens(user):
+    """Creates a refresh token for `user` carrying the claims `CachedJWTAuth` relies on. Its access token inherits them."""
+
+    refresh = RefreshToken.for_user(user)
+    refresh["token_version"] = user.token_version
+    refresh["username"] = user.username
+    refresh["role"] = user.role
+
+    return refresh
+
+
+def invalidate_cached_user(user):
+    """Drops the cached copy of `user`, so the next request loads it from the database again."""
+
+    cache.delete(get_user_cache_key(user.id))
+
+
+class ClaimsUser(TokenUser):
+    """User built from the signed claims of an access token, without touching the cache or the database."""
+
+    @property
+    def role(self):
+        return self.token.get("role")
+
+
+class CachedJWTAuth(JWTAuth):
+    """`JWTAuth` that keeps the authenticated user in the cache for `AUTH_USER_CACHE_TIMEOUT` seconds.
+
+    Entries are keyed by user id and hold the user's fields without the password hash. The token's `token_version`
+    claim is compared with the cached one on every request, so bumping `User.token_version` revokes all previously
+    issued tokens of the user, and deactivating the user rejects them too. Single tokens are revoked with
+    `revoke_token`. With `trust_claims=True` the user is built from the token's username and role claims after the
+    same checks; only use it for read-only endpoints that need nothing else from the user.
+    """
+
+    def __init__(self, trust_claims=False):
+        super().__init__()
+        self.trust_claims = trust_claims
+
+    def get_validated_token(self, raw_token):
+        validated_token = super().get_validated_token(raw_token)
+
+        if is_token_revoked(validated_token.get(api_settings.JTI_CLAIM)):
+            raise AuthenticationFailed("Token has been revoked")
+
+        return validated_token
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken("Token contained no recognizable user identification") from e
+
+        token_version = validated_token.get("token_version", 1)
+
+        user = None
+        fields = cache.get(get_user_cache_key(user_id))
+        # A version mismatch on a cached user may also mean the cached copy predates the bump, so reload it.
+        if fields is None or fields["token_version"] != token_version:
+            user = super().get_user(validated_token)
+            fields = cache_user(user)
+
+        if fields["token_version"] != token_version:
+            raise AuthenticationFailed("Token has been revoked")
+
+        if not fields["is_active"]:
+            raise AuthenticationFailed("User is inactive")
+
+        if self.trust_claims and "username" in validated_token and "role" in validated_token:
+            return ClaimsUser(validated_token)
+
+        return user if user is not None else build_cached_user(fields)
+
+
+class AsyncCachedJWTAuth(AsyncJWTBaseAuthentication, CachedJWTAuth, AsyncHttpBearer):
+    """`CachedJWTAuth` for async endpoints."""
+
+    async def authenticate(self, request, token):
+        return await self.async_jwt_authenticate(request, token)
+
+
+auth_required = [CachedJWTAuth()]
+auth_claims = [CachedJWTAuth(trust_claims=True)]
+async_auth_required = [AsyncCachedJWTAuth()]
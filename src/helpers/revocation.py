@@ -0,0 +1,93 @@
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from ninja_jwt.settings import api_settings
+
+from authentication.models import RevokedToken
+
+
+FALSE_POSITIVE_RATE = 0.01
+MIN_CAPACITY = 1024
+
+
+class BloomFilter:
+    """Set of strings that may report false positives at roughly `false_positive_rate`, but never false negatives."""
+
+    def __init__(self, capacity, false_positive_rate=FALSE_POSITIVE_RATE):
+        capacity = max(capacity, MIN_CAPACITY)
+        self.size = math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2)
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def get_positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+
+        return ((first + i * second) % self.size for i in range(self.hash_count))
+
+    def add(self, value):
+        for position in self.get_positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self.get_positions(value))
+
+
+class RevocationList:
+    """In-process Bloom filter mirror of the `RevokedToken` table.
+
+    A token that misses the filter is not revoked, which is the answer for nearly every request and costs no query.
+    Only hits are confirmed against the database. The filter is rebuilt every `TOKEN_REVOCATION_REFRESH_SECONDS`,
+    so a token revoked by another process is rejected here within that interval.
+    """
+
+    def __init__(self):
+        self.filter = None
+        self.loaded_at = 0
+        self.lock = threading.Lock()
+
+    def refresh(self):
+        now = datetime.now(timezone.utc)
+        jtis = list(RevokedToken.objects.filter(expires_at__gt=now).values_list("jti", flat=True))
+
+        bloom = BloomFilter(len(jtis) * 2)
+        for jti in jtis:
+            bloom.add(jti)
+
+        self.filter = bloom
+        self.loaded_at = time.monotonic()
+
+    def get_filter(self):
+        if self.filter is None or time.monotonic() - self.loaded_at > settings.TOKEN_REVOCATION_REFRESH_SECONDS:
+            with self.lock:
+                if self.filter is None or time.monotonic() - self.loaded_at > settings.TOKEN_REVOCATION_REFRESH_SECONDS:
+                    self.refresh()
+
+        return self.filter
+
+    def add(self, jti):
+        self.get_filter().add(jti)
+
+    def __contains__(self, jti):
+        return jti in self.get_filter() and RevokedToken.objects.filter(jti=jti).exists()
+
+
+revocation_list = RevocationList()
+
+
+def revoke_token(token):
+    """Revokes a validated access or refresh token until it expires."""
+
+    jti = token[api_settings.JTI_CLAIM]
+    expires_at = datetime.fromtimestamp(token["exp"], tz=timezone.utc)
+
+    RevokedToken.objects.get_or_create(jti=jti, defaults={"expires_at": expires_at})
+    revocation_list.add(jti)
+
+
+def is_token_revoked(jti):
+    return jti is not None and jti in revocation_list
@@ -0,0 +1,81 @@
+"""
+Routes reads of analytics and public catalog endpoints to the `replica` database.
+
+`ReplicaRoutingMiddleware` decides per request whether reads may go to the replica. As soon as
+anything is written during the request, reads are pinned to the primary for the rest of it
+(read-your-writes), and a short-lived cookie keeps the client's following requests on the primary
+until the replica has caught up.
+"""
+import re
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+REPLICA_DB_ALIAS = "replica"
+
+use_replica = ContextVar("use_replica", default=False)
+pinned_to_primary = ContextVar("pinned_to_primary", default=False)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if use_replica.get() and not pinned_to_primary.get() and REPLICA_DB_ALIAS in settings.DATABASES:
+            return REPLICA_DB_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        pinned_to_primary.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaRoutingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.read_paths = [re.compile(pattern) for pattern in settings.REPLICA_READ_PATHS]
+
+    def __call__(self, request):
+        replica_allowed = (
+            request.method in ("GET", "HEAD")
+            and settings.REPLICA_PIN_COOKIE not in request.COOKIES
+            and any(pattern.match(request.path) for pattern in self.read_paths)
+        )
+
+        replica_token = use_replica.set(replica_allowed)
+        pinned_token = pinned_to_primary.set(False)
+        try:
+            response = self.get_response(request)
+            wrote = pinned_to_primary.get()
+        finally:
+            use_replica.reset(replica_token)
+            pinned_to_primary.reset(pinned_token)
+
+        if wrote:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE,
+                "1",
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+
+        if replica_allowed and response.streaming and not response.is_async:
+            response.streaming_content = self.stream_from_replica(response.streaming_content)
+
+        return response
+
+    @staticmethod
+    def stream_from_replica(content):
+        """Keeps lazily evaluated querysets of streaming responses (e.g. exports) on the replica."""
+
+        replica_token = use_replica.set(True)
+        try:
+            yield from content
+        finally:
+            use_replica.reset(replica_token)
@@ -0,0 +1,66 @@
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management.base import BaseCommand
+from django.http import JsonResponse
+from django.test import RequestFactory
+from django.utils.module_loading import import_string
+
+from learn_how_to_code.middleware import SkipForLeanPathsMixin
+
+
+def get_stock_middleware():
+    """Returns `settings.MIDDLEWARE` with the lean middleware replaced by the Django middleware they extend."""
+
+    paths = []
+    for path in settings.MIDDLEWARE:
+        middleware = import_string(path)
+        if issubclass(middleware, SkipForLeanPathsMixin):
+            stock = middleware.__bases__[-1]
+            path = f"{stock.__module__}.{stock.__qualname__}"
+        paths.append(path)
+    return paths
+
+
+def build_handler(paths):
+    def view(request):
+        return JsonResponse({"ok": True})
+
+    handler = view
+    for path in reversed(paths):
+        try:
+            handler = import_string(path)(handler)
+        except MiddlewareNotUsed:
+            # Switched off by its settings, as Django's own handler leaves it out.
+            continue
+    return handler
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures the per-request time spent in the middleware stack for an API request, with the stock "
+        "middleware and with the lean middleware that skips browser-only layers for API paths."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=20000, help="Number of requests per stack.")
+        parser.add_argument("--path", default="/api/courses/public", help="Request path.")
+
+    def handle(self, *args, requests=20000, path="/api/courses/public", **options):
+        factory = RequestFactory()
+        results = {}
+
+        for name, paths in (("stock", get_stock_middleware()), ("lean", list(settings.MIDDLEWARE))):
+            handler = build_handler(paths)
+            request_list = [factory.get(path, HTTP_AUTHORIZATION="Bearer token") for _ in range(requests)]
+
+            start = time.perf_counter()
+            for request in request_list:
+                handler(request)
+            results[name] = (time.perf_counter() - start) / requests * 1_000_000
+
+            self.stdout.write(f"{name}: {results[name]:.1f} µs/request")
+
+        saving = results["stock"] - results["lean"]
+        self.stdout.write(self.style.SUCCESS(f"Saving: {saving:.1f} µs/request ({saving / results['stock']:.0%})"))
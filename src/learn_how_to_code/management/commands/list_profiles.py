@@ -0,0 +1,44 @@
+import io
+import pstats
+
+from django.core.management.base import BaseCommand, CommandError
+
+from learn_how_to_code.profiling import get_profile_dir, load_profiles
+
+
+class Command(BaseCommand):
+    help = "Lists the request profiles recorded with ?__profile=1, or prints one of them with its slowest functions and SQL."
+
+    def add_arguments(self, parser):
+        parser.add_argument("profile_id", nargs="?", help="Profile to print. Lists the stored profiles when omitted.")
+        parser.add_argument("--limit", type=int, default=20, help="Number of profiles, functions or SQL statements to show.")
+        parser.add_argument("--sort", default="cumulative", help="pstats sort key for the functions, e.g. cumulative or tottime.")
+
+    def handle(self, *args, profile_id=None, limit=20, sort="cumulative", **options):
+        profiles = load_profiles()
+
+        if profile_id is None:
+            if not profiles:
+                self.stdout.write(f"No profiles stored in {get_profile_dir()}.")
+            for profile in profiles[:limit]:
+                self.stdout.write(
+                    f"{profile['id']}  {profile['method']} {profile['path']}  {profile['status']}  "
+                    f"{profile['duration_ms']} ms, {profile['queries']} queries ({profile['query_duration_ms']} ms)"
+                )
+            return
+
+        profile = next((profile for profile in profiles if profile["id"] == profile_id), None)
+        if profile is None:
+            raise CommandError(f"No profile with id {profile_id}.")
+
+        self.stdout.write(f"{profile['method']} {profile['path']} -> {profile['endpoint']} ({profile['status']})")
+        self.stdout.write(f"{profile['duration_ms']} ms, {profile['queries']} queries taking {profile['query_duration_ms']} ms\n")
+
+        output = io.StringIO()
+        stats = pstats.Stats(str(get_profile_dir() / f"{profile_id}.prof"), stream=output)
+        stats.sort_stats(sort).print_stats(limit)
+        self.stdout.write(output.getvalue())
+
+        self.stdout.write("SQL by total time:")
+        for query in profile["sql"][:limit]:
+            self.stdout.write(f"{query['duration_ms']:>10} ms  {query['count']:>5}x  {query['sql']}")
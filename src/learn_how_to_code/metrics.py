@@ -0,0 +1,119 @@
+"""
+Prometheus metrics for API routes, database queries and LLM calls, exported at `/metrics`.
+
+Under gunicorn each worker is a separate process. Setting the `PROMETHEUS_MULTIPROC_DIR` environment variable to
+an empty, writable directory before the workers start makes every worker write its metrics there, and `/metrics`
+then aggregates the files of all workers. `gunicorn.conf.py` cleans up after workers that exit. Without the
+variable only the metrics of the process serving the scrape are exported, which is right for `runserver`.
+
+Outside `DEBUG` the endpoint is closed until `METRICS_TOKEN` is set, as it exposes the endpoints, traffic and LLM usage.
+"""
+import functools
+import os
+import time
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+
+from .query_counter import get_endpoint_name
+
+REQUEST_LATENCY = Histogram(
+    "api_request_duration_seconds",
+    "Time spent handling a request, by endpoint function.",
+    ["endpoint", "method"],
+)
+REQUESTS = Counter("api_requests_total", "Requests handled, by endpoint function and status code.", ["endpoint", "method", "status"])
+REQUESTS_IN_FLIGHT = Gauge("api_requests_in_flight", "Requests being handled right now.", multiprocess_mode="livesum")
+
+DB_QUERIES = Counter("db_queries_total", "Database queries run while handling requests, by endpoint function.", ["endpoint"])
+DB_QUERY_DURATION = Counter("db_query_duration_seconds_total", "Time spent in database queries, by endpoint function.", ["endpoint"])
+
+LLM_LATENCY = Histogram(
+    "llm_request_duration_seconds",
+    "Time spent waiting for the language model, by operation.",
+    ["operation"],
+    buckets=(0.5, 1, 2, 5, 10, 20, 30, 60, 120, float("inf")),
+)
+LLM_TOKENS = Counter("llm_tokens_total", "Tokens used by language model calls, by operation and kind (prompt or completion).", ["operation", "kind"])
+LLM_ERRORS = Counter("llm_errors_total", "Language model calls that raised, by operation.", ["operation"])
+LLM_IN_FLIGHT = Gauge("llm_requests_in_flight", "Language model calls waiting for a response right now.", multiprocess_mode="livesum")
+
+
+def get_endpoint_label(request):
+    match = request.resolver_match
+    return get_endpoint_name(match.func, request.method) if match else "unmatched"
+
+
+class MetricsMiddleware:
+    """Records latency, status and in-flight requests per endpoint, plus the queries counted by `QueryCountMiddleware`."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            response = self.get_response(request)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+
+        endpoint = get_endpoint_label(request)
+        REQUEST_LATENCY.labels(endpoint, request.method).observe(time.perf_counter() - start)
+        REQUESTS.labels(endpoint, request.method, str(response.status_code)).inc()
+
+        counter = getattr(request, "query_counter", None)
+        if counter is not None:
+            DB_QUERIES.labels(endpoint).inc(counter.count)
+            DB_QUERY_DURATION.labels(endpoint).inc(counter.duration)
+
+        return response
+
+
+def observe_llm_call(func):
+    """Records latency, errors and in-flight calls of a function calling the language model, labelled with its name."""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        LLM_IN_FLIGHT.inc()
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            LLM_ERRORS.labels(func.__name__).inc()
+            raise
+        finally:
+            LLM_IN_FLIGHT.dec()
+            LLM_LATENCY.labels(func.__name__).observe(time.perf_counter() - start)
+
+    return wrapper
+
+
+def record_llm_usage(operation, completion):
+    """Counts the prompt and completion tokens reported in an OpenAI `completion`."""
+
+    usage = getattr(completion, "usage", None)
+    if usage is None:
+        return
+
+    LLM_TOKENS.labels(operation, "prompt").inc(usage.prompt_tokens or 0)
+    LLM_TOKENS.labels(operation, "completion").inc(usage.completion_tokens or 0)
+
+
+def metrics_view(request):
+    """Exports the metrics. Scrapes must send `METRICS_TOKEN` as a bearer token, which is only optional with `DEBUG` on."""
+
+    if not settings.METRICS_TOKEN:
+        if not settings.DEBUG:
+            return HttpResponseForbidden()
+    elif request.headers.get("Authorization") != f"Bearer {settings.METRICS_TOKEN}":
+        return HttpResponseForbidden()
+
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,48 @@
+"""
+Browser middleware that stays out of the way of JWT-only API requests.
+
+The API authenticates every request by its bearer token and never uses sessions, CSRF cookies, messages or
+`request.user` from `AuthenticationMiddleware`, yet the stock middleware would load the session (a database query
+for session-cookie carrying clients), set up a lazy user and messages storage and add headers to every response.
+The subclasses below skip all of that for paths under `LEAN_MIDDLEWARE_PATH_PREFIXES` and behave exactly like the
+stock middleware everywhere else, e.g. for the admin. Being subclasses, they still satisfy the admin's system checks.
+"""
+from django.conf import settings
+from django.contrib.auth import middleware as auth_middleware
+from django.contrib.messages import middleware as messages_middleware
+from django.contrib.sessions import middleware as sessions_middleware
+from django.middleware import clickjacking, csrf
+
+
+def is_lean_request(request):
+    return request.path.startswith(tuple(settings.LEAN_MIDDLEWARE_PATH_PREFIXES))
+
+
+class SkipForLeanPathsMixin:
+    def __call__(self, request):
+        if is_lean_request(request):
+            return self.get_response(request)
+        return super().__call__(request)
+
+
+class SessionMiddleware(SkipForLeanPathsMixin, sessions_middleware.SessionMiddleware):
+    pass
+
+
+class CsrfViewMiddleware(SkipForLeanPathsMixin, csrf.CsrfViewMiddleware):
+    def process_view(self, request, callback, callback_args, callback_kwargs):
+        if is_lean_request(request):
+            return None
+        return super().process_view(request, callback, callback_args, callback_kwargs)
+
+
+class AuthenticationMiddleware(SkipForLeanPathsMixin, auth_middleware.AuthenticationMiddleware):
+    pass
+
+
+class MessageMiddleware(SkipForLeanPathsMixin, messages_middleware.MessageMiddleware):
+    pass
+
+
+class XFrameOptionsMiddleware(SkipForLeanPathsMixin, clickjacking.XFrameOptionsMiddleware):
+    pass
@@ -0,0 +1,22 @@
+from django.contrib.postgres import operations
+from django.db.migrations.operations import AddIndex
+
+
+class AddIndexConcurrently(operations.AddIndexConcurrently):
+    """`CREATE INDEX CONCURRENTLY` on PostgreSQL, so hot tables stay writable while the index builds.
+
+    Other databases (SQLite in tests and local development) cannot build indexes concurrently and get a plain
+    `CREATE INDEX`. Migrations using this operation must set `atomic = False`.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+        else:
+            AddIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+        else:
+            AddIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
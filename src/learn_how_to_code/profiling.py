@@ -0,0 +1,124 @@
+"""
+On-demand profiling of single requests, for finding out where a slow endpoint spends its time in production.
+
+A staff user adds `?__profile=1` or the `X-Profile: 1` header to a request. `ProfilingMiddleware` then runs it under
+cProfile and stores a pstats dump next to a JSON summary with the request, its duration and the time spent per
+SQL statement in `PROFILE_DIR`, keeping only the newest `PROFILE_MAX_COUNT` profiles. The profile id is returned in
+the `X-Profile-Id` header, and `manage.py list_profiles` lists and prints stored profiles. Any other request only
+pays for checking the query string and header, and with `PROFILING_ENABLED` off (the default) the middleware is
+removed altogether.
+"""
+import cProfile
+import json
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+import helpers
+
+from .query_counter import QueryCounter, get_endpoint_name
+
+PROFILE_PARAMETER = "__profile"
+PROFILE_HEADER = "X-Profile"
+
+
+def get_profile_dir():
+    return Path(settings.PROFILE_DIR)
+
+
+def wants_profile(request):
+    return request.headers.get(PROFILE_HEADER) == "1" or request.GET.get(PROFILE_PARAMETER) == "1"
+
+
+def is_staff_request(request):
+    """Whether the request is authenticated as a staff user, by session or by bearer token."""
+
+    user = getattr(request, "user", None)
+    if user is None or not user.is_authenticated:
+        try:
+            user = helpers.auth_required[0](request)
+        except Exception:
+            return False
+
+    return bool(user and user.is_staff)
+
+
+def save_profile(request, profiler, counter, duration, status_code):
+    """Stores the pstats dump and JSON summary of a profiled request. Returns the profile id."""
+
+    profile_id = f"{datetime.now(timezone.utc):%Y%m%d%H%M%S%f}-{uuid.uuid4().hex[:8]}"
+    profile_dir = get_profile_dir()
+    profile_dir.mkdir(parents=True, exist_ok=True)
+
+    profiler.dump_stats(profile_dir / f"{profile_id}.prof")
+
+    match = request.resolver_match
+    summary = {
+        "id": profile_id,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "method": request.method,
+        "path": request.get_full_path(),
+        "endpoint": get_endpoint_name(match.func, request.method) if match else None,
+        "status": status_code,
+        "duration_ms": round(duration * 1000, 2),
+        "queries": counter.count,
+        "query_duration_ms": round(counter.duration * 1000, 2),
+        "sql": [
+            {"sql": shape, "count": counter.shapes[shape], "duration_ms": round(shape_duration * 1000, 2)}
+            for shape, shape_duration in counter.shape_durations.most_common()
+        ],
+    }
+    (profile_dir / f"{profile_id}.json").write_text(json.dumps(summary, indent=2))
+    prune_profiles()
+
+    return profile_id
+
+
+def prune_profiles():
+    """Deletes the oldest profiles beyond `PROFILE_MAX_COUNT`."""
+
+    summaries = sorted(get_profile_dir().glob("*.json"), reverse=True)
+    for path in summaries[settings.PROFILE_MAX_COUNT:]:
+        path.with_suffix(".prof").unlink(missing_ok=True)
+        path.unlink(missing_ok=True)
+
+
+def load_profiles():
+    """Returns the summaries of stored profiles, newest first."""
+
+    profile_dir = get_profile_dir()
+    if not profile_dir.exists():
+        return []
+
+    return [json.loads(path.read_text()) for path in sorted(profile_dir.glob("*.json"), reverse=True)]
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not wants_profile(request) or not is_staff_request(request):
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        counter = QueryCounter()
+        start = time.perf_counter()
+
+        with counter.capture():
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+
+        profile_id = save_profile(request, profiler, counter, time.perf_counter() - start, response.status_code)
+        response["X-Profile-Id"] = profile_id
+
+        return response
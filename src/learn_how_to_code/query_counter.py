@@ -0,0 +1,148 @@
+"""
+Counts the queries each request runs and flags the ones that run too many.
+
+`QueryCountMiddleware` records the number of queries and the time spent in the database for every request. It
+adds them as `X-DB-Queries` and `Server-Timing` headers in debug mode or for staff users. A warning is logged
+when an endpoint exceeds its query budget (`QUERY_BUDGETS`, falling back to `QUERY_BUDGET_DEFAULT`). The same
+happens when one SQL statement repeats `QUERY_REPEAT_THRESHOLD` times or more, which is the usual sign of an
+N+1 pattern. `enforce_query_budgets` applies the same budgets to endpoints called through the ninja test clients,
+for the whole suite when it runs through `manage.py test` (see `QueryBudgetTestRunner`).
+"""
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from unittest import mock
+
+from django.conf import settings
+from django.db import connections
+from ninja.testing import client as ninja_client
+from ninja_extra.testing import client as ninja_extra_client
+
+logger = logging.getLogger(__name__)
+
+IN_LIST_PATTERN = re.compile(r"IN \((?:%s, )*%s\)")
+
+
+def get_query_shape(sql):
+    """Returns `sql` with parameter lists of any length collapsed, so queries differing only in them compare equal."""
+
+    return IN_LIST_PATTERN.sub("IN (...)", sql)
+
+
+class QueryCounter:
+    """Database execute wrapper that counts queries, their total duration and how often and how long each SQL shape ran."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+        self.shape_durations = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            shape = get_query_shape(sql)
+            self.duration += elapsed
+            self.count += 1
+            self.shapes[shape] += 1
+            self.shape_durations[shape] += elapsed
+
+    @contextmanager
+    def capture(self):
+        """Counts the queries run on any database connection of the current thread."""
+
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(self))
+            yield self
+
+    def get_repeated_queries(self):
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= settings.QUERY_REPEAT_THRESHOLD]
+
+
+def get_endpoint_name(view, method):
+    """Returns the dotted name of the ninja endpoint function `view` dispatches `method` requests to.
+
+    Django resolves a URL to the view of a ninja path, which serves all its HTTP methods, so the endpoint is
+    looked up among the operations of that path.
+    """
+
+    for cell in getattr(view, "__closure__", None) or ():
+        for operation in getattr(cell.cell_contents, "operations", []):
+            if method in operation.methods:
+                return f"{operation.view_func.__module__}.{operation.view_func.__name__}"
+
+    return f"{view.__module__}.{view.__name__}"
+
+
+def get_query_budget(endpoint):
+    return settings.QUERY_BUDGETS.get(endpoint, settings.QUERY_BUDGET_DEFAULT)
+
+
+def get_budget_violations(endpoint, counter):
+    """Returns messages describing how the queries recorded by `counter` for `endpoint` broke the budgets."""
+
+    violations = []
+
+    budget = get_query_budget(endpoint)
+    if counter.count > budget:
+        violations.append(f"{endpoint} ran {counter.count} queries, its budget is {budget}")
+
+    for shape, count in counter.get_repeated_queries():
+        violations.append(f"{endpoint} ran the same query {count} times (possible N+1): {shape}")
+
+    return violations
+
+
+class QueryCountMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = request.query_counter = QueryCounter()
+        with counter.capture():
+            response = self.get_response(request)
+
+        match = request.resolver_match
+        endpoint = get_endpoint_name(match.func, request.method) if match else request.path
+        for violation in get_budget_violations(endpoint, counter):
+            logger.warning(violation)
+
+        user = getattr(request, "user", None)
+        if settings.DEBUG or getattr(user, "is_staff", False):
+            response["X-DB-Queries"] = str(counter.count)
+            response["Server-Timing"] = f'db;dur={counter.duration * 1000:.1f};desc="{counter.count} queries"'
+
+        return response
+
+
+@contextmanager
+def enforce_query_budgets():
+    """Fails calls through the sync ninja test clients whose endpoint breaks its query budget or repeats a query.
+
+    The async clients are not checked: their queries run on another thread than the one the counter watches.
+    """
+
+    def call(original):
+        def wrapper(client, func, request, kwargs):
+            counter = QueryCounter()
+            with counter.capture():
+                response = original(client, func, request, kwargs)
+
+            violations = get_budget_violations(get_endpoint_name(func, request.method), counter)
+            if violations:
+                raise AssertionError("Query budget exceeded: " + "; ".join(violations))
+
+            return response
+
+        return wrapper
+
+    with ExitStack() as stack:
+        for test_client in (ninja_client.TestClient, ninja_extra_client.TestClient):
+            stack.enter_context(mock.patch.object(test_client, "_call", call(test_client._call)))
+        yield
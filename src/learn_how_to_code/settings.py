@@ -30,6 +30,8 @@ for origin in ENV_CORS_ALLOWED_ORIGINS.split(","):
 
 """
 
+import os
+import tempfile
 from pathlib import Path
 from datetime import timedelta
 from decouple import config
@@ -74,20 +76,49 @@ INSTALLED_APPS = [
     "course",
     "module",
     "lesson",
-    "lesson_content"
+    "lesson_content",
+    "benchmarks",
 ]
 
 MIDDLEWARE = [
+    "learn_how_to_code.metrics.MetricsMiddleware",
+    "learn_how_to_code.query_counter.QueryCountMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "django.contrib.sessions.middleware.SessionMiddleware",
+    "learn_how_to_code.db_router.ReplicaRoutingMiddleware",
+    "learn_how_to_code.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
-    "django.middleware.csrf.CsrfViewMiddleware",
-    "django.contrib.auth.middleware.AuthenticationMiddleware",
-    "django.contrib.messages.middleware.MessageMiddleware",
-    "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "learn_how_to_code.middleware.CsrfViewMiddleware",
+    "learn_how_to_code.middleware.AuthenticationMiddleware",
+    "learn_how_to_code.middleware.MessageMiddleware",
+    "learn_how_to_code.middleware.XFrameOptionsMiddleware",
+    "learn_how_to_code.profiling.ProfilingMiddleware",
 ]
 
+# Bearer token Prometheus must send to scrape /metrics. Must be set in deployments: without it /metrics answers 403
+# unless DEBUG is on.
+METRICS_TOKEN = config("METRICS_TOKEN", cast=str, default="")
+
+# Most queries a request may run before it is logged (and a test calling it fails), by endpoint function.
+QUERY_BUDGET_DEFAULT = config("QUERY_BUDGET_DEFAULT", cast=int, default=30)
+QUERY_BUDGETS = {
+    "course.api.clone_course_endpoint": 40,
+}
+# How often a request may run the same SQL statement before it is reported as a likely N+1 pattern.
+QUERY_REPEAT_THRESHOLD = config("QUERY_REPEAT_THRESHOLD", cast=int, default=10)
+
+# `manage.py test` fails tests whose endpoint calls break the query budgets above.
+TEST_RUNNER = "learn_how_to_code.testrunner.QueryBudgetTestRunner"
+
+# Lets staff profile a request with `?__profile=1` or an `X-Profile: 1` header. Off by default, so the middleware is not loaded.
+PROFILING_ENABLED = config("PROFILING_ENABLED", cast=bool, default=False)
+# Where profiles are stored, outside the source tree. Only the newest PROFILE_MAX_COUNT profiles are kept.
+PROFILE_DIR = config("PROFILE_DIR", cast=str, default=str(Path(tempfile.gettempdir()) / "learn_how_to_code_profiles"))
+PROFILE_MAX_COUNT = config("PROFILE_MAX_COUNT", cast=int, default=100)
+
+# Paths served by the JWT-only API, for which the session, CSRF, auth, messages and clickjacking middleware are skipped.
+LEAN_MIDDLEWARE_PATH_PREFIXES = ["/api/"]
+
 CORS_ALLOW_CREDENTIALS = True
 
 CORS_ALLOWED_ORIGINS = []
@@ -156,6 +187,29 @@ DATABASES = {
     }
 }
 
+DATABASES['replica'] = {
+    **DATABASES['default'],
+    'HOST': config("DATABASE_REPLICA_HOST", cast=str, default=DATABASES['default']['HOST']),
+    'PORT': config("DATABASE_REPLICA_PORT", cast=str, default=DATABASES['default']['PORT']),
+    'TEST': {'MIRROR': 'default'},
+}
+
+DATABASE_ROUTERS = ['learn_how_to_code.db_router.ReplicaRouter']
+
+# GET endpoints whose reads may be served by the replica: stats, progress analytics and the public catalog.
+REPLICA_READ_PATHS = [
+    r"^/api/courses/?$",
+    r"^/api/courses/stats$",
+    r"^/api/courses/\d+/?$",
+    r"^/api/courses/(\d+/)?progress(/.*)?$",
+    r"^/api/courses/teacher/progress$",
+    r"^/api/courses/\d+/(funnel|leaderboard)$",
+]
+
+# After a write, the client reads from the primary until the replica has caught up.
+REPLICA_PIN_COOKIE = "pin_primary"
+REPLICA_PIN_SECONDS = config("REPLICA_PIN_SECONDS", cast=int, default=5)
+
 
 
 # Password validation
@@ -177,6 +231,34 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing
+# https://docs.djangoproject.com/en/5.1/topics/auth/passwords/
+
+# The selected hasher makes new hashes, the others stay listed so existing hashes can still be checked and get
+# upgraded on the next login. "argon2" needs the argon2-cffi package and "bcrypt" the bcrypt package.
+PASSWORD_HASHER_CHOICES = {
+    "pbkdf2": "authentication.hashers.PBKDF2PasswordHasher",
+    "argon2": "authentication.hashers.Argon2PasswordHasher",
+    "bcrypt": "authentication.hashers.BCryptSHA256PasswordHasher",
+}
+PASSWORD_HASHER = config("PASSWORD_HASHER", cast=str, default="pbkdf2")
+PASSWORD_HASHERS = [PASSWORD_HASHER_CHOICES[PASSWORD_HASHER]] + [
+    hasher for name, hasher in PASSWORD_HASHER_CHOICES.items() if name != PASSWORD_HASHER
+]
+
+PASSWORD_PBKDF2_ITERATIONS = config("PASSWORD_PBKDF2_ITERATIONS", cast=int, default=1_000_000)
+PASSWORD_ARGON2_TIME_COST = config("PASSWORD_ARGON2_TIME_COST", cast=int, default=2)
+PASSWORD_ARGON2_MEMORY_COST = config("PASSWORD_ARGON2_MEMORY_COST", cast=int, default=102400)
+PASSWORD_ARGON2_PARALLELISM = config("PASSWORD_ARGON2_PARALLELISM", cast=int, default=8)
+PASSWORD_BCRYPT_ROUNDS = config("PASSWORD_BCRYPT_ROUNDS", cast=int, default=12)
+
+# Size of the thread pool the async auth endpoints hash passwords in.
+PASSWORD_HASHING_WORKERS = config("PASSWORD_HASHING_WORKERS", cast=int, default=os.cpu_count() or 1)
+
+# Number of processes bulk user provisioning hashes passwords in.
+PASSWORD_HASHING_PROCESSES = config("PASSWORD_HASHING_PROCESSES", cast=int, default=os.cpu_count() or 1)
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.1/topics/i18n/
 
@@ -199,6 +281,27 @@ STATIC_URL = "static/"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+FUNNEL_CACHE_TIMEOUT = config("FUNNEL_CACHE_TIMEOUT", cast=int, default=300)
+
+# How long an authenticated user is served from the cache instead of the database.
+AUTH_USER_CACHE_TIMEOUT = config("AUTH_USER_CACHE_TIMEOUT", cast=int, default=60)
+
+# Cache shared by all processes when REDIS_URL is set. Without it every gunicorn worker keeps its own in-memory
+# cache, and a user deactivated through one worker stays authenticated on the others for up to
+# AUTH_USER_CACHE_TIMEOUT seconds. Set it for any deployment running more than one worker.
+REDIS_URL = config("REDIS_URL", cast=str, default="")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+
+# How often each process reloads its Bloom filter of revoked tokens, i.e. the longest a token revoked by another
+# process keeps working here.
+TOKEN_REVOCATION_REFRESH_SECONDS = config("TOKEN_REVOCATION_REFRESH_SECONDS", cast=int, default=30)
+
 NINJA_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=7),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=14),
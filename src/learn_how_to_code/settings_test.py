@@ -0,0 +1,32 @@
+"""
+Settings for running the test suite locally, without Postgres:
+
+    python manage.py test --settings=learn_how_to_code.settings_test
+
+Uses two local SQLite databases, `default` (primary) and `replica`, the latter mirroring the
+primary during tests the same way a streaming replica would.
+"""
+import os
+
+os.environ.setdefault("DJANGO_SECRET_KEY", "test-secret-key-not-for-production-use-0123456789")
+for variable in ("DATABASE_NAME", "DATABASE_USER", "DATABASE_PASSWORD", "DATABASE_HOST", "DATABASE_PORT"):
+    os.environ.setdefault(variable, "")
+
+from .settings import *  # noqa: E402,F401,F403
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "db.sqlite3",
+    },
+    "replica": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "db_replica.sqlite3",
+        "TEST": {"MIRROR": "default"},
+    },
+}
+
+CORS_ALLOWED_ORIGINS = [origin for origin in CORS_ALLOWED_ORIGINS if origin]
+CORS_TRUSTED_ORIGINS = [origin for origin in CORS_TRUSTED_ORIGINS if origin]
+
+PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
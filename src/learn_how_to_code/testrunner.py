@@ -0,0 +1,11 @@
+from django.test.runner import DiscoverRunner
+
+from .query_counter import enforce_query_budgets
+
+
+class QueryBudgetTestRunner(DiscoverRunner):
+    """Test runner failing any test that calls an endpoint through the ninja test clients and breaks its query budget."""
+
+    def run_suite(self, suite, **kwargs):
+        with enforce_query_budgets():
+            return super().run_suite(suite, **kwargs)
@@ -0,0 +1,358 @@
+import io
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connections
+
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from ninja_extra.testing import TestClient
+from ninja_jwt.tokens import AccessToken
+from prometheus_client import REGISTRY
+import pytest
+
+from authentication.api import router as authentication_router
+
+from authentication.models import User
+from course.api import get_analytics_connection
+from course.models import Course
+
+from .db_router import ReplicaRoutingMiddleware, pinned_to_primary, use_replica
+from . import metrics
+from .profiling import load_profiles
+from .query_counter import QueryCountMiddleware, enforce_query_budgets
+from .middleware import AuthenticationMiddleware, MessageMiddleware, SessionMiddleware, XFrameOptionsMiddleware
+
+
+class ReplicaRoutingTestCase(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.teacher = User.objects.create_user(username='Teacher1', email='teacher1@gmail.com', password='Teacher@123', role='TEACHER')
+        self.routed_to = {}
+
+    def handle(self, request, write=False):
+        """Helper function to run a request through the middleware, recording where reads were routed to"""
+
+        def view(request):
+            if write:
+                Course.objects.create(name="Course", author=self.teacher)
+            self.routed_to["read"] = Course.objects.all().db
+            return HttpResponse()
+
+        return ReplicaRoutingMiddleware(view)(request)
+
+
+    @pytest.mark.django_db
+    def test_analytics_reads_go_to_replica(self):
+        """Test that GET requests to analytics endpoints read from the replica"""
+
+        # Act
+        response = self.handle(self.factory.get("/api/courses/1/progress"))
+
+        # Assert
+        assert self.routed_to["read"] == "replica"
+        assert "pin_primary" not in response.cookies
+
+
+    @pytest.mark.django_db
+    def test_other_reads_go_to_primary(self):
+        """Test that endpoints not listed for the replica read from the primary"""
+
+        # Act
+        self.handle(self.factory.get("/api/user"))
+
+        # Assert
+        assert self.routed_to["read"] == "default"
+
+
+    @pytest.mark.django_db
+    def test_write_pins_reads_to_primary(self):
+        """Test that reads after a write in the same request go to the primary and the client gets pinned"""
+
+        # Act
+        response = self.handle(self.factory.get("/api/courses/1/progress"), write=True)
+
+        # Assert
+        assert self.routed_to["read"] == "default"
+        assert "pin_primary" in response.cookies
+
+
+    @pytest.mark.django_db
+    def test_pinned_client_reads_from_primary(self):
+        """Test that a client pinned by a recent write keeps reading from the primary"""
+
+        # Arrange
+        request = self.factory.get("/api/courses/stats")
+        request.COOKIES["pin_primary"] = "1"
+
+        # Act
+        self.handle(request)
+
+        # Assert
+        assert self.routed_to["read"] == "default"
+
+
+    def test_raw_analytics_queries_follow_router(self):
+        """Test that the raw SQL of the funnel and score distribution uses the connection picked by the router"""
+
+        # Arrange
+        self.addCleanup(use_replica.reset, use_replica.set(True))
+        self.addCleanup(pinned_to_primary.reset, pinned_to_primary.set(False))
+
+        # Act
+        connection = get_analytics_connection()
+
+        # Assert
+        assert connection is connections["replica"]
+
+
+    @pytest.mark.django_db
+    def test_reads_outside_request_go_to_primary(self):
+        """Test that reads outside of a request (commands, shell) use the primary"""
+
+        # Assert
+        assert Course.objects.all().db == "default"
+
+
+class LeanMiddlewareTestCase(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.seen = {}
+
+    def handle(self, request):
+        """Helper function to run a request through the browser middleware, recording what the view got"""
+
+        def view(request):
+            self.seen["session"] = hasattr(request, "session")
+            self.seen["user"] = hasattr(request, "user")
+            return HttpResponse()
+
+        handler = view
+        for middleware in reversed([SessionMiddleware, AuthenticationMiddleware, MessageMiddleware, XFrameOptionsMiddleware]):
+            handler = middleware(handler)
+        return handler(request)
+
+
+    def test_api_requests_skip_browser_middleware(self):
+        """Test that API requests get no session, user or clickjacking header"""
+
+        # Act
+        response = self.handle(self.factory.get("/api/courses/public"))
+
+        # Assert
+        assert not self.seen["session"]
+        assert not self.seen["user"]
+        assert "X-Frame-Options" not in response
+
+
+    def test_admin_requests_keep_browser_middleware(self):
+        """Test that admin requests still go through the session, auth and clickjacking middleware"""
+
+        # Act
+        response = self.handle(self.factory.get("/admin/"))
+
+        # Assert
+        assert self.seen["session"]
+        assert self.seen["user"]
+        assert response["X-Frame-Options"] == "DENY"
+
+
+    @override_settings(PROFILING_ENABLED=False)
+    def test_benchmark_middleware_skips_disabled_middleware(self):
+        """Test that the middleware benchmark runs with the profiling middleware switched off"""
+
+        # Arrange
+        out = io.StringIO()
+
+        # Act
+        call_command("benchmark_middleware", "--requests", "10", stdout=out)
+
+        # Assert
+        assert "Saving:" in out.getvalue()
+
+
+class QueryCounterTestCase(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.teacher = User.objects.create_user(username='Teacher1', email='teacher1@gmail.com', password='Teacher@123', role='TEACHER')
+
+    def handle(self, queries):
+        """Helper function to run a request running `queries` course lookups through the query counter"""
+
+        def view(request):
+            for _ in range(queries):
+                list(Course.objects.filter(author=self.teacher))
+            return HttpResponse()
+
+        request = self.factory.get("/api/courses")
+        request.resolver_match = None
+        return QueryCountMiddleware(view)(request)
+
+
+    @pytest.mark.django_db
+    @override_settings(DEBUG=True)
+    def test_query_headers_in_debug_mode(self):
+        """Test that the query count and database time are exposed as headers in debug mode"""
+
+        # Act
+        response = self.handle(queries=2)
+
+        # Assert
+        assert response["X-DB-Queries"] == "2"
+        assert response["Server-Timing"].startswith("db;dur=")
+
+
+    @pytest.mark.django_db
+    def test_query_headers_hidden_outside_debug_mode(self):
+        """Test that anonymous clients get no query headers in production"""
+
+        # Act
+        response = self.handle(queries=2)
+
+        # Assert
+        assert "X-DB-Queries" not in response
+
+
+    @pytest.mark.django_db
+    @override_settings(QUERY_REPEAT_THRESHOLD=5)
+    def test_repeated_query_is_logged(self):
+        """Test that a request running the same query over and over is reported as a possible N+1"""
+
+        # Act
+        with self.assertLogs("learn_how_to_code.query_counter", level="WARNING") as logs:
+            self.handle(queries=5)
+
+        # Assert
+        assert "possible N+1" in logs.output[0]
+
+
+    @pytest.mark.django_db
+    @override_settings(QUERY_BUDGET_DEFAULT=0)
+    def test_enforce_query_budgets_fails_over_budget_calls(self):
+        """Test that calling an endpoint over its query budget through the test client fails"""
+
+        # Arrange
+        client = TestClient(authentication_router)
+        token = str(AccessToken.for_user(self.teacher))
+
+        # Act / Assert
+        with enforce_query_budgets(), self.assertRaisesRegex(AssertionError, "authentication.api.get_user ran"):
+            client.get('/user', headers={'Authorization': f'Bearer {token}'})
+
+
+class MetricsTestCase(TestCase):
+    @pytest.mark.django_db
+    @override_settings(DEBUG=True)
+    def test_metrics_endpoint_exports_route_latency(self):
+        """Test that requests are exported as latency histograms labelled with their endpoint function"""
+
+        # Arrange
+        self.client.get("/api/courses")
+
+        # Act
+        response = self.client.get("/metrics")
+
+        # Assert
+        assert response.status_code == 200
+        assert 'api_request_duration_seconds_count{endpoint="course.api.get_list_public_courses",method="GET"}' in response.content.decode()
+
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_metrics_endpoint_requires_configured_token(self):
+        """Test that scraping needs the bearer token when one is configured"""
+
+        # Act
+        response = self.client.get("/metrics")
+        authorized_response = self.client.get("/metrics", headers={"Authorization": "Bearer secret"})
+
+        # Assert
+        assert response.status_code == 403
+        assert authorized_response.status_code == 200
+
+
+    @override_settings(METRICS_TOKEN="", DEBUG=False)
+    def test_metrics_endpoint_is_closed_without_token_outside_debug(self):
+        """Test that scraping is refused when no token is configured and DEBUG is off"""
+
+        # Act
+        response = self.client.get("/metrics")
+
+        # Assert
+        assert response.status_code == 403
+
+
+    def test_failed_llm_call_is_counted(self):
+        """Test that a language model call raising an exception is counted as an error"""
+
+        # Arrange
+        @metrics.observe_llm_call
+        def generate_nothing():
+            raise ValueError("The model is unavailable.")
+
+        before = REGISTRY.get_sample_value("llm_errors_total", {"operation": "generate_nothing"}) or 0
+
+        # Act
+        with self.assertRaises(ValueError):
+            generate_nothing()
+
+        # Assert
+        assert REGISTRY.get_sample_value("llm_errors_total", {"operation": "generate_nothing"}) == before + 1
+
+
+class ProfilingTestCase(TestCase):
+    def setUp(self):
+        profile_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(profile_dir.cleanup)
+        self.enterContext(override_settings(PROFILING_ENABLED=True, PROFILE_DIR=profile_dir.name, PROFILE_MAX_COUNT=2))
+
+        self.staff = User.objects.create_user(username='Staff1', email='staff1@gmail.com', password='Staff@123', is_staff=True)
+        self.student = User.objects.create_user(username='Student1', email='student1@gmail.com', password='Student@123')
+
+    def get_headers(self, user):
+        return {"Authorization": f"Bearer {AccessToken.for_user(user)}"}
+
+
+    @pytest.mark.django_db
+    def test_staff_request_is_profiled(self):
+        """Test that a staff request with ?__profile=1 is profiled and stored with its SQL timings"""
+
+        # Act
+        response = self.client.get("/api/courses/enrolled?__profile=1", headers=self.get_headers(self.staff))
+
+        # Assert
+        profiles = load_profiles()
+        assert response.status_code == 200
+        assert response["X-Profile-Id"] == profiles[0]["id"]
+        assert profiles[0]["endpoint"] == "course.api.get_enrolled_courses"
+        assert profiles[0]["queries"] == len(profiles[0]["sql"]) > 0
+
+
+    @pytest.mark.django_db
+    def test_non_staff_request_is_not_profiled(self):
+        """Test that other users cannot trigger profiling"""
+
+        # Act
+        response = self.client.get("/api/user", headers={**self.get_headers(self.student), "X-Profile": "1"})
+
+        # Assert
+        assert response.status_code == 200
+        assert "X-Profile-Id" not in response
+        assert load_profiles() == []
+
+
+    @pytest.mark.django_db
+    def test_oldest_profiles_are_pruned(self):
+        """Test that only the newest PROFILE_MAX_COUNT profiles are kept"""
+
+        # Act
+        profile_ids = [
+            self.client.get("/api/user?__profile=1", headers=self.get_headers(self.staff))["X-Profile-Id"]
+            for _ in range(3)
+        ]
+
+        # Assert
+        profile_dir = Path(settings.PROFILE_DIR)
+        assert [profile["id"] for profile in load_profiles()] == sorted(profile_ids[1:], reverse=True)
+        assert len(list(profile_dir.glob("*.prof"))) == 2
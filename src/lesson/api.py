@@ -10,15 +10,21 @@ from decouple import config
 from lesson_content.models import LessonAssignment, LessonIntroduction, LessonQuiz, QuizOption
 from lesson_content.schemas import LessonContentSchema
 
-from .schemas import LessonCreateSchema, LessonUpdateSchema, LessonDetailSchema, StudentProgressResponseSchema, StudentProgressSchema
+from .schemas import LessonCreateSchema, LessonUpdateSchema, LessonDetailSchema, StudentProgressBatchResultSchema, StudentProgressResponseSchema, StudentProgressSchema
+from learn_how_to_code import metrics
 from learn_how_to_code.schemas import MessageSchema
 from .models import Lesson, StudentProgress
 from module.models import Module
+from course.models import LeaderboardEntry
 
 import helpers
 
 router = Router()
 
+# Each item becomes a row of a single multi-row statement; this keeps it well within the bind parameter limits of
+# SQLite and PostgreSQL.
+PROGRESS_BATCH_MAX_SIZE = 500
+
 
 @router.post("/modules/{module_id}/lessons", response={201: list[LessonDetailSchema], 404: MessageSchema, 500: MessageSchema}, auth=helpers.auth_required)
 def add_lessons_with_content(request, payload: list[LessonCreateSchema], module_id: int, generate: bool = Query(False)):
@@ -163,60 +169,66 @@ def add_or_update_student_progress(request, data: StudentProgressSchema):
 
     try:
         with transaction.atomic():
-            user = request.user
-            lesson = get_object_or_404(Lesson, id=data.lesson_id)
-
-            progress, created = StudentProgress.objects.get_or_create(
-                user=user,
-                lesson=lesson,
-                defaults={
-                    "introduction_completed": data.introduction_completed or False,
-                    "quiz_score": data.quiz_score,
-                    "assignment_score": data.assignment_score,
-                    "lesson_completed": False,
-                },
+            lesson = get_object_or_404(Lesson.objects.select_related("course"), id=data.lesson_id)
+
+            results = save_student_progress(
+                request.user,
+                {lesson.id: lesson},
+                {lesson.id: (data.introduction_completed, data.quiz_score, data.assignment_score)},
             )
+            created, _ = results[lesson.id]
 
-            if not created:
-                if data.introduction_completed is not None:
-                    progress.introduction_completed = progress.introduction_completed or data.introduction_completed
-                if data.quiz_score is not None:
-                    progress.quiz_score = max(progress.quiz_score or 0, data.quiz_score)
-                if data.assignment_score is not None:
-                    progress.assignment_score = max(progress.assignment_score or 0, data.assignment_score)
-
-                if (
-                    progress.introduction_completed
-                    and (progress.quiz_score or 0) >= 70
-                    and (progress.assignment_score or 0) >= 70
-                ):
-                    progress.lesson_completed = True
-
-                    current_module = lesson.module
-                    next_lesson = current_module.lessons.filter(order__gt=lesson.order).order_by('order').first()
-
-                    if not next_lesson:
-                        next_module = current_module.course.modules.filter(order__gt=current_module.order).order_by('order').first()
-                        if next_module:
-                            next_lesson = next_module.lessons.order_by('order').first()
-
-                    if next_lesson:
-                        StudentProgress.objects.get_or_create(
-                            user=user,
-                            lesson=next_lesson,
-                            defaults={
-                                "introduction_completed": False,
-                                "quiz_score": None,
-                                "assignment_score": None,
-                                "lesson_completed": False,
-                            },
-                        )
+            return 201 if created else 200, {"message": "Progress added or updated successfully."}
 
-                progress.save()
+    except Exception as e:
+        return 400, {"message": f"Error: {str(e)}"}
 
-            return 201 if created else 200, {"message": "Progress added or updated successfully."}
+
+@router.post("/student-progress/batch", response={200: list[StudentProgressBatchResultSchema], 400: MessageSchema}, auth=helpers.auth_required)
+def add_or_update_student_progress_batch(request, data: list[StudentProgressSchema]):
+    """Adds or updates student progress in many lessons at once, e.g. queued offline events.
+
+    Items are coalesced per lesson and applied in a single transaction. Results are returned in the order of the
+    submitted items; items pointing to missing lessons get a 404 status without failing the rest of the batch.
+    """
+
+    if not data:
+        return 400, {"message": "No progress items provided."}
+
+    if len(data) > PROGRESS_BATCH_MAX_SIZE:
+        return 400, {"message": f"A batch can contain at most {PROGRESS_BATCH_MAX_SIZE} progress items."}
+
+    try:
+        with transaction.atomic():
+            items = {}
+            for item in data:
+                introduction_completed, quiz_score, assignment_score = items.get(item.lesson_id, (None, None, None))
+                items[item.lesson_id] = (
+                    bool(introduction_completed or item.introduction_completed),
+                    max((score for score in (quiz_score, item.quiz_score) if score is not None), default=None),
+                    max((score for score in (assignment_score, item.assignment_score) if score is not None), default=None),
+                )
+
+            lessons = Lesson.objects.select_related("course").in_bulk(list(items))
+            results = save_student_progress(
+                request.user,
+                lessons,
+                {lesson_id: values for lesson_id, values in items.items() if lesson_id in lessons},
+            )
+
+            response = []
+            for item in data:
+                if item.lesson_id not in results:
+                    response.append({"lesson_id": item.lesson_id, "status": 404, "message": f"Lesson with id {item.lesson_id} not found."})
+                    continue
+
+                created, progress = results[item.lesson_id]
+                response.append({"status": 201 if created else 200, **progress})
+
+            return 200, response
 
     except Exception as e:
+        traceback.print_exc()
         return 400, {"message": f"Error: {str(e)}"}
 
 
@@ -227,17 +239,14 @@ def get_student_progress(request, course_id: int):
     try:
         user = request.user
 
-        modules = Module.objects.filter(course_id=course_id)
-        lessons = Lesson.objects.filter(module__in=modules)
-
-        progress_list = StudentProgress.objects.filter(user=user, lesson__in=lessons)
+        progress_list = StudentProgress.objects.filter(course_id=course_id, user=user)
 
         if not progress_list.exists():
             return 404, {"message": f"No progress found for user {user.id} in course {course_id}."}
 
         response_data = [
             StudentProgressResponseSchema(
-                lesson_id=progress.lesson.id,
+                lesson_id=progress.lesson_id,
                 student=user.to_dict(),
                 introduction_completed=progress.introduction_completed,
                 quiz_score=progress.quiz_score,
@@ -254,6 +263,61 @@ def get_student_progress(request, course_id: int):
         return 500, {"message": f"An unexpected error occurred: {str(e)}"}
 
 
+def save_student_progress(user, lessons, items):
+    """Upserts progress of `user`, unlocks the lessons following newly completed ones and updates the leaderboard.
+
+    `lessons` maps lesson ids to lessons with `course` loaded, `items` maps lesson ids to
+    `(introduction_completed, quiz_score, assignment_score)`. Must run inside a transaction. Returns a dict
+    mapping lesson ids to `(created, progress)` pairs.
+    """
+
+    if not items:
+        return {}
+
+    progress = StudentProgress.upsert(
+        user.id,
+        [(lesson_id, lessons[lesson_id].course_id, *items[lesson_id]) for lesson_id in sorted(items)],
+    )
+
+    completed = [
+        lessons[row["lesson_id"]]
+        for row in progress
+        if row["lesson_completed"] and not (row["previous"] and row["previous"]["lesson_completed"])
+    ]
+
+    if completed:
+        courses = {lesson.course_id: lesson.course for lesson in completed}
+        rebuilt = {course_id for course_id, course in courses.items() if Lesson.ensure_sequence(course)}
+
+        stale = [lesson.id for lesson in completed if lesson.course_id in rebuilt]
+        next_lessons = dict(Lesson.objects.filter(id__in=stale).values_list("id", "next_lesson_id")) if stale else {}
+
+        StudentProgress.objects.bulk_create(
+            [
+                StudentProgress(user=user, lesson_id=next_lesson_id, course_id=course_id)
+                for next_lesson_id, course_id in {(next_lessons.get(lesson.id, lesson.next_lesson_id), lesson.course_id) for lesson in completed}
+                if next_lesson_id
+            ],
+            ignore_conflicts=True,
+        )
+
+    created = {row["lesson_id"] for row in progress if row["previous"] is None}
+
+    deltas = {}
+    for row in progress:
+        before = row.pop("previous")
+        previous_points = LeaderboardEntry.get_progress_points(before["quiz_score"], before["assignment_score"]) if before else 0
+        points = LeaderboardEntry.get_progress_points(row["quiz_score"], row["assignment_score"])
+        course_id = lessons[row["lesson_id"]].course_id
+        deltas[course_id] = deltas.get(course_id, 0) + points - previous_points
+
+    for course_id, delta in deltas.items():
+        LeaderboardEntry.apply_delta(course_id, user.id, delta)
+
+    return {row["lesson_id"]: (row["lesson_id"] in created, row) for row in progress}
+
+
+@metrics.observe_llm_call
 def generate_full_lesson_content(lesson_name: str, module_name: str, course_name: str, course_description: str, language: str = "polish") -> LessonContentSchema:
     """Generates the full content for a lesson, including description, quiz, and assignment."""
 
@@ -286,6 +350,7 @@ def generate_full_lesson_content(lesson_name: str, module_name: str, course_name
             response_format=LessonContentSchema,
         )
 
+        metrics.record_llm_usage("generate_full_lesson_content", completion)
         return completion.choices[0].message.parsed
 
     except Exception as e:
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:23
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def merge_duplicate_progress(apps, schema_editor):
+    """Merges duplicated (user, lesson) rows into the oldest one, keeping the best scores."""
+
+    StudentProgress = apps.get_model("lesson", "StudentProgress")
+
+    duplicates = (
+        StudentProgress.objects.values("user_id", "lesson_id")
+        .annotate(rows=Count("id"))
+        .filter(rows__gt=1)
+        .order_by()
+    )
+
+    for duplicate in duplicates.iterator():
+        keep, *extra = StudentProgress.objects.filter(
+            user_id=duplicate["user_id"], lesson_id=duplicate["lesson_id"]
+        ).order_by("id")
+
+        for progress in extra:
+            keep.introduction_completed |= progress.introduction_completed
+            keep.lesson_completed |= progress.lesson_completed
+            keep.quiz_score = max(
+                (
+                    score
+                    for score in (keep.quiz_score, progress.quiz_score)
+                    if score is not None
+                ),
+                default=None,
+            )
+            keep.assignment_score = max(
+                (
+                    score
+                    for score in (keep.assignment_score, progress.assignment_score)
+                    if score is not None
+                ),
+                default=None,
+            )
+            progress.delete()
+
+        keep.save()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("lesson", "0003_studentprogress"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_progress, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="studentprogress",
+            constraint=models.UniqueConstraint(
+                fields=("user", "lesson"), name="unique_student_progress"
+            ),
+        ),
+    ]
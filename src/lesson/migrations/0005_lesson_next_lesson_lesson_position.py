@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("lesson", "0004_unique_student_progress"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="lesson",
+            name="next_lesson",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="lesson.lesson",
+            ),
+        ),
+        migrations.AddField(
+            model_name="lesson",
+            name="position",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,97 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models, transaction
+from django.db.models import OuterRef, Subquery
+
+BATCH_SIZE = 2000
+
+
+def populate_course(apps, schema_editor):
+    """Copies the course of each lesson's module onto lessons and progress, committing progress in batches."""
+
+    Course = apps.get_model("course", "Course")
+    Lesson = apps.get_model("lesson", "Lesson")
+    StudentProgress = apps.get_model("lesson", "StudentProgress")
+
+    for course_id in Course.objects.values_list("id", flat=True).iterator():
+        Lesson.objects.filter(module__course_id=course_id).update(course_id=course_id)
+
+    lesson_course = Lesson.objects.filter(id=OuterRef("lesson_id")).values("course_id")[
+        :1
+    ]
+
+    last_id = 0
+    while True:
+        ids = list(
+            StudentProgress.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .values_list("id", flat=True)[:BATCH_SIZE]
+        )
+        if not ids:
+            break
+
+        with transaction.atomic():
+            StudentProgress.objects.filter(id__in=ids).update(
+                course_id=Subquery(lesson_course)
+            )
+        last_id = ids[-1]
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("course", "0010_course_first_lesson_course_sequence_version"),
+        ("lesson", "0005_lesson_next_lesson_lesson_position"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="lesson",
+            name="course",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="lessons",
+                to="course.course",
+            ),
+        ),
+        migrations.AddField(
+            model_name="studentprogress",
+            name="course",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="course.course",
+            ),
+        ),
+        migrations.RunPython(populate_course, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="lesson",
+            name="course",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="lessons",
+                to="course.course",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="studentprogress",
+            name="course",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="course.course",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="studentprogress",
+            index=models.Index(
+                fields=["course", "user"], name="progress_course_user_idx"
+            ),
+        ),
+    ]
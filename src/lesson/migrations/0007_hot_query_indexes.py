@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:29
+
+from django.conf import settings
+from django.db import migrations, models
+
+from learn_how_to_code.migration_operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("course", "0011_hot_query_indexes"),
+        ("lesson", "0006_course_denormalization"),
+        ("module", "0002_hot_query_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="lesson",
+            index=models.Index(
+                fields=["module", "order"], name="lesson_module_order_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="studentprogress",
+            index=models.Index(
+                fields=["lesson", "lesson_completed"],
+                name="progress_lesson_completed_idx",
+            ),
+        ),
+    ]
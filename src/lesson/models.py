@@ -1,19 +1,82 @@
-from django.db import models
+from django.db import connection, models
 
 from authentication.models import User
+from course.models import Course
 from module.models import Module
 
 
 class Lesson(models.Model):
     module = models.ForeignKey(Module, on_delete=models.CASCADE, related_name='lessons')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='lessons')
     topic = models.CharField(max_length=255)
     order = models.PositiveIntegerField()
+    position = models.PositiveIntegerField(null=True, blank=True)
+    next_lesson = models.ForeignKey('self', null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['module', 'order'], name='lesson_module_order_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        course_id = self.course_id
+        self.course_id = self.module.course_id
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'module' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'course'}
+
+        super().save(*args, **kwargs)
+
+        if course_id is not None and course_id != self.course_id:
+            StudentProgress.objects.filter(lesson=self).update(course_id=self.course_id)
 
     @classmethod
     def get_next_order(cls, module_id):
         last_order = cls.objects.filter(module_id=module_id).aggregate(models.Max('order'))['order__max']
         return (last_order or 0) + 1
-    
+
+    @staticmethod
+    def ensure_sequence(course):
+        """Rebuilds the lesson sequence of `course` if modules or lessons changed since it was last built.
+
+        Structural changes bump `Course.content_version`, so the sequence is stale whenever
+        `sequence_version` lags behind it. Returns `True` if the sequence was rebuilt.
+        """
+
+        if course.sequence_version == course.content_version:
+            return False
+
+        course.first_lesson_id = Lesson.rebuild_sequence(course.id, course.content_version)
+        course.sequence_version = course.content_version
+        return True
+
+    @staticmethod
+    def rebuild_sequence(course_id, version):
+        """Recomputes `position` and `next_lesson` of every lesson in the course, and the course's `first_lesson`."""
+
+        lessons = list(
+            Lesson.objects.filter(course_id=course_id)
+            .order_by('module__order', 'order', 'id')
+            .only('id', 'position', 'next_lesson_id')
+        )
+
+        changed = []
+        for position, lesson in enumerate(lessons, start=1):
+            next_lesson_id = lessons[position].id if position < len(lessons) else None
+
+            if lesson.position != position or lesson.next_lesson_id != next_lesson_id:
+                lesson.position = position
+                lesson.next_lesson_id = next_lesson_id
+                changed.append(lesson)
+
+        first_lesson_id = lessons[0].id if lessons else None
+
+        Lesson.objects.bulk_update(changed, ['position', 'next_lesson'], batch_size=1000)
+        Course.objects.filter(id=course_id).update(first_lesson_id=first_lesson_id, sequence_version=version)
+
+        return first_lesson_id
+
     def __str__(self):
         return f"{self.name} (Order: {self.order})"
 
@@ -67,13 +130,200 @@ class Lesson(models.Model):
     
 
 class StudentProgress(models.Model):
+    PASSING_SCORE = 70
+
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE)
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='+')
     introduction_completed = models.BooleanField(default=False)
     quiz_score = models.FloatField(null=True, blank=True)
     assignment_score = models.FloatField(null=True, blank=True)
     lesson_completed = models.BooleanField(default=False)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'lesson'], name='unique_student_progress'),
+        ]
+        indexes = [
+            models.Index(fields=['course', 'user'], name='progress_course_user_idx'),
+            models.Index(fields=['lesson', 'lesson_completed'], name='progress_lesson_completed_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.course_id is None:
+            self.course_id = self.lesson.course_id
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def is_passed(cls, introduction_completed, quiz_score, assignment_score):
+        return bool(introduction_completed) and (quiz_score or 0) >= cls.PASSING_SCORE and (assignment_score or 0) >= cls.PASSING_SCORE
+
+    @classmethod
+    def upsert(cls, user_id, rows):
+        """Inserts or merges progress of a user, returning each resulting row along with the values it replaced.
+
+        `rows` are `(lesson_id, course_id, introduction_completed, quiz_score, assignment_score)` tuples with at most one
+        row per lesson; `None` leaves a value unchanged. Scores only ever go up, the introduction stays completed
+        once completed, and the lesson is completed once all three pass. The merge runs in the database, so
+        concurrent submissions cannot overwrite each other. Returns the resulting rows as dicts, with `previous`
+        holding the scores and completion the row had before, or `None` if the row was inserted.
+
+        On PostgreSQL a single statement locks the existing rows, merges into them and inserts the rest. A row
+        another transaction inserts in the meantime is skipped by the insert and merged by running the statement
+        again for it, so `previous` always holds the values the merge started from. SQLite runs one writing
+        transaction at a time and fails a transaction whose earlier reads went stale instead of letting it write,
+        so there the previous values are read with a plain SELECT before an `INSERT ... ON CONFLICT DO UPDATE`.
+        """
+
+        submitted = {
+            lesson_id: (
+                course_id,
+                bool(introduction_completed),
+                quiz_score,
+                assignment_score,
+                cls.is_passed(introduction_completed, quiz_score, assignment_score),
+            )
+            for lesson_id, course_id, introduction_completed, quiz_score, assignment_score in rows
+        }
+
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                results = []
+                while submitted:
+                    results += cls._merge_progress(cursor, user_id, submitted)
+                    merged = {row["lesson_id"] for row in results}
+                    submitted = {lesson_id: values for lesson_id, values in submitted.items() if lesson_id not in merged}
+                return results
+
+            return cls._upsert_progress(cursor, user_id, submitted)
+
+    @classmethod
+    def _get_merge_assignments(cls, submitted):
+        """Returns the SET clause merging the `submitted` values into the existing row `p`, and its params."""
+
+        def merged_score(column):
+            return (
+                f"CASE WHEN {submitted}.{column} IS NULL THEN p.{column} "
+                f"WHEN p.{column} IS NULL OR {submitted}.{column} > p.{column} THEN {submitted}.{column} "
+                f"ELSE p.{column} END"
+            )
+
+        merged_introduction = f"(p.introduction_completed OR {submitted}.introduction_completed)"
+        passed = (
+            f"({merged_introduction} AND COALESCE({merged_score('quiz_score')}, 0) >= %s "
+            f"AND COALESCE({merged_score('assignment_score')}, 0) >= %s)"
+        )
+
+        return (
+            f"""
+            introduction_completed = {merged_introduction},
+            quiz_score = {merged_score('quiz_score')},
+            assignment_score = {merged_score('assignment_score')},
+            lesson_completed = p.lesson_completed OR {passed}
+            """,
+            [cls.PASSING_SCORE, cls.PASSING_SCORE],
+        )
+
+    @staticmethod
+    def _get_progress_row(row, previous):
+        lesson_id, introduction_completed, quiz_score, assignment_score, lesson_completed = row
+        return {
+            "lesson_id": lesson_id,
+            "introduction_completed": bool(introduction_completed),
+            "quiz_score": quiz_score,
+            "assignment_score": assignment_score,
+            "lesson_completed": bool(lesson_completed),
+            "previous": previous,
+        }
+
+    @classmethod
+    def _merge_progress(cls, cursor, user_id, submitted):
+        """PostgreSQL: merges into the locked existing rows and inserts the others in one statement. Rows another
+        transaction inserted after the statement started are neither merged nor inserted, nor returned."""
+
+        table = connection.ops.quote_name(cls._meta.db_table)
+        types = [
+            cls._meta.get_field(field).db_type(connection)
+            for field in ("lesson", "course", "introduction_completed", "quiz_score", "assignment_score", "lesson_completed")
+        ]
+        values = ", ".join(["(" + ", ".join(f"%s::{db_type}" for db_type in types) + ")"] * len(submitted))
+        assignments, assignment_params = cls._get_merge_assignments("submitted")
+
+        cursor.execute(
+            f"""
+            WITH submitted (lesson_id, course_id, introduction_completed, quiz_score, assignment_score, lesson_completed) AS (
+                VALUES {values}
+            ), previous AS (
+                SELECT id, lesson_id, quiz_score, assignment_score, lesson_completed
+                FROM {table}
+                WHERE user_id = %s AND lesson_id IN (SELECT lesson_id FROM submitted)
+                ORDER BY lesson_id
+                FOR UPDATE
+            ), merged AS (
+                UPDATE {table} AS p SET {assignments}
+                FROM previous, submitted
+                WHERE p.id = previous.id AND submitted.lesson_id = previous.lesson_id
+                RETURNING p.lesson_id, p.introduction_completed, p.quiz_score, p.assignment_score, p.lesson_completed,
+                    previous.quiz_score AS previous_quiz_score,
+                    previous.assignment_score AS previous_assignment_score,
+                    previous.lesson_completed AS previous_lesson_completed
+            ), inserted AS (
+                INSERT INTO {table} (user_id, lesson_id, course_id, introduction_completed, quiz_score, assignment_score, lesson_completed)
+                SELECT %s, lesson_id, course_id, introduction_completed, quiz_score, assignment_score, lesson_completed
+                FROM submitted
+                WHERE lesson_id NOT IN (SELECT lesson_id FROM previous)
+                ON CONFLICT (user_id, lesson_id) DO NOTHING
+                RETURNING lesson_id, introduction_completed, quiz_score, assignment_score, lesson_completed
+            )
+            SELECT lesson_id, introduction_completed, quiz_score, assignment_score, lesson_completed,
+                TRUE, previous_quiz_score, previous_assignment_score, previous_lesson_completed
+            FROM merged
+            UNION ALL
+            SELECT lesson_id, introduction_completed, quiz_score, assignment_score, lesson_completed, FALSE, NULL, NULL, NULL
+            FROM inserted
+            """,
+            [value for lesson_id, row in sorted(submitted.items()) for value in (lesson_id, *row)]
+            + [user_id] + assignment_params + [user_id],
+        )
+
+        return [
+            cls._get_progress_row(
+                row[:5],
+                {"quiz_score": row[6], "assignment_score": row[7], "lesson_completed": row[8]} if row[5] else None,
+            )
+            for row in cursor.fetchall()
+        ]
+
+    @classmethod
+    def _upsert_progress(cls, cursor, user_id, submitted):
+        """SQLite: reads the previous values, then inserts or merges all rows in one `INSERT ... ON CONFLICT DO UPDATE`."""
+
+        table = connection.ops.quote_name(cls._meta.db_table)
+        placeholders = ", ".join(["%s"] * len(submitted))
+
+        cursor.execute(
+            f"SELECT lesson_id, quiz_score, assignment_score, lesson_completed FROM {table} "
+            f"WHERE user_id = %s AND lesson_id IN ({placeholders})",
+            [user_id, *submitted],
+        )
+        previous = {
+            lesson_id: {"quiz_score": quiz_score, "assignment_score": assignment_score, "lesson_completed": bool(lesson_completed)}
+            for lesson_id, quiz_score, assignment_score, lesson_completed in cursor.fetchall()
+        }
+
+        assignments, assignment_params = cls._get_merge_assignments("EXCLUDED")
+        cursor.execute(
+            f"""
+            INSERT INTO {table} AS p (user_id, lesson_id, course_id, introduction_completed, quiz_score, assignment_score, lesson_completed)
+            VALUES {", ".join(["(%s, %s, %s, %s, %s, %s, %s)"] * len(submitted))}
+            ON CONFLICT (user_id, lesson_id) DO UPDATE SET {assignments}
+            RETURNING lesson_id, introduction_completed, quiz_score, assignment_score, lesson_completed
+            """,
+            [value for lesson_id, row in sorted(submitted.items()) for value in (user_id, lesson_id, *row)] + assignment_params,
+        )
+
+        return [cls._get_progress_row(row, previous.get(row[0])) for row in cursor.fetchall()]
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -40,6 +40,16 @@ class StudentProgressSchema(BaseModel):
     lesson_completed: Optional[bool] = None
 
 
+class StudentProgressBatchResultSchema(Schema):
+    lesson_id: int
+    status: int
+    message: Optional[str] = None
+    introduction_completed: Optional[bool] = None
+    quiz_score: Optional[float] = None
+    assignment_score: Optional[float] = None
+    lesson_completed: Optional[bool] = None
+
+
 class StudentProgressResponseSchema(BaseModel):
     lesson_id: int
     student: UserDetailSchema
@@ -4,11 +4,11 @@ from ninja_jwt.tokens import RefreshToken
 from ninja_extra.testing import TestClient
 
 from authentication.models import User
-from course.models import Course
+from course.models import Course, LeaderboardEntry
 from lesson.models import Lesson, StudentProgress
 from module.models import Module
 
-from .api import router
+from .api import PROGRESS_BATCH_MAX_SIZE, router
 
 
 class LessonApiTestCase(TestCase):
@@ -281,6 +281,164 @@ class LessonApiTestCase(TestCase):
         assert progress.assignment_score == 60
 
 
+    @pytest.mark.django_db
+    def test_update_student_progress_updates_leaderboard(self):
+        """Test that progress updates add the score delta to the leaderboard"""
+
+        # Arrange
+        access_token = self.get_access_token(self.student)
+        headers = {"Authorization": f"Bearer {access_token}"}
+
+        # Act
+        self.client.post("/student-progress", json={"lesson_id": self.lesson.id, "quiz_score": 60}, headers=headers)
+        self.client.post("/student-progress", json={"lesson_id": self.lesson.id, "quiz_score": 50, "assignment_score": 30}, headers=headers)
+        entry = LeaderboardEntry.objects.get(course=self.course, user=self.student)
+
+        # Assert
+        assert entry.score == 90
+
+
+    @pytest.mark.django_db
+    def test_update_student_progress_completes_lesson_and_unlocks_next(self):
+        """Test that passing all parts completes the lesson and unlocks the next one without lowering scores"""
+
+        # Arrange
+        next_lesson = Lesson.objects.create(module=self.module, topic="Lesson 2", order=2)
+        StudentProgress.objects.create(user=self.student, lesson=self.lesson, introduction_completed=True, quiz_score=95)
+        access_token = self.get_access_token(self.student)
+        headers = {"Authorization": f"Bearer {access_token}"}
+        payload = {"lesson_id": self.lesson.id, "introduction_completed": False, "quiz_score": 60, "assignment_score": 75}
+
+        # Act
+        response = self.client.post("/student-progress", json=payload, headers=headers)
+        progress = StudentProgress.objects.get(user=self.student, lesson=self.lesson)
+
+        # Assert
+        assert response.status_code == 200
+        assert progress.introduction_completed is True
+        assert progress.quiz_score == 95
+        assert progress.assignment_score == 75
+        assert progress.lesson_completed is True
+        assert StudentProgress.objects.filter(user=self.student, lesson=next_lesson).exists()
+
+
+    @pytest.mark.django_db
+    def test_add_student_progress_batch_success(self):
+        """Test that batched items are coalesced per lesson and applied together"""
+
+        # Arrange
+        next_lesson = Lesson.objects.create(module=self.module, topic="Lesson 2", order=2)
+        access_token = self.get_access_token(self.student)
+        headers = {"Authorization": f"Bearer {access_token}"}
+        payload = [
+            {"lesson_id": self.lesson.id, "introduction_completed": True},
+            {"lesson_id": self.lesson.id, "quiz_score": 80},
+            {"lesson_id": 999, "quiz_score": 50},
+            {"lesson_id": self.lesson.id, "quiz_score": 60, "assignment_score": 90},
+        ]
+
+        # Act
+        response = self.client.post("/student-progress/batch", json=payload, headers=headers)
+        progress = StudentProgress.objects.get(user=self.student, lesson=self.lesson)
+
+        # Assert
+        assert response.status_code == 200
+        assert [item["status"] for item in response.json()] == [201, 201, 404, 201]
+        assert response.json()[0]["lesson_completed"] is True
+        assert progress.quiz_score == 80
+        assert progress.assignment_score == 90
+        assert progress.lesson_completed is True
+        assert StudentProgress.objects.filter(user=self.student, lesson=next_lesson).exists()
+        assert LeaderboardEntry.objects.get(course=self.course, user=self.student).score == 170
+
+
+    @pytest.mark.django_db
+    def test_add_student_progress_batch_empty(self):
+        """Test that an empty batch is rejected"""
+
+        # Arrange
+        access_token = self.get_access_token(self.student)
+        headers = {"Authorization": f"Bearer {access_token}"}
+
+        # Act
+        response = self.client.post("/student-progress/batch", json=[], headers=headers)
+
+        # Assert
+        assert response.status_code == 400
+
+
+    @pytest.mark.django_db
+    def test_add_student_progress_batch_too_large(self):
+        """Test that a batch over the maximum size is rejected"""
+
+        # Arrange
+        access_token = self.get_access_token(self.student)
+        headers = {"Authorization": f"Bearer {access_token}"}
+        payload = [{"lesson_id": self.lesson.id, "quiz_score": 80} for _ in range(PROGRESS_BATCH_MAX_SIZE + 1)]
+
+        # Act
+        response = self.client.post("/student-progress/batch", json=payload, headers=headers)
+
+        # Assert
+        assert response.status_code == 400
+        assert response.json()["message"] == f"A batch can contain at most {PROGRESS_BATCH_MAX_SIZE} progress items."
+
+
+    @pytest.mark.django_db
+    def test_course_stays_in_sync_when_lesson_or_module_moves(self):
+        """Test that the denormalized course of lessons and progress follows moves between courses"""
+
+        # Arrange
+        other_course = Course.objects.create(name="Course 2", author=self.teacher)
+        other_module = Module.objects.create(course=other_course, name="Module 2", order=1, is_visible=True)
+        progress = StudentProgress.objects.create(user=self.student, lesson=self.lesson)
+
+        # Act
+        self.lesson.module = other_module
+        self.lesson.save()
+        moved_lesson_course = StudentProgress.objects.get(id=progress.id).course_id
+
+        self.module.course = other_course
+        self.module.save()
+        self.lesson.module = self.module
+        self.lesson.save()
+        self.module.course = self.course
+        self.module.save()
+
+        # Assert
+        assert progress.course_id == self.course.id
+        assert moved_lesson_course == other_course.id
+        assert Lesson.objects.get(id=self.lesson.id).course_id == self.course.id
+        assert StudentProgress.objects.get(id=progress.id).course_id == self.course.id
+
+
+    @pytest.mark.django_db
+    def test_lesson_sequence_follows_module_and_lesson_order(self):
+        """Test that the precomputed sequence spans modules and is rebuilt after reordering"""
+
+        # Arrange
+        second_module = Module.objects.create(course=self.course, name="Module 2", order=2, is_visible=True)
+        last_lesson = Lesson.objects.create(module=second_module, topic="Lesson 3", order=1)
+        middle_lesson = Lesson.objects.create(module=self.module, topic="Lesson 2", order=2)
+        Lesson.ensure_sequence(Course.objects.get(id=self.course.id))
+
+        # Act
+        self.lesson.order = 3
+        self.lesson.save()
+        course = Course.objects.get(id=self.course.id)
+        rebuilt = Lesson.ensure_sequence(course)
+        lessons = {lesson.id: lesson for lesson in Lesson.objects.all()}
+
+        # Assert
+        assert rebuilt is True
+        assert course.first_lesson_id == middle_lesson.id
+        assert lessons[middle_lesson.id].next_lesson_id == self.lesson.id
+        assert lessons[self.lesson.id].next_lesson_id == last_lesson.id
+        assert lessons[last_lesson.id].next_lesson_id is None
+        assert [lessons[id].position for id in (middle_lesson.id, self.lesson.id, last_lesson.id)] == [1, 2, 3]
+        assert Lesson.ensure_sequence(course) is False
+
+
     @pytest.mark.django_db
     def test_add_student_progress_lesson_not_found(self):
         """Test adding progress to a non-existent lesson"""
@@ -9,6 +9,7 @@ import json
 from lesson.api import add_or_update_student_progress
 from lesson.schemas import StudentProgressSchema
 from .schemas import CodeEvaluationRequestSchema, CodeEvaluationResponseSchema, LessonIntroductionSchema, LessonQuizSchema, LessonAssignmentSchema, LessonQuizDetailSchema
+from learn_how_to_code import metrics
 from learn_how_to_code.schemas import MessageSchema
 from .models import LessonIntroduction, LessonQuiz, QuizOption, LessonAssignment
 from lesson.models import Lesson
@@ -186,6 +187,7 @@ def lesson_assignment(request, lesson_id: int, generate: bool = False, payload:
 
     
     
+@metrics.observe_llm_call
 def generate_introduction(lesson_name: str, language: str = "polish"):
     try:
         client = OpenAI(api_key=config('OPENAI_API_KEY', cast=str))
@@ -211,6 +213,7 @@ def generate_introduction(lesson_name: str, language: str = "polish"):
                 }
             ]
         )
+        metrics.record_llm_usage("generate_introduction", response)
         result = response.choices[0].message.content
 
         try:
@@ -222,6 +225,7 @@ def generate_introduction(lesson_name: str, language: str = "polish"):
         raise
 
 
+@metrics.observe_llm_call
 def generate_quiz(lesson_name: str, language: str = "polish") -> dict:
     try:
         client = OpenAI(api_key=config('OPENAI_API_KEY', cast=str))
@@ -260,6 +264,7 @@ def generate_quiz(lesson_name: str, language: str = "polish") -> dict:
                 }
             ]
         )
+        metrics.record_llm_usage("generate_quiz", response)
         result = response.choices[0].message.content
         
         try:
@@ -271,6 +276,7 @@ def generate_quiz(lesson_name: str, language: str = "polish") -> dict:
         raise
 
 
+@metrics.observe_llm_call
 def generate_assignment(lesson_name: str, language: str = "polish") -> LessonAssignmentSchema:
     try:
         client = OpenAI(api_key=config('OPENAI_API_KEY', cast=str))
@@ -303,6 +309,7 @@ def generate_assignment(lesson_name: str, language: str = "polish") -> LessonAss
             response_format=LessonAssignmentSchema,
         )
 
+        metrics.record_llm_usage("generate_assignment", completion)
         parsed_response = completion.choices[0].message.parsed
         return parsed_response
 
@@ -356,6 +363,7 @@ def evaluate_assignment(request, data: CodeEvaluationRequestSchema):
         return 500, {"message": f"An unexpected error occurred: {str(e)}"}
 
 
+@metrics.observe_llm_call
 def evaluate_code_response(
     assignment_instructions: str,
     user_code: str,
@@ -399,6 +407,7 @@ def evaluate_code_response(
             response_format=CodeEvaluationResponseSchema,
         )
 
+        metrics.record_llm_usage("evaluate_code_response", completion)
         parsed_response = completion.choices[0].message.parsed
 
         return parsed_response
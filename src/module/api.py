@@ -10,6 +10,7 @@ from decouple import config
 from lesson.models import Lesson
 from lesson.schemas import LessonCreateSchema, LessonResponseSchema
 from .schemas import ModuleCreateSchema, ModuleUpdateSchema, ModuleDetailSchema
+from learn_how_to_code import metrics
 from learn_how_to_code.schemas import MessageSchema
 from .models import Module
 from course.models import Course
@@ -130,6 +131,7 @@ def delete_module(request, course_id: int, module_id: int):
         return 500, {"message": "An unexpected error occurred while deleting the module."}
     
 
+@metrics.observe_llm_call
 def generate_lessons(course_name: str, course_description: str, module_name: str, language: str = "polish") -> List[LessonCreateSchema]:
     """Generates a list of lessons for a module based on the course and module information."""
     client = OpenAI(api_key=config('OPENAI_API_KEY', cast=str))
@@ -157,6 +159,7 @@ def generate_lessons(course_name: str, course_description: str, module_name: str
             response_format=LessonResponseSchema,
         )
 
+        metrics.record_llm_usage("generate_lessons", completion)
         parsed_response = completion.choices[0].message.parsed
 
         return parsed_response.modules
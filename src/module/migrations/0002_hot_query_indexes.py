@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:29
+
+from django.db import migrations, models
+
+from learn_how_to_code.migration_operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("course", "0011_hot_query_indexes"),
+        ("module", "0001_initial"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="module",
+            index=models.Index(
+                fields=["course", "order"], name="module_course_order_idx"
+            ),
+        ),
+    ]
@@ -9,6 +9,11 @@ class Module(models.Model):
     order = models.PositiveIntegerField()
     is_visible = models.BooleanField(default=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['course', 'order'], name='module_course_order_idx'),
+        ]
+
     @classmethod
     def get_next_order(cls, course_id):
         last_order = cls.objects.filter(course_id=course_id).aggregate(models.Max('order'))['order__max']